@@ -0,0 +1,54 @@
+"""
+Compares lines/sec of LogEventFactory.classify against the previous linear
+``is_event`` chain on a synthetic ShooterGame.log mix.
+
+Run from the repository root:
+
+    python benchmarks/bench_classifier.py --lines 200000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from log_generator import generate_lines  # noqa: E402
+from log_monitor import LogEventFactory  # noqa: E402
+
+
+def linear_classify(line: str):
+    for event_type in LogEventFactory.event_types:
+        if event_type.is_event(line):
+            return event_type
+    return None
+
+
+def measure(classify, lines: list[str]) -> float:
+    start = time.perf_counter()
+    for line in lines:
+        classify(line)
+    return len(lines) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lines", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    lines = generate_lines(args.lines, args.seed)
+    for line in lines:
+        assert LogEventFactory.classify(line) is linear_classify(line), line
+
+    before = measure(linear_classify, lines)
+    after = measure(LogEventFactory.classify, lines)
+    sys.__stdout__.write(
+        f"linear is_event chain: {before:12,.0f} lines/sec\n"
+        f"compiled classifier:   {after:12,.0f} lines/sec ({after / before:.2f}x)\n"
+    )
+
+
+if __name__ == "__main__":
+    main()
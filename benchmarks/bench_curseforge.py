@@ -0,0 +1,106 @@
+"""
+Times CurseForgeClient.get_mods against a local CurseForge stand-in that adds
+a fixed latency to each request: one unbatched request per mod list as
+before, batched concurrent requests, and a warm on-disk cache.
+
+Run from the repository root:
+
+    python benchmarks/bench_curseforge.py --mods 200 --latency 0.3
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from curseforge import CurseForgeClient  # noqa: E402
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """Answers POST /v1/mods after ``server.latency`` plus a per-mod cost."""
+
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        mod_ids = body["modIds"]
+        time.sleep(self.server.latency + self.server.per_mod * len(mod_ids))
+        payload = json.dumps(
+            {
+                "data": [
+                    {
+                        "id": mod_id,
+                        "name": f"Mod {mod_id}",
+                        "dateReleased": "2024-06-05T12:00:42.123Z",
+                        "mainFileId": 1,
+                        "latestFiles": [
+                            {"id": 1, "isAvailable": True, "fileStatus": 4}
+                        ],
+                    }
+                    for mod_id in mod_ids
+                ]
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def timed(client, mod_ids):
+    started = time.perf_counter()
+    client.get_mods(mod_ids)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mods", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--per-mod", type=float, default=0.005)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    server.latency = args.latency
+    server.per_mod = args.per_mod
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    mod_ids = list(range(1, args.mods + 1))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = os.path.join(tmp, "cache.json")
+        single = CurseForgeClient(
+            lambda: "key", base_url, batch_size=len(mod_ids), workers=1
+        )
+        batched = CurseForgeClient(
+            lambda: "key",
+            base_url,
+            batch_size=args.batch_size,
+            workers=args.workers,
+            cache_path=cache_path,
+        )
+        results = [
+            ("single request", timed(single, mod_ids)),
+            (f"batched ({args.batch_size} x {args.workers})", timed(batched, mod_ids)),
+        ]
+        warm = CurseForgeClient(lambda: "key", base_url, cache_path=cache_path)
+        results.append(("warm cache", timed(warm, mod_ids)))
+    for name, seconds in results:
+        sys.__stdout__.write(f"{name + ':':22}{seconds:8.3f}s\n")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
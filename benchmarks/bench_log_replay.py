@@ -0,0 +1,181 @@
+"""
+Replays a synthetic ShooterGame.log through LogMonitor with event side effects
+stubbed out, and reports throughput, per-event-type cost, per-line latency
+percentiles and peak memory.
+
+Runs are seeded, so two runs with the same arguments replay the same log.
+Save a baseline and compare a classifier change against it:
+
+    python benchmarks/bench_log_replay.py --lines 200000 --json before.json
+    python benchmarks/bench_log_replay.py --lines 200000 --baseline before.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from log_generator import DEFAULT_MIX, parse_mix, write_log  # noqa: E402
+from log_monitor import LogEvent, LogEventFactory, LogMonitor  # noqa: E402
+
+
+class StubDispatcher:
+    """Counts submitted events instead of running their side effects."""
+
+    def __init__(self):
+        self.submitted = 0
+
+    def submit(self, event: LogEvent) -> bool:
+        self.submitted += 1
+        return True
+
+
+def percentile(sorted_values: list[int], fraction: float) -> int:
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+def replay(path: str, workdir: str) -> tuple[float, int]:
+    """
+    Feeds the whole log to a fresh LogMonitor, as if it had just been written.
+
+    :return: Elapsed seconds and the number of events recognised.
+    """
+    log_path = os.path.join(workdir, "ShooterGame.log")
+    open(log_path, "wb").close()
+    monitor = LogMonitor(
+        StubDispatcher(),
+        filepath=log_path,
+        checkpoint_path=os.path.join(workdir, "checkpoint.json"),
+    )
+    monitor.checkpoint_interval = float("inf")
+    _copy(path, log_path)
+    started = time.perf_counter()
+    events = monitor.process_new_entries()
+    return time.perf_counter() - started, len(events)
+
+
+def _copy(source: str, destination: str) -> None:
+    with open(source, "rb") as src, open(destination, "ab") as dst:
+        while chunk := src.read(1 << 20):
+            dst.write(chunk)
+
+
+def per_line_costs(path: str) -> tuple[list[int], dict[str, list[int]]]:
+    """Times classification and submission of each line on its own, in ns."""
+    dispatcher = StubDispatcher()
+    latencies = []
+    by_type = defaultdict(list)
+    with open(path, "rb") as f:
+        lines = f.read().decode("utf-8", errors="replace").splitlines()
+    clock = time.perf_counter_ns
+    for line in lines:
+        started = clock()
+        event = LogEventFactory.create(line)
+        if type(event) is not LogEvent:
+            dispatcher.submit(event)
+        elapsed = clock() - started
+        latencies.append(elapsed)
+        by_type[type(event).__name__].append(elapsed)
+    return latencies, by_type
+
+
+def run(args) -> dict:
+    with tempfile.TemporaryDirectory() as workdir:
+        source = os.path.join(workdir, "source.log")
+        size = write_log(source, args.lines, args.seed, args.mix)
+
+        replay(source, workdir)  # warm-up: compiles the classifier, fills caches
+        timings = []
+        for _ in range(args.repeat):
+            elapsed, events = replay(source, workdir)
+            timings.append(elapsed)
+
+        tracemalloc.start()
+        replay(source, workdir)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        latencies, by_type = per_line_costs(source)
+
+    latencies.sort()
+    total_ns = sum(latencies)
+    elapsed = statistics.median(timings)
+    return {
+        "lines": args.lines,
+        "bytes": size,
+        "seed": args.seed,
+        "mix": args.mix,
+        "events": events,
+        "lines_per_sec": args.lines / elapsed,
+        "mb_per_sec": size / elapsed / 1e6,
+        "p50_ns": percentile(latencies, 0.50),
+        "p99_ns": percentile(latencies, 0.99),
+        "max_ns": latencies[-1],
+        "peak_bytes": peak,
+        "types": {
+            name: {
+                "lines": len(costs),
+                "mean_ns": sum(costs) / len(costs),
+                "share": sum(costs) / total_ns,
+            }
+            for name, costs in sorted(by_type.items())
+        },
+    }
+
+
+def report(result: dict, baseline: dict | None) -> str:
+    def compare(key: str) -> str:
+        if not baseline or not baseline.get(key):
+            return ""
+        return f"  ({result[key] / baseline[key]:.2f}x baseline)"
+
+    out = [
+        f"{result['lines']:,} lines ({result['bytes'] / 1e6:.1f} MB), seed {result['seed']}, "
+        f"{result['events']:,} events",
+        f"throughput:   {result['lines_per_sec']:12,.0f} lines/sec"
+        + compare("lines_per_sec"),
+        f"              {result['mb_per_sec']:12,.1f} MB/sec",
+        f"p50 latency:  {result['p50_ns'] / 1000:12,.2f} µs/line" + compare("p50_ns"),
+        f"p99 latency:  {result['p99_ns'] / 1000:12,.2f} µs/line" + compare("p99_ns"),
+        f"peak memory:  {result['peak_bytes'] / 1e6:12,.2f} MB" + compare("peak_bytes"),
+        "",
+        f"{'event type':<20}{'lines':>10}{'mean µs':>10}{'share':>8}",
+    ]
+    for name, stats in result["types"].items():
+        out.append(
+            f"{name:<20}{stats['lines']:>10,}{stats['mean_ns'] / 1000:>10.2f}{stats['share']:>8.1%}"
+        )
+    return "\n".join(out) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lines", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="compare against results saved with --json")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    result = run(args)
+    sys.__stdout__.write(report(result, baseline))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Synthesizes ShooterGame.log traffic for benchmarks: player joins and leaves,
+deaths, tames, global chat and the tribe log noise that makes up most of a
+real server log. Output is fully determined by the seed.
+
+Write a 500k line log:
+
+    python benchmarks/log_generator.py ShooterGame.log --lines 500000
+
+Append to a log at 200 lines/sec, e.g. to watch a running monitor:
+
+    python benchmarks/log_generator.py ShooterGame.log --lines 60000 --rate 200
+"""
+
+import argparse
+import datetime
+import random
+import time
+from typing import Iterator
+
+DEFAULT_MIX = {
+    "noise": 90,
+    "join": 2,
+    "leave": 2,
+    "death": 2,
+    "tame": 2,
+    "chat": 2,
+}
+
+PLAYERS = ["Bob", "Alice", "Grug", "xXRexSlayerXx", "Mia", "Tomás", "Ōkami", "Lee"]
+TRIBES = ["Brohalla", "Sparrows", "The Swamp Rats", "Tribe of Mia", "Night Owls"]
+DINOS = [
+    "Raptor",
+    "Anglerfish",
+    "Rex",
+    "Argentavis",
+    "Ankylosaurus",
+    "Giganotosaurus",
+    "Dodo",
+]
+STRUCTURES = ["Wooden Wall", "Thatch Foundation", "Stone Ceiling", "Metal Gateway"]
+CHAT = [
+    "anyone want to trade metal?",
+    "lol",
+    "where do I find obsidian",
+    "rex down at the swamp, careful",
+    "gg",
+    "who's online tonight? need help with the broodmother: bring cryos",
+]
+
+
+class LogGenerator:
+    """
+    Produces timestamped ShooterGame.log lines with the given mix of line
+    kinds (relative weights).
+    """
+
+    def __init__(self, seed: int = 0, mix: dict[str, int] | None = None):
+        self.rng = random.Random(seed)
+        self.mix = mix or DEFAULT_MIX
+        self.clock = datetime.datetime(2023, 11, 21, 21, 7, 55)
+        self.frame = 0
+        self.day = 12
+
+    def _prefix(self) -> str:
+        self.clock += datetime.timedelta(milliseconds=self.rng.randint(0, 400))
+        self.frame = (self.frame + 1) % 1000
+        stamp = self.clock.strftime("%Y.%m.%d-%H.%M.%S")
+        ms = self.clock.microsecond // 1000
+        return f"[{stamp}:{ms:03d}][{self.frame:3d}]{self.clock:%Y.%m.%d_%H.%M.%S}: "
+
+    def _tribe_prefix(self, tribe: str) -> str:
+        rng = self.rng
+        return (
+            f"Tribe {tribe}, ID {rng.randint(100000000, 999999999)}: Day {self.day}, "
+            f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}: "
+        )
+
+    def noise(self) -> str:
+        rng = self.rng
+        player, tribe = rng.choice(PLAYERS), rng.choice(TRIBES)
+        return rng.choice(
+            [
+                lambda: self._tribe_prefix(tribe)
+                + f"<RichColor Color=\"1, 1, 0, 1\">{player} demolished a '{rng.choice(STRUCTURES)}'!</>",
+                lambda: self._tribe_prefix(tribe)
+                + f"{player} unclaimed '{rng.choice(DINOS)} - Lvl {rng.randint(1, 150)}'",
+                lambda: self._tribe_prefix(tribe)
+                + f"{player} placed a '{rng.choice(STRUCTURES)}'",
+                lambda: self._tribe_prefix(tribe)
+                + f'<RichColor Color="0, 1, 0, 1">Your {rng.choice(DINOS)} - Lvl {rng.randint(1, 150)} starved to death!</>',
+                lambda: "AdminCmd: ListPlayers (PlayerName: , ARKID: , SteamID: )",
+                lambda: 'Server: "MyArkServer" has successfully started!',
+                lambda: f"Log file open, {self.clock:%m/%d/%y %H:%M:%S}",
+            ]
+        )()
+
+    def join(self) -> str:
+        player = self.rng.choice(PLAYERS)
+        return f"{player} ID {self.rng.randint(100000000, 999999999)} joined this ARK!"
+
+    def leave(self) -> str:
+        player = self.rng.choice(PLAYERS)
+        return f"{player} ID {self.rng.randint(100000000, 999999999)} left this ARK!"
+
+    def death(self) -> str:
+        rng = self.rng
+        player, tribe = rng.choice(PLAYERS), rng.choice(TRIBES)
+        killer = ""
+        if rng.random() < 0.8:
+            killer = f" by a {rng.choice(DINOS)} - Lvl {rng.randint(1, 300)}"
+        return (
+            self._tribe_prefix(tribe)
+            + f'<RichColor Color="1, 0, 0, 1">Tribemember {player} - Lvl {rng.randint(1, 105)} was killed{killer}!</>)'
+        )
+
+    def tame(self) -> str:
+        rng = self.rng
+        dino = rng.choice(DINOS)
+        article = "an" if dino[0] in "AEIOU" else "a"
+        tamer = f"{rng.choice(PLAYERS)} of " if rng.random() < 0.5 else ""
+        return f"{tamer}Tribe {rng.choice(TRIBES)} Tamed {article} {dino} - Lvl {rng.randint(1, 300)} ({dino})!"
+
+    def chat(self) -> str:
+        player = self.rng.choice(PLAYERS)
+        return f"{player.lower()}{self.rng.randint(1, 999)} ({player}): {self.rng.choice(CHAT)}"
+
+    def lines(self, count: int) -> Iterator[str]:
+        kinds = self.rng.choices(
+            list(self.mix), weights=list(self.mix.values()), k=count
+        )
+        for kind in kinds:
+            yield self._prefix() + getattr(self, kind)() + "\n"
+
+
+def generate_lines(
+    count: int, seed: int = 0, mix: dict[str, int] | None = None
+) -> list[str]:
+    return list(LogGenerator(seed, mix).lines(count))
+
+
+def write_log(
+    path: str,
+    count: int,
+    seed: int = 0,
+    mix: dict[str, int] | None = None,
+    rate: float | None = None,
+) -> int:
+    """
+    Appends ``count`` generated lines to ``path``, flushed in batches of
+    ``rate`` lines once a second when a rate is given.
+
+    :return: The number of bytes written.
+    """
+    written = 0
+    batch = max(1, int(rate)) if rate else count
+    lines = LogGenerator(seed, mix).lines(count)
+    with open(path, "ab") as f:
+        while True:
+            started = time.monotonic()
+            data = "".join(line for _, line in zip(range(batch), lines)).encode()
+            if not data:
+                return written
+            f.write(data)
+            f.flush()
+            written += len(data)
+            if rate:
+                time.sleep(max(0, 1 - (time.monotonic() - started)))
+
+
+def parse_mix(value: str) -> dict[str, int]:
+    """Parses ``"noise=90,join=2,..."``; kinds that aren't named keep their default weight."""
+    mix = dict(DEFAULT_MIX)
+    for item in filter(None, value.split(",")):
+        kind, _, weight = item.partition("=")
+        if kind not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(
+                f"Unknown line kind '{kind}', expected one of {list(DEFAULT_MIX)}"
+            )
+        mix[kind] = int(weight)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("path")
+    parser.add_argument("--lines", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX)
+    parser.add_argument(
+        "--rate", type=float, help="lines per second (default: all at once)"
+    )
+    args = parser.parse_args()
+
+    written = write_log(args.path, args.lines, args.seed, args.mix, args.rate)
+    print(f"Wrote {args.lines:,} lines ({written:,} bytes) to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
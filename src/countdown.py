@@ -0,0 +1,122 @@
+import threading
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Any, Callable
+
+from logger import get_logger
+from scheduler import ScheduledItem, Scheduler
+
+logger = get_logger(__name__)
+
+
+def warning_message(
+    description: str, warning_minute: int, at: str, extra: str = ""
+) -> str:
+    msg = f"Warning: {description} will occur in {warning_minute} {'minute' if warning_minute == 1 else 'minutes'} at approximately {at}"
+    if extra:
+        msg += f", ({extra})"
+    return msg + "."
+
+
+class Countdown:
+    """
+    Counts down to an action on a scheduler, calling ``on_warning`` at each
+    warning minute and ``on_finish`` at the end, without blocking anything.
+
+    Everything that asked for the countdown is kept as a "subject". If another
+    subject arrives while a countdown is running, it joins that countdown
+    instead of starting its own, so the action happens once for all of them.
+    """
+
+    def __init__(
+        self,
+        scheduler: Scheduler,
+        on_warning: Callable[[int, list[Any]], None],
+        on_finish: Callable[[list[Any]], None],
+        name: str = "countdown",
+    ):
+        self.scheduler = scheduler
+        self.on_warning = on_warning
+        self.on_finish = on_finish
+        self.name = name
+        self.deadline: datetime | None = None
+        self._subjects: list[Any] = []
+        self._items: list[ScheduledItem] = []
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return self.deadline is not None
+
+    @property
+    def subjects(self) -> list[Any]:
+        with self._lock:
+            return list(self._subjects)
+
+    def start(self, subject: Any, warning_times: list[int]) -> bool:
+        """
+        Starts counting down from the largest warning time (in minutes), or
+        adds ``subject`` to the countdown that is already running.
+
+        :return: True if a new countdown was started.
+        """
+        with self._lock:
+            if subject not in self._subjects:
+                self._subjects.append(subject)
+            if self.deadline is not None:
+                logger.info(
+                    f"Joined the {self.name} ending at {self.deadline}: {subject}"
+                )
+                return False
+            warning_times = sorted(set(warning_times), reverse=True)
+            now = datetime.now()
+            self.deadline = now + timedelta(
+                minutes=warning_times[0] if warning_times else 0
+            )
+            for warning_minute in warning_times:
+                self._items.append(
+                    self.scheduler.schedule(
+                        self.deadline - timedelta(minutes=warning_minute),
+                        partial(self._warn, warning_minute),
+                        f"{self.name} warning",
+                    )
+                )
+            self._items.append(
+                self.scheduler.schedule(self.deadline, self._finish, self.name)
+            )
+            logger.info(
+                f"Started the {self.name}, ending at {self.deadline}: {subject}"
+            )
+            return True
+
+    def _reset(self) -> list[Any]:
+        for item in self._items:
+            item.cancel()
+        subjects = self._subjects
+        self._items = []
+        self._subjects = []
+        self.deadline = None
+        return subjects
+
+    def cancel(self) -> list[Any]:
+        """
+        Stops the countdown without running the action.
+
+        :return: The subjects that were waiting on it.
+        """
+        with self._lock:
+            if self.deadline is not None:
+                logger.info(f"Cancelled the {self.name}")
+            return self._reset()
+
+    def _warn(self, warning_minute: int) -> None:
+        with self._lock:
+            subjects = list(self._subjects)
+        if subjects:
+            self.on_warning(warning_minute, subjects)
+
+    def _finish(self) -> None:
+        with self._lock:
+            subjects = self._reset()
+        if subjects:
+            self.on_finish(subjects)
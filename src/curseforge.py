@@ -0,0 +1,212 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import CONFIG, OUTDIR
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_BASE_URL = "https://api.curseforge.com"
+HTTP_TIMEOUT = 30  # seconds to wait for CurseForge to connect or respond
+CACHE_PATH = os.path.join(OUTDIR, "curseforge_cache.json")
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class CurseForgeClient:
+    """
+    Fetches mod metadata from the CurseForge API.
+
+    Mod ids are requested in batches of at most ``batch_size``, several at a
+    time, over one keep-alive session. A failed batch is retried with
+    exponential backoff, except on client errors (4xx other than 429).
+    Responses are cached per mod in ``cache_path`` for ``cache_ttl``
+    seconds, so checks that run close together (the mod update task and a
+    server start) only fetch the mods they haven't seen recently.
+    """
+
+    def __init__(
+        self,
+        api_key: Callable[[], str | None],
+        base_url: str = DEFAULT_BASE_URL,
+        batch_size: int = 50,
+        workers: int = 4,
+        cache_path: str | None = None,
+        cache_ttl: float = 3600,
+        retries: int = 3,
+        backoff: float = 1,
+        timeout: float = HTTP_TIMEOUT,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.batch_size = batch_size
+        self.workers = workers
+        self.cache_path = cache_path
+        self.cache_ttl = cache_ttl
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=workers))
+        self.session.mount("http://", HTTPAdapter(pool_maxsize=workers))
+        self._cache: dict[str, dict] | None = None  # mod id -> fetched_at, data
+        self._cache_lock = threading.Lock()
+
+    def _load_cache(self) -> dict[str, dict]:
+        if self._cache is None:
+            self._cache = {}
+            if self.cache_path and os.path.isfile(self.cache_path):
+                try:
+                    with open(self.cache_path) as f:
+                        cache = json.load(f)
+                    if isinstance(cache, dict):
+                        self._cache = cache
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Ignoring unreadable CurseForge cache: {e}")
+        return self._cache
+
+    def _save_cache(self) -> None:
+        if not self.cache_path:
+            return
+        tmp_path = self.cache_path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(self._cache, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            logger.error(f"Error saving the CurseForge cache: {e}")
+
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        :raises requests.RequestException: If the request still fails after all retries.
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.request(
+                    method, url, timeout=self.timeout, **kwargs
+                )
+                response.raise_for_status()
+                return response
+            except requests.RequestException as e:
+                status = e.response.status_code if e.response is not None else None
+                if (
+                    attempt == self.retries
+                    or status is not None
+                    and 400 <= status < 500
+                    and status != 429
+                ):
+                    raise
+                delay = self.backoff * 2**attempt
+                logger.warning(
+                    f"CurseForge request failed ({e}), retrying in {delay:.0f}s"
+                )
+                time.sleep(delay)
+
+    def _api(self, method: str, path: str, **kwargs) -> dict:
+        headers = {
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+            "x-api-key": self.api_key(),
+        }
+        return self._request(
+            method, f"{self.base_url}{path}", headers=headers, **kwargs
+        ).json()
+
+    def _post_batch(self, mod_ids: list[int]) -> list[dict]:
+        payload = {"modIds": mod_ids, "filterPcOnly": True}
+        return self._api("POST", "/v1/mods", json=payload).get("data", [])
+
+    def get_file(self, mod_id: int, file_id: int) -> dict:
+        """
+        A file of a mod, from the files API.
+
+        :raises requests.RequestException: If CurseForge can't be reached or returns an error.
+        """
+        return self._api("GET", f"/v1/mods/{mod_id}/files/{file_id}")["data"]
+
+    def download(self, url: str, path: str) -> None:
+        """
+        Downloads a mod file to ``path``. The API key isn't sent, since files
+        are served from a CDN.
+
+        :raises requests.RequestException: If the file can't be downloaded.
+        """
+        tmp_path = path + ".part"
+        with self._request("GET", url, stream=True) as response:
+            with open(tmp_path, "wb") as f:
+                for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+        os.replace(tmp_path, path)
+
+    def get_mods(
+        self, mod_ids: list[int], max_age: float | None = None
+    ) -> dict[int, dict]:
+        """
+        The CurseForge metadata of each mod, from the cache if it was fetched
+        less than ``max_age`` (by default ``cache_ttl``) seconds ago. Mods
+        CurseForge doesn't know are left out.
+
+        :raises requests.RequestException: If CurseForge can't be reached or returns an error.
+        """
+        max_age = self.cache_ttl if max_age is None else max_age
+        now = time.time()
+        mods = {}
+        with self._cache_lock:
+            cache = self._load_cache()
+            for mod_id in dict.fromkeys(mod_ids):
+                cached = cache.get(str(mod_id))
+                if cached is not None and now - cached["fetched_at"] < max_age:
+                    mods[mod_id] = cached["data"]
+        missing = [mod_id for mod_id in dict.fromkeys(mod_ids) if mod_id not in mods]
+        if not missing:
+            return mods
+
+        batches = [
+            missing[i : i + self.batch_size]
+            for i in range(0, len(missing), self.batch_size)
+        ]
+        with ThreadPoolExecutor(
+            min(self.workers, len(batches)), thread_name_prefix="curseforge"
+        ) as executor:
+            results = list(executor.map(self._post_batch, batches))
+        logger.debug(
+            f"Fetched {len(missing)} mods from CurseForge in {len(batches)} batches, "
+            f"{len(mods)} from the cache"
+        )
+
+        fetched_at = time.time()
+        with self._cache_lock:
+            cache = self._load_cache()
+            for mod in (mod for batch in results for mod in batch):
+                mods[int(mod["id"])] = mod
+                cache[str(mod["id"])] = {"fetched_at": fetched_at, "data": mod}
+            self._save_cache()
+        return mods
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_curseforge_client(api_key: Callable[[], str | None]) -> CurseForgeClient:
+    """Returns the shared client, configured by ``advanced.curseforge``."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            client_config = CONFIG["advanced"].get("curseforge", {}) or {}
+            _client = CurseForgeClient(
+                api_key,
+                base_url=client_config.get("base_url") or DEFAULT_BASE_URL,
+                batch_size=client_config.get("batch_size", 50),
+                workers=client_config.get("workers", 4),
+                cache_path=CACHE_PATH,
+                cache_ttl=client_config.get("cache_ttl", 3600),
+                retries=client_config.get("retries", 3),
+            )
+        return _client
@@ -0,0 +1,189 @@
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from config import CONFIG
+from logger import get_logger
+
+if TYPE_CHECKING:
+    from log_monitor import LogEvent
+
+logger = get_logger(__name__)
+
+DROP_POLICIES = ("block", "drop_newest", "drop_oldest")
+
+
+@dataclass
+class SinkStats:
+    handled: int = 0
+    failed: int = 0
+    dropped: int = 0
+    total_latency: float = 0.0
+    max_latency: float = 0.0
+    total_queue_delay: float = 0.0
+
+    @property
+    def avg_latency(self) -> float:
+        done = self.handled + self.failed
+        return self.total_latency / done if done else 0.0
+
+    @property
+    def avg_queue_delay(self) -> float:
+        done = self.handled + self.failed
+        return self.total_queue_delay / done if done else 0.0
+
+
+class EventDispatcher:
+    """
+    Runs the side effects of classified log events (Discord posts, RCON
+    replies) on a pool of worker threads, so that slow network calls never
+    hold up log tailing.
+
+    Each worker owns a bounded queue, and events are routed by their
+    ``ordering_key``, which keeps e.g. join/leave messages in log order. When a
+    queue is full, ``drop_policy`` decides whether the tailer blocks
+    (``block``), the new event is dropped (``drop_newest``), or the oldest
+    queued event makes room for it (``drop_oldest``).
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        queue_size: int = 1000,
+        drop_policy: str = "drop_oldest",
+    ):
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(
+                f"Unknown drop policy '{drop_policy}', expected one of {DROP_POLICIES}"
+            )
+        self.drop_policy = drop_policy
+        self._queues = [queue.Queue(maxsize=queue_size) for _ in range(max(1, workers))]
+        self._threads: list[threading.Thread] = []
+        self._stats: dict[str, SinkStats] = {}
+        self._stats_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls) -> "EventDispatcher":
+        dispatch_config = CONFIG["advanced"].get("event_dispatch", {}) or {}
+        return cls(
+            workers=dispatch_config.get("workers", 2),
+            queue_size=dispatch_config.get("queue_size", 1000),
+            drop_policy=dispatch_config.get("drop_policy", "drop_oldest"),
+        )
+
+    def _sink_stats(self, sink: str) -> SinkStats:
+        if sink not in self._stats:
+            self._stats[sink] = SinkStats()
+        return self._stats[sink]
+
+    def start(self) -> None:
+        for index, event_queue in enumerate(self._queues):
+            thread = threading.Thread(
+                target=self._work,
+                args=(event_queue,),
+                name=f"event-dispatch-{index}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, event: "LogEvent") -> bool:
+        """
+        Queues an event for handling.
+
+        :return: False if the event was dropped because its queue was full.
+        """
+        event_queue = self._queues[hash(event.ordering_key) % len(self._queues)]
+        item = (time.perf_counter(), event)
+        if self.drop_policy == "block":
+            event_queue.put(item)
+            return True
+        while True:
+            try:
+                event_queue.put_nowait(item)
+                return True
+            except queue.Full:
+                if self.drop_policy == "drop_newest":
+                    self._record_drop(event)
+                    return False
+            try:
+                _, dropped = event_queue.get_nowait()
+                event_queue.task_done()
+                self._record_drop(dropped)
+            except queue.Empty:
+                pass
+
+    def _record_drop(self, event: "LogEvent") -> None:
+        sink = type(event).__name__
+        with self._stats_lock:
+            stats = self._sink_stats(sink)
+            stats.dropped += 1
+            dropped = stats.dropped
+        if dropped == 1 or dropped % 100 == 0:
+            logger.warning(f"Event queue full, dropped {dropped} {sink} events so far")
+
+    def _work(self, event_queue: queue.Queue) -> None:
+        while True:
+            item = event_queue.get()
+            if item is None:
+                event_queue.task_done()
+                return
+            queued_at, event = item
+            started = time.perf_counter()
+            try:
+                event.handle()
+                failed = False
+            except Exception as e:
+                logger.error(f"Error handling {type(event).__name__}: {e}")
+                failed = True
+            finished = time.perf_counter()
+            with self._stats_lock:
+                stats = self._sink_stats(type(event).__name__)
+                if failed:
+                    stats.failed += 1
+                else:
+                    stats.handled += 1
+                stats.total_latency += finished - started
+                stats.max_latency = max(stats.max_latency, finished - started)
+                stats.total_queue_delay += started - queued_at
+            event_queue.task_done()
+
+    def join(self) -> None:
+        """Blocks until every queued event has been handled."""
+        for event_queue in self._queues:
+            event_queue.join()
+
+    def stop(self, timeout: float | None = None) -> None:
+        """
+        Stops the workers once they have handled the events already queued.
+
+        :param timeout: Seconds to wait for all workers together. A worker
+            stuck in a handler with a full queue is given up on after it
+            rather than holding up shutdown (its thread is a daemon).
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        def remaining() -> float | None:
+            return None if deadline is None else max(0, deadline - time.monotonic())
+
+        for index, event_queue in enumerate(self._queues):
+            try:
+                event_queue.put(None, timeout=remaining())
+            except queue.Full:
+                logger.warning(f"Event worker {index} is stuck, not waiting for it")
+        for thread in self._threads:
+            thread.join(remaining())
+        self._threads = []
+        for sink, stats in self.stats().items():
+            logger.debug(
+                f"{sink}: {stats.handled} handled, {stats.failed} failed, {stats.dropped} dropped, "
+                f"avg {stats.avg_latency * 1000:.1f} ms, max {stats.max_latency * 1000:.1f} ms"
+            )
+
+    def stats(self) -> dict[str, SinkStats]:
+        with self._stats_lock:
+            return {
+                sink: SinkStats(**vars(stats)) for sink, stats in self._stats.items()
+            }
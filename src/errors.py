@@ -22,3 +22,31 @@ class ArkServerStartError(ArkServerException):
 
 class ArkServerStopError(ArkServerException):
     pass
+
+
+class RCONError(Exception):
+    pass
+
+
+class RCONAuthError(RCONError):
+    pass
+
+
+class KeyValuesError(Exception):
+    pass
+
+
+class ModCacheError(Exception):
+    pass
+
+
+class ModPrefetchError(Exception):
+    pass
+
+
+class SteamCmdError(Exception):
+    pass
+
+
+class SteamCmdStalledError(SteamCmdError):
+    pass
@@ -0,0 +1,267 @@
+import hashlib
+import json
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from config import CONFIG, OUTDIR
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+SEGMENT_CHUNKS = 64  # chunks hashed per task, so large files are split across workers
+
+# Not part of the installed game content
+DEFAULT_EXCLUDE = (
+    "ShooterGame/Saved",
+    "ShooterGame/Binaries/Win64/ShooterGame/Mods",
+    "ShooterGame/Binaries/Win64/ShooterGame/ModsUserData",
+    "steamapps",
+)
+
+
+@dataclass
+class FileRecord:
+    size: int
+    mtime_ns: int
+    chunks: list[str]
+
+
+@dataclass
+class Drift:
+    """How an install differs from its content manifest."""
+
+    missing: list[str] = field(default_factory=list)
+    changed: list[str] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.missing or self.changed)
+
+    def __str__(self) -> str:
+        return f"{len(self.missing)} missing and {len(self.changed)} changed files"
+
+
+@dataclass
+class ContentManifest:
+    """Size, mtime and chunk hashes of every file of a known-good install."""
+
+    files: dict[str, FileRecord] = field(default_factory=dict)
+    chunk_size: int = CHUNK_SIZE
+
+    @classmethod
+    def load(cls, path: str) -> "ContentManifest | None":
+        """:return: The manifest, or None if there is none or it can't be read."""
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            return cls(
+                {
+                    name: FileRecord(
+                        record["size"], record["mtime_ns"], record["chunks"]
+                    )
+                    for name, record in data["files"].items()
+                },
+                data["chunk_size"],
+            )
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable install manifest {path}: {e}")
+            return None
+
+    def save(self, path: str) -> None:
+        data = {
+            "chunk_size": self.chunk_size,
+            "files": {
+                name: {
+                    "size": record.size,
+                    "mtime_ns": record.mtime_ns,
+                    "chunks": record.chunks,
+                }
+                for name, record in self.files.items()
+            },
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+
+def _excluded(name: str, exclude: tuple[str, ...]) -> bool:
+    name = name.lower()
+    return any(
+        name == path.lower() or name.startswith(path.lower() + "/") for path in exclude
+    )
+
+
+def _scan(root: str, exclude: tuple[str, ...]) -> dict[str, os.stat_result]:
+    """Stats every file under ``root``, by its path relative to root (with /)."""
+    files = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        reldir = os.path.relpath(dirpath, root).replace(os.sep, "/")
+        reldir = "" if reldir == "." else reldir + "/"
+        dirnames[:] = [d for d in dirnames if not _excluded(reldir + d, exclude)]
+        for filename in filenames:
+            if not _excluded(reldir + filename, exclude):
+                files[reldir + filename] = os.stat(os.path.join(dirpath, filename))
+    return files
+
+
+def _hash_segment(path: str, first: int, count: int, chunk_size: int) -> list[str]:
+    """Hashes ``count`` chunks of a file starting at chunk ``first``, through mmap."""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        view = memoryview(m)
+        try:
+            return [
+                # hashlib releases the GIL on large buffers, so threads hash in parallel
+                hashlib.blake2b(
+                    view[i * chunk_size : (i + 1) * chunk_size], digest_size=16
+                ).hexdigest()
+                for i in range(first, min(first + count, -(-len(m) // chunk_size)))
+            ]
+        finally:
+            view.release()
+
+
+def _hash_files(
+    root: str,
+    sizes: dict[str, int],
+    chunk_size: int,
+    workers: int | None,
+) -> dict[str, list[str]]:
+    """Hashes the chunks of the given files (by size) in parallel."""
+    hashes: dict[str, list[str]] = {name: [] for name in sizes}
+    with ThreadPoolExecutor(workers, thread_name_prefix="integrity") as executor:
+        segments = [
+            (
+                name,
+                executor.submit(
+                    _hash_segment,
+                    os.path.join(root, name),
+                    first,
+                    SEGMENT_CHUNKS,
+                    chunk_size,
+                ),
+            )
+            for name, size in sizes.items()
+            for first in range(0, -(-size // chunk_size), SEGMENT_CHUNKS)
+        ]
+        for name, segment in segments:
+            hashes[name] += segment.result()
+    return hashes
+
+
+def record(
+    root: str,
+    previous: ContentManifest | None = None,
+    exclude: tuple[str, ...] = DEFAULT_EXCLUDE,
+    workers: int | None = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> ContentManifest:
+    """
+    Records the content of a known-good install. Files whose size and mtime
+    match ``previous`` keep their hashes there instead of being hashed again.
+    """
+    stats = _scan(root, exclude)
+    manifest = ContentManifest(chunk_size=chunk_size)
+    to_hash = {}
+    for name, stat in stats.items():
+        old = previous.files.get(name) if previous else None
+        if (
+            old is not None
+            and previous.chunk_size == chunk_size
+            and (old.size, old.mtime_ns) == (stat.st_size, stat.st_mtime_ns)
+        ):
+            manifest.files[name] = old
+        else:
+            to_hash[name] = stat.st_size
+    for name, chunks in _hash_files(root, to_hash, chunk_size, workers).items():
+        manifest.files[name] = FileRecord(
+            stats[name].st_size, stats[name].st_mtime_ns, chunks
+        )
+    logger.debug(f"Recorded {len(stats)} files of {root}, hashed {len(to_hash)}")
+    return manifest
+
+
+def verify(
+    root: str,
+    manifest: ContentManifest,
+    full: bool = False,
+    workers: int | None = None,
+) -> Drift:
+    """
+    Compares an install with its manifest. A file with the recorded size and
+    mtime is taken to be unchanged, unless ``full``; any other file of the
+    recorded size is hashed. Files that aren't in the manifest are ignored.
+    """
+    drift = Drift()
+    to_hash = {}
+    for name, expected in manifest.files.items():
+        try:
+            stat = os.stat(os.path.join(root, name))
+        except FileNotFoundError:
+            drift.missing.append(name)
+            continue
+        if stat.st_size != expected.size:
+            drift.changed.append(name)
+        elif full or stat.st_mtime_ns != expected.mtime_ns:
+            to_hash[name] = stat.st_size
+    hashes = _hash_files(root, to_hash, manifest.chunk_size, workers)
+    for name, chunks in hashes.items():
+        if chunks != manifest.files[name].chunks:
+            drift.changed.append(name)
+    return drift
+
+
+def manifest_path(install_dir: str) -> str:
+    """Where the manifest of an install is kept, one per install directory."""
+    key = os.path.normcase(os.path.abspath(install_dir)).encode("utf-8")
+    digest = hashlib.blake2b(key, digest_size=8).hexdigest()
+    return os.path.join(OUTDIR, f"install_manifest_{digest}.json")
+
+
+def _integrity_config() -> dict:
+    return CONFIG["advanced"].get("integrity", {}) or {}
+
+
+def needs_validate(install_dir: str) -> bool:
+    """
+    Whether steamcmd should validate an install: when there's no manifest of
+    it to check it against, or when it has drifted from the manifest.
+    """
+    integrity_config = _integrity_config()
+    if not integrity_config.get("enable", True):
+        return True
+    manifest = ContentManifest.load(manifest_path(install_dir))
+    if manifest is None:
+        logger.info("No install manifest yet, validating the install")
+        return True
+    try:
+        drift = verify(install_dir, manifest, workers=integrity_config.get("workers"))
+    except OSError as e:
+        logger.warning(f"Error verifying the install, validating it: {e}")
+        return True
+    if drift:
+        logger.warning(f"The install has drifted ({drift}), validating it")
+        return True
+    logger.info("The install matches its manifest, skipping validation")
+    return False
+
+
+def record_install(install_dir: str) -> None:
+    """Records an install that steamcmd just brought up to date."""
+    integrity_config = _integrity_config()
+    if not integrity_config.get("enable", True):
+        return
+    path = manifest_path(install_dir)
+    try:
+        manifest = record(
+            install_dir,
+            ContentManifest.load(path),
+            workers=integrity_config.get("workers"),
+        )
+        manifest.save(path)
+    except OSError as e:
+        logger.error(f"Error recording the install manifest: {e}")
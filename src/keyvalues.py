@@ -0,0 +1,192 @@
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from io import StringIO
+from typing import Any, Iterator, TextIO
+
+from errors import KeyValuesError
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+# Quoted string (with escapes), braces, or a bare token. Whitespace, comments
+# and conditionals like [$WIN32] are skipped.
+_TOKEN = re.compile(
+    r"""
+    \s+ | //[^\n]* | \[[^\]\n]*\]
+    | "(?P<quoted>(?:[^"\\]|\\.)*)"
+    | (?P<brace>[{}])
+    | (?P<bare>[^\s"{}]+)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+_ESCAPES = {"n": "\n", "t": "\t", "\\": "\\", '"': '"'}
+_ESCAPE = re.compile(r"\\(.)")
+
+_READ_SIZE = 64 * 1024
+
+STATE_FULLY_INSTALLED = 4  # AppState.StateFlags bit
+
+
+def _unescape(value: str) -> str:
+    if "\\" not in value:
+        return value
+    return _ESCAPE.sub(lambda m: _ESCAPES.get(m.group(1), m.group(0)), value)
+
+
+def _tokens(fp: TextIO) -> Iterator[tuple[str, str | None]]:
+    """
+    Yields ``("s", text)`` for each key or value and ``("{", None)`` or
+    ``("}", None)`` for braces, reading ``fp`` in chunks.
+    """
+    buffer = ""
+    eof = False
+    while True:
+        if not eof:
+            chunk = fp.read(_READ_SIZE)
+            eof = not chunk
+            buffer += chunk
+        position = 0
+        while position < len(buffer):
+            match = _TOKEN.match(buffer, position)
+            # A token touching the end of the buffer may continue in the next chunk
+            if not eof and (match is None or match.end() == len(buffer)):
+                break
+            if match is None:
+                raise KeyValuesError(f"Unterminated string: {buffer[position:][:40]!r}")
+            position = match.end()
+            if match.group("quoted") is not None:
+                yield ("s", _unescape(match.group("quoted")))
+            elif match.group("brace"):
+                yield (match.group("brace"), None)
+            elif match.group("bare"):
+                yield ("s", match.group("bare"))
+        buffer = buffer[position:]
+        if eof:
+            return
+
+
+def load(fp: TextIO) -> dict[str, Any]:
+    """
+    Parses Valve KeyValues text (VDF, ACF) from a file object, reading it in
+    chunks. Nested sections become dicts; a repeated key keeps its last value.
+
+    :raises KeyValuesError: If the text is malformed.
+    """
+    root: dict[str, Any] = {}
+    stack = [root]
+    key = None
+    for kind, text in _tokens(fp):
+        if kind == "s":
+            if key is None:
+                key = text
+            else:
+                stack[-1][key] = text
+                key = None
+        elif kind == "{":
+            if key is None:
+                raise KeyValuesError("Section without a name")
+            section = {}
+            stack[-1][key] = section
+            stack.append(section)
+            key = None
+        else:
+            if key is not None or len(stack) == 1:
+                raise KeyValuesError("Unexpected '}'")
+            stack.pop()
+    if key is not None or len(stack) != 1:
+        raise KeyValuesError("Unexpected end of input")
+    return root
+
+
+def loads(text: str) -> dict[str, Any]:
+    return load(StringIO(text))
+
+
+_cache: dict[str, tuple[tuple[int, int], dict[str, Any]]] = {}
+_cache_lock = threading.Lock()
+
+
+def load_cached(path: str) -> dict[str, Any]:
+    """
+    Parses a KeyValues file, reusing the previous result as long as the file's
+    mtime and size are unchanged. The result is shared and must not be
+    modified.
+
+    :raises OSError: If the file can't be read.
+    :raises KeyValuesError: If the file is malformed.
+    """
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _cache_lock:
+        cached = _cache.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        data = load(f)
+    with _cache_lock:
+        _cache[path] = (signature, data)
+    return data
+
+
+@dataclass
+class InstalledDepot:
+    depot_id: int
+    manifest: str
+    size: int
+
+
+@dataclass
+class AppManifest:
+    """The parts of a Steam ``appmanifest_<appid>.acf`` the suite uses."""
+
+    app_id: int
+    name: str
+    install_dir: str
+    build_id: str
+    size_on_disk: int
+    last_updated: datetime | None
+    state_flags: int
+    depots: dict[int, InstalledDepot] = field(default_factory=dict)
+
+    @property
+    def fully_installed(self) -> bool:
+        return bool(self.state_flags & STATE_FULLY_INSTALLED)
+
+    @classmethod
+    def from_keyvalues(cls, data: dict[str, Any]) -> "AppManifest":
+        state = data.get("AppState")
+        if not isinstance(state, dict):
+            raise KeyValuesError("Not an app manifest: no AppState section")
+        depots = {}
+        for depot_id, depot in (state.get("InstalledDepots") or {}).items():
+            if isinstance(depot, dict):
+                depots[int(depot_id)] = InstalledDepot(
+                    int(depot_id),
+                    depot.get("manifest", ""),
+                    int(depot.get("size", 0)),
+                )
+        last_updated = int(state.get("LastUpdated", 0))
+        return cls(
+            app_id=int(state.get("appid", 0)),
+            name=state.get("name", ""),
+            install_dir=state.get("installdir", ""),
+            build_id=state.get("buildid", ""),
+            size_on_disk=int(state.get("SizeOnDisk", 0)),
+            last_updated=datetime.fromtimestamp(last_updated) if last_updated else None,
+            state_flags=int(state.get("StateFlags", 0)),
+            depots=depots,
+        )
+
+
+def read_app_manifest(path: str) -> AppManifest:
+    """
+    :raises OSError: If the manifest can't be read.
+    :raises KeyValuesError: If it isn't a valid app manifest.
+    """
+    try:
+        return AppManifest.from_keyvalues(load_cached(path))
+    except ValueError as e:
+        raise KeyValuesError(f"Invalid app manifest {path}: {e}") from e
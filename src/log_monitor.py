@@ -1,42 +1,89 @@
+import json
 import os
 import re
+import time
 from collections import namedtuple
 
-from config import CONFIG
+from config import CONFIG, OUTDIR
+from dispatcher import EventDispatcher
+from log_tailer import LogTailer
 from logger import get_logger
-from rcon import get_active_players, send_message_to_player, send_to_discord
+from rcon import send_message_to_player, send_to_discord
+from roster import ROSTER, online_player_count
 
 logger = get_logger(__name__)
 
 
 class LogEventFactory:
     event_types = []
+    _trigger_pattern = None
+    _trigger_owners: dict[str, list[int]] = {}
+    _untriggered: list[int] = []
 
     @classmethod
     def register_event_type(cls, event_type):
         cls.event_types.append(event_type)
+        cls._trigger_pattern = None
 
     @classmethod
-    def create(cls, line) -> "LogEvent":
-        for event_type in cls.event_types:
+    def _compile(cls) -> None:
+        """
+        Builds one case-insensitive alternation over the trigger phrases of all
+        registered event types, so a line is scanned once to find which event
+        types could possibly match it.
+        """
+        owners = {}
+        untriggered = []
+        for priority, event_type in enumerate(cls.event_types):
+            triggers = getattr(event_type, "triggers", ())
+            if not triggers:
+                untriggered.append(priority)
+            for trigger in triggers:
+                owners.setdefault(trigger.lower(), []).append(priority)
+        # Longest first, so a phrase that contains another one still wins
+        alternation = "|".join(
+            re.escape(trigger) for trigger in sorted(owners, key=len, reverse=True)
+        )
+        cls._trigger_owners = owners
+        cls._untriggered = untriggered
+        cls._trigger_pattern = re.compile(alternation or r"(?!)", re.IGNORECASE)
+
+    @classmethod
+    def classify(cls, line) -> type["LogEvent"] | None:
+        if cls._trigger_pattern is None:
+            cls._compile()
+        candidates = set(cls._untriggered)
+        for match in cls._trigger_pattern.finditer(line):
+            candidates.update(cls._trigger_owners[match.group().lower()])
+        for priority in sorted(candidates):
+            event_type = cls.event_types[priority]
             if event_type.is_event(line):
-                return event_type(line)
-        return LogEvent(line)
+                return event_type
+        return None
+
+    @classmethod
+    def create(cls, line) -> "LogEvent":
+        event_type = cls.classify(line)
+        if event_type is None:
+            return LogEvent(line)
+        return event_type(line)
 
 
 class LogEvent:
+    # Events that share an ordering key are handled one at a time, in log order
+    ordering_key = "default"
+
     def __init__(self, line):
         self.line = line
         self.message = self._get_message(line)
-        self._post_classification()
 
     @staticmethod
     def _get_message(line):
         parts = line.split(":")
         return ":".join(parts[2:]).strip()
 
-    def _post_classification(self):
-        # This method will be called after an event has been classified.
+    def handle(self):
+        # This method is called by the dispatcher after an event has been classified.
         # It can be overridden by subclasses to perform specific actions.
         pass
 
@@ -45,6 +92,7 @@ class LogEvent:
 
 
 class PlayerConnectEvent(LogEvent):
+    ordering_key = "player_connect"
     regexp_pattern = re.compile(r": (.*?) ID \d+ (joined|left) this ARK!")
 
     def __init__(self, line: str):
@@ -63,18 +111,26 @@ class PlayerConnectEvent(LogEvent):
             return match.group(1), match.group(2)
         return None, None
 
-    def _post_classification(self):
+    def handle(self):
+        # The roster is kept up to date even when these events aren't posted
         if self.event_type == "joined":
-            if "send_welcome_message" in CONFIG and CONFIG["send_welcome_message"]:
+            is_new = ROSTER.add(self.player_name)
+            if (
+                is_new
+                and "send_welcome_message" in CONFIG
+                and CONFIG["send_welcome_message"]
+            ):
                 send_message_to_player(
                     self.player_name,
                     f'Welcome {self.player_name}! {CONFIG["tasks"]["announcement"]["description"]}',
                 )
         elif self.event_type == "left":
-            pass
+            ROSTER.remove(self.player_name)
         else:
             return
-        count = get_active_players()
+        if not CONFIG["discord"]["events"]["player_connect"]:
+            return
+        count = online_player_count()
         player_str = f"({count} player{'s' if count != 1 else ''} {'online' if self.event_type == 'joined' else 'remaining'})"
         send_to_discord(
             f"{self.player_name} has {self.event_type} the server {player_str}",
@@ -86,12 +142,16 @@ class PlayerConnectEvent(LogEvent):
 
 
 class PlayerJoined(PlayerConnectEvent):
+    triggers = ("joined this ARK!",)
+
     @classmethod
     def is_event(cls, line):
         return "joined this ARK!" in line
 
 
 class PlayerLeft(PlayerConnectEvent):
+    triggers = ("left this ARK!",)
+
     @classmethod
     def is_event(cls, line):
         return "left this ARK!" in line
@@ -105,9 +165,12 @@ class PlayerDied(LogEvent):
         r"Tribe\s+(.+?),\s+ID\s+\d+:\s+Day\s+\d+,\s+\d+:\d+:\d+:\s+<RichColor.+?>Tribemember\s+(.+?)\s+-\s+Lvl\s+(\d+)\s+was\s+killed(?:\s+by\s+a\s+(.+?)\s+-\s+Lvl\s+(\d+))?!"
     )
 
+    triggers = ("was killed",)
+
     @classmethod
     def is_event(cls, line: str):
-        return "was killed" in line.lower() and "tribemember" in line.lower()
+        lowered = line.lower()
+        return "was killed" in lowered and "tribemember" in lowered
 
     def __init__(self, line: str):
         match = self.player_died_pattern.search(line)
@@ -117,7 +180,7 @@ class PlayerDied(LogEvent):
             self.event_info = self.EventInfo(None, None, None, None, None)
         super().__init__(line)
 
-    def _post_classification(self):
+    def handle(self):
         if self.event_info.player_name:
             message = f"{self.event_info.player_name} (Level {self.event_info.level}) of Tribe {self.event_info.tribe_name} was killed"
             if self.event_info.dinosaur:
@@ -134,9 +197,12 @@ class DinoTamed(LogEvent):
         r"(?:(?P<player_name>\w+) of )?Tribe (?P<tribe_name>[\w\s]*?) Tamed a(?:n)? (?P<dinosaur>.+?) - Lvl (?P<level>\d+)"
     )
 
+    triggers = ("tamed a",)
+
     @classmethod
     def is_event(cls, line: str):
-        return "tamed a" in line.lower() and "richcolor" not in line.lower()
+        lowered = line.lower()
+        return "tamed a" in lowered and "richcolor" not in lowered
 
     def __init__(self, line: str):
         self.message = self._get_message(line)
@@ -148,7 +214,7 @@ class DinoTamed(LogEvent):
             self.event_info = self.EventInfo(None, None, None, None)
         super().__init__(line)
 
-    def _post_classification(self):
+    def handle(self):
         if (
             self.event_info.player_name or self.event_info.tribe_name
         ) and self.event_info.dinosaur:
@@ -160,11 +226,13 @@ class DinoTamed(LogEvent):
 
 
 class GlobalChatMessage(LogEvent):
+    ordering_key = "global_chat"
     EventInfo = namedtuple("EventInfo", "account_name player_name message")
     global_chat_pattern = re.compile(
         r"(?P<account_name>.+?)\s+\((?P<player_name>.+?)\):\s+(?P<message>.*?)$"
     )
     _last_match = None
+    triggers = ("):",)
 
     @classmethod
     def is_event(cls, line: str):
@@ -188,7 +256,7 @@ class GlobalChatMessage(LogEvent):
             self.event_info = self.EventInfo(None, None, None)
         super().__init__(line)
 
-    def _post_classification(self):
+    def handle(self):
         if self.event_info.player_name and self.event_info.message:
             # Formulate the message to be sent to Discord
             message = f"{self.event_info.account_name} ({self.event_info.player_name}): {self.event_info.message}"
@@ -198,9 +266,8 @@ class GlobalChatMessage(LogEvent):
         return f"GlobalChatMessage Event: {self.event_info.account_name} ({self.event_info.player_name}): {self.event_info.message}"
 
 
-if CONFIG["discord"]["events"]["player_connect"]:
-    LogEventFactory.register_event_type(PlayerJoined)
-    LogEventFactory.register_event_type(PlayerLeft)
+LogEventFactory.register_event_type(PlayerJoined)
+LogEventFactory.register_event_type(PlayerLeft)
 if CONFIG["discord"]["events"]["player_died"]:
     LogEventFactory.register_event_type(PlayerDied)
 if CONFIG["discord"]["events"]["dino_tamed"]:
@@ -210,45 +277,83 @@ if CONFIG["discord"]["events"]["global_chat"]:
 
 
 class LogMonitor:
-    def __init__(self):
-        self.filepath = os.path.join(
+    def __init__(
+        self,
+        dispatcher: EventDispatcher | None = None,
+        filepath: str | None = None,
+        checkpoint_path: str | None = None,
+    ):
+        self.filepath = filepath or os.path.join(
             CONFIG["server"]["install_path"],
             "ShooterGame",
             "Saved",
             "Logs",
             "ShooterGame.log",
         )
+        self.dispatcher = dispatcher
+        self.tailer = LogTailer(self.filepath)
+
+        if checkpoint_path is None:
+            outdir = os.path.join(OUTDIR, "state")
+            os.makedirs(outdir, exist_ok=True)
+            checkpoint_path = os.path.join(outdir, "log_monitor.json")
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = CONFIG["advanced"].get("log_checkpoint_interval", 10)
+        self._last_checkpoint = time.monotonic()
+        self._saved_checkpoint = None
+        self._resume()
+
+    def _resume(self) -> None:
+        max_catchup = CONFIG["advanced"].get("log_catchup_max_bytes", 1 << 20)
         try:
-            self.last_size = os.path.getsize(self.filepath)
+            with open(self.checkpoint_path, "r") as f:
+                checkpoint = json.load(f)
         except FileNotFoundError:
-            logger.error(f"Log file does not exist: {self.filepath}")
-            self.last_size = 0
-
-    def process_new_entries(self) -> list[LogEvent]:
-        try:
-            current_size = os.path.getsize(self.filepath)
-        except FileNotFoundError:
-            logger.error(f"Log file does not exist: {self.filepath}")
-            return []
-
-        if current_size == self.last_size:
-            return []  # No new content
-
-        new_entries = []
+            logger.debug(f"No log checkpoint found: {self.checkpoint_path}")
+            self.tailer.seek_to_end()
+            return
+        except (OSError, ValueError) as e:
+            logger.error(f"Invalid log checkpoint {self.checkpoint_path}: {e}")
+            self.tailer.seek_to_end()
+            return
+        if backlog := self.tailer.resume(checkpoint, max_catchup):
+            logger.info(f"Catching up on {backlog} bytes of server log")
+
+    def save_checkpoint(self) -> None:
+        """Writes the read position atomically (write to a temp file, then rename)."""
+        self._last_checkpoint = time.monotonic()
+        checkpoint = self.tailer.checkpoint()
+        if checkpoint == self._saved_checkpoint:
+            return
+        tmp_path = self.checkpoint_path + ".tmp"
         try:
-            with open(self.filepath, "r", encoding="utf-8") as file:
-                file.seek(self.last_size)
-                new_entries = file.readlines()
-                self.last_size = current_size
-        except FileNotFoundError:
-            logger.error(f"Log file does not exist: {self.filepath}")
-            # Handle file disappearance mid-operation if needed
+            with open(tmp_path, "w") as f:
+                json.dump(checkpoint, f)
+            os.replace(tmp_path, self.checkpoint_path)
+            self._saved_checkpoint = checkpoint
         except OSError as e:
-            logger.error(f"Error reading log file: {e}")
-        except UnicodeDecodeError as e:
-            logger.error(f"Error decoding log file: {e}")
+            logger.error(f"Error saving log checkpoint: {e}")
 
-        log_events = [LogEventFactory.create(line) for line in new_entries]
+    def process_new_entries(self) -> list[LogEvent]:
+        """
+        Classifies new log lines and hands recognised events to the dispatcher
+        (or handles them inline if there is none).
+
+        :return: The recognised events.
+        """
+        log_events = []
+        for lines in self.tailer.read_lines():
+            for line in lines:
+                event = LogEventFactory.create(line)
+                if type(event) is LogEvent:
+                    continue
+                if self.dispatcher:
+                    self.dispatcher.submit(event)
+                else:
+                    event.handle()
+                log_events.append(event)
+        if time.monotonic() - self._last_checkpoint >= self.checkpoint_interval:
+            self.save_checkpoint()
         return log_events
 
 
@@ -0,0 +1,141 @@
+import os
+from typing import Iterator
+
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class LogTailer:
+    """
+    Follows a growing log file by byte offset.
+
+    The file is read in binary, in bounded chunks, and an incomplete last line
+    is carried over until the rest of it is written. Each line is decoded on its
+    own with replacement, so one bad byte can't discard a whole chunk. A file
+    that was replaced (different identity) or truncated (smaller than the
+    offset) is read again from the start.
+    """
+
+    def __init__(self, filepath: str, chunk_size: int = 1 << 20):
+        self.filepath = filepath
+        self.chunk_size = chunk_size
+        self.offset = 0
+        self.identity: tuple[int, int] | None = None
+        self._carry = b""
+        self._resync = False  # drop bytes up to the next newline before reading lines
+
+    def _stat(self) -> os.stat_result | None:
+        try:
+            return os.stat(self.filepath)
+        except FileNotFoundError:
+            logger.error(f"Log file does not exist: {self.filepath}")
+            return None
+
+    @staticmethod
+    def _identity(stat: os.stat_result) -> tuple[int, int]:
+        return stat.st_dev, stat.st_ino
+
+    def seek_to_end(self) -> None:
+        """Skips everything currently in the file."""
+        stat = self._stat()
+        self.offset = stat.st_size if stat else 0
+        self.identity = self._identity(stat) if stat else None
+        self._carry = b""
+        self._resync = False
+
+    def checkpoint(self) -> dict:
+        """
+        Returns the position to resume from. An incomplete last line is not
+        counted as read, so that it is read again in full.
+        """
+        dev, ino = self.identity if self.identity else (None, None)
+        return {"offset": self.offset - len(self._carry), "dev": dev, "ino": ino}
+
+    def resume(self, checkpoint: dict, max_catchup: int) -> int:
+        """
+        Continues from a checkpoint, reading at most the last ``max_catchup``
+        bytes of whatever was written since. If the file was replaced in the
+        meantime, the new file counts as entirely unread.
+
+        :return: The number of bytes that will be caught up on.
+        """
+        stat = self._stat()
+        if stat is None:
+            self.offset, self.identity, self._carry = 0, None, b""
+            return 0
+        self.identity = self._identity(stat)
+        start = checkpoint.get("offset", 0)
+        if (checkpoint.get("dev"), checkpoint.get("ino")) != self.identity:
+            start = 0
+        if start > stat.st_size:
+            start = 0
+        self._carry = b""
+        self._resync = False
+        if stat.st_size - start > max_catchup:
+            logger.warning(
+                f"Skipping {stat.st_size - start - max_catchup} bytes of log backlog"
+            )
+            start = stat.st_size - max_catchup
+            self._resync = start > 0
+        self.offset = start
+        return stat.st_size - start
+
+    def _check_rotation(self, stat: os.stat_result) -> None:
+        identity = self._identity(stat)
+        if self.identity is not None and identity != self.identity:
+            logger.info(
+                f"Log file was replaced, reading from the start: {self.filepath}"
+            )
+            self.offset = 0
+            self._carry = b""
+            self._resync = False
+        elif stat.st_size < self.offset:
+            logger.info(
+                f"Log file was truncated, reading from the start: {self.filepath}"
+            )
+            self.offset = 0
+            self._carry = b""
+            self._resync = False
+        self.identity = identity
+
+    def _split(self, chunk: bytes) -> list[str]:
+        data = self._carry + chunk if self._carry else chunk
+        if self._resync:
+            newline = data.find(b"\n")
+            self._carry = b""
+            if newline < 0:
+                return []
+            data = data[newline + 1 :]
+            self._resync = False
+        raw_lines = data.split(b"\n")
+        self._carry = raw_lines.pop()
+        if len(self._carry) > self.chunk_size:
+            # A "line" this long is not going to be completed usefully
+            raw_lines.append(self._carry)
+            self._carry = b""
+        return [
+            line.rstrip(b"\r").decode("utf-8", errors="replace") for line in raw_lines
+        ]
+
+    def read_lines(self) -> Iterator[list[str]]:
+        """Yields the complete lines written since the last call, one chunk at a time."""
+        stat = self._stat()
+        if stat is None:
+            return
+        self._check_rotation(stat)
+        if stat.st_size == self.offset:
+            return  # No new content
+
+        try:
+            with open(self.filepath, "rb") as file:
+                file.seek(self.offset)
+                while chunk := file.read(self.chunk_size):
+                    self.offset += len(chunk)
+                    lines = self._split(chunk)
+                    if lines:
+                        yield lines
+        except FileNotFoundError:
+            logger.error(f"Log file does not exist: {self.filepath}")
+        except OSError as e:
+            logger.error(f"Error reading log file: {e}")
@@ -0,0 +1,187 @@
+import ctypes
+import ctypes.util
+import os
+import selectors
+import struct
+import sys
+import threading
+import time
+
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class LogWatcher:
+    """Blocks until a watched file may have changed."""
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """
+        Waits for a change to the file, a call to ``wake``, or the timeout.
+
+        :return: True if the file changed (or may have), False otherwise.
+        """
+        raise NotImplementedError("Subclasses should implement this!")
+
+    def wake(self) -> None:
+        raise NotImplementedError("Subclasses should implement this!")
+
+    def close(self) -> None:
+        pass
+
+
+class PollingWatcher(LogWatcher):
+    """
+    Polls the file's size and mtime, backing off from ``min_interval`` to
+    ``max_interval`` while nothing changes and snapping back on activity.
+    """
+
+    def __init__(
+        self, filepath: str, min_interval: float = 0.1, max_interval: float = 2
+    ):
+        self.filepath = filepath
+        self.min_interval = min(min_interval, max_interval)
+        self.max_interval = max_interval
+        self.interval = self.min_interval
+        self._woken = threading.Event()
+        self._last = self._signature()
+
+    def _signature(self) -> tuple[int, int, int] | None:
+        try:
+            stat = os.stat(self.filepath)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def wait(self, timeout: float | None = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            delay = self.interval
+            if deadline is not None:
+                delay = min(delay, max(0, deadline - time.monotonic()))
+            if self._woken.wait(delay):
+                self._woken.clear()
+                return False
+            signature = self._signature()
+            if signature != self._last:
+                self._last = signature
+                self.interval = self.min_interval
+                return True
+            self.interval = min(self.interval * 2, self.max_interval)
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+
+    def wake(self) -> None:
+        self._woken.set()
+
+
+class InotifyWatcher(LogWatcher):
+    """
+    Blocks on Linux inotify events for the file's directory, so that the file
+    being replaced or recreated is noticed as well as appends to it. Events
+    for other files in the directory are ignored.
+    """
+
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_IGNORED = 0x00008000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+    _EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+    def __init__(self, filepath: str):
+        self.directory, self.filename = os.path.split(os.path.abspath(filepath))
+        self.filename = os.fsencode(self.filename)
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = self._libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._wd = None
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self._fd, selectors.EVENT_READ)
+        self._selector.register(self._wake_r, selectors.EVENT_READ)
+        self._add_watch()
+
+    def _add_watch(self) -> bool:
+        wd = self._libc.inotify_add_watch(
+            self._fd, os.fsencode(self.directory), self.WATCH_MASK
+        )
+        self._wd = wd if wd >= 0 else None
+        return self._wd is not None
+
+    def _drain(self) -> bool:
+        changed = False
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(data):
+                _, mask, _, length = self._EVENT_HEADER.unpack_from(data, offset)
+                offset += self._EVENT_HEADER.size
+                name = data[offset : offset + length].rstrip(b"\0")
+                offset += length
+                if mask & (self.IN_IGNORED | self.IN_DELETE_SELF):
+                    self._wd = None  # the directory itself went away
+                    changed = True
+                elif name == self.filename:
+                    changed = True
+
+    def wait(self, timeout: float | None = None) -> bool:
+        # Other files in the directory changing doesn't end the wait early
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None
+            if deadline is not None:
+                remaining = max(0, deadline - time.monotonic())
+            if self._wd is None and not self._add_watch():
+                # Nothing to watch yet, so just sleep for the timeout
+                woken = bool(self._selector.select(remaining))
+                self._clear_wake()
+                return not woken
+            for key, _ in self._selector.select(remaining):
+                if key.fd == self._wake_r:
+                    self._clear_wake()
+                    return False
+            if self._drain():
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+
+    def _clear_wake(self) -> bool:
+        try:
+            return bool(os.read(self._wake_r, 64))
+        except BlockingIOError:
+            return False
+
+    def wake(self) -> None:
+        os.write(self._wake_w, b"\0")
+
+    def close(self) -> None:
+        self._selector.close()
+        for fd in (self._fd, self._wake_r, self._wake_w):
+            os.close(fd)
+
+
+def create_watcher(
+    filepath: str, backend: str = "auto", max_interval: float = 2
+) -> LogWatcher:
+    """
+    Picks the best available watcher: inotify on Linux, adaptive polling
+    everywhere else (or when ``backend`` is ``"polling"``).
+    """
+    if backend in ("auto", "inotify") and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(filepath)
+        except (OSError, AttributeError) as e:
+            logger.warning(f"inotify unavailable, falling back to polling: {e}")
+    return PollingWatcher(filepath, max_interval=max_interval)
@@ -1,5 +1,6 @@
 import threading
 import time
+from datetime import datetime
 
 from config import CONFIG
 from dependencies import (
@@ -7,18 +8,23 @@ from dependencies import (
     install_certificates,
     install_prerequisites,
 )
-from errors import ArkServerStartError, ArkServerStopError
+from dispatcher import EventDispatcher
+from errors import ArkServerStartError, ArkServerStopError, SteamCmdError
 from ini_parser import update_ark_configs
 from log_monitor import LogMonitor
+from log_watcher import create_watcher
 from logger import get_logger
-from mods import delete_mods_folder
+from mod_cache import prepare_mods
+from outbox import get_drainer
 from processes import get_parent_pid_from_child, is_server_running, kill_server_by_pids
-from rcon import broadcast, save_world, send_message
+from rcon import announce, save_world
+from restart_broker import RestartBroker, RestartIntent, combined_reason
+from roster import ROSTER, start_roster_reconciler
+from scheduler import Scheduler
 from serverapi import (
     install_serverapi,
     is_server_api_ready,
     is_server_api_running,
-    serverapi_needs_update,
     set_log_filenames,
     use_serverapi,
 )
@@ -34,8 +40,9 @@ from tasks import (
     SendAnnouncement,
     Task,
 )
-from update import does_server_need_update, is_server_installed
+from update import is_server_installed
 from utils import wait_until
+from version_checks import get_version_checker
 
 logger = get_logger(__name__)
 
@@ -48,6 +55,15 @@ class ArkServer:
         self.server_api_timeout = CONFIG["advanced"].get("server_api_timeout", 300)
         self.sleep_time = CONFIG["advanced"].get("sleep_time", 60)
         self.log_check_rate = CONFIG["advanced"].get("log_check_rate", 5)
+        self.log_watcher = None
+        self.dispatcher = EventDispatcher.from_config()
+        self.scheduler = Scheduler()
+        self.restart_broker = RestartBroker(
+            self.scheduler,
+            self.restart,
+            window=CONFIG["advanced"].get("restart_coalesce_window", 120),
+            planned_restart=self._planned_restart,
+        )
         self.need_certificates = not check_certificate_windows()
         self.ark_pid = None
         self.api_pid = None
@@ -79,15 +95,19 @@ class ArkServer:
     def start(self) -> bool:
         self.ark_pid = is_server_running()
         if not self.ark_pid:
-            if does_server_need_update():
-                update_server()
+            checks = get_version_checker().wait(["server", "serverapi", "mods"])
+            if checks["server"].value:
+                try:
+                    update_server()
+                except SteamCmdError as e:
+                    logger.error(f"Failed to update the Ark server: {e}")
 
             if use_serverapi():
-                if serverapi_needs_update():
+                if checks["serverapi"].value:
                     install_serverapi()
                 set_log_filenames()
 
-            delete_mods_folder()
+            prepare_mods(checks["mods"].value if checks["mods"].ok else None)
             batch_file_path = generate_batch_file()
             cmd = ["cmd", "/c", batch_file_path]
             logger.debug(f"Starting Ark server with cmd: {cmd}")
@@ -139,6 +159,7 @@ class ArkServer:
                 if use_serverapi():
                     self.api_pid = get_parent_pid_from_child(self.ark_pid)
                     logger.debug(f"Ark server API PID: {self.api_pid}")
+                ROSTER.reconcile([])
                 self._reset_states()
             return success
         else:
@@ -164,6 +185,7 @@ class ArkServer:
             if success:
                 logger.info("Ark server stopped")
                 self.api_pid = self.ark_pid = None
+                ROSTER.clear()
             else:
                 logger.error("Failed to stop the Ark server")
                 raise ArkServerStopError("Failed to stop the Ark server.")
@@ -172,13 +194,38 @@ class ArkServer:
             logger.info("Ark server is not running")
         return True
 
+    def request_restart(self, intent: RestartIntent, warning_times: list[int]) -> None:
+        """
+        Restarts the server after ``warning_times`` (minutes) of warnings,
+        without blocking. Requests that come in close together share one
+        countdown and one restart.
+        """
+        self.restart_broker.submit(intent, warning_times)
+
+    def _planned_restart(self) -> datetime | None:
+        if "restart" in self.tasks:
+            return self.tasks["restart"].time.next_time
+        return None
+
+    def _install(self, intents: list[RestartIntent]) -> None:
+        """Applies the updates that restarts were requested for."""
+        for install in dict.fromkeys(i.install for i in intents if i.install):
+            try:
+                install()
+            except Exception as e:
+                # Start the server as it is rather than leave it down
+                logger.error(f"Failed to install an update: {e}")
+
     def restart(self, reason: str = "other") -> None:
+        # Everything else waiting for a restart is covered by this one
+        intents = self.restart_broker.take_all()
+        reason = combined_reason(intents, reason)
         if is_server_running():
-            send_message(f"Server is restarting for {reason}.")
-            broadcast(f"Server is restarting for {reason}.", discord_msg=False)
+            announce(f"Server is restarting for {reason}.")
             time.sleep(5)
             self.stop()
             time.sleep(5)
+        self._install(intents)
         self.start()
 
     def _pre_run(self) -> None:
@@ -191,39 +238,70 @@ class ArkServer:
         update_ark_configs()
 
     def _run_log_monitor(self):
-        log_monitor = LogMonitor()
-        while self.running:
-            log_monitor.process_new_entries()
-            time.sleep(self.log_check_rate)
+        log_monitor = LogMonitor(self.dispatcher)
+        self.log_watcher = create_watcher(
+            log_monitor.filepath,
+            backend=CONFIG["advanced"].get("log_watcher", "auto"),
+            max_interval=self.log_check_rate,
+        )
+        try:
+            while self.running:
+                log_monitor.process_new_entries()
+                self.log_watcher.wait(timeout=self.sleep_time)
+        finally:
+            self.log_watcher.close()
+            log_monitor.save_checkpoint()
 
     def _exit(self) -> None:
         logger.info("Exiting...")
         self.running = False
+        self.restart_broker.take_all()
+        self.scheduler.stop()
+        if self.log_watcher:
+            self.log_watcher.wake()
+
+    def _check_server(self) -> None:
+        if not is_server_running():
+            logger.warning("Server is not running. Attempting to restart...")
+            # Apply whatever a restart was pending for, no need to warn anyone
+            self._install(self.restart_broker.take_all())
+            self.start()
 
     def _reset_states(self) -> None:
         for task_key in ["restart", "update", "mod_update"]:
             if task_key in self.tasks:
                 self.tasks[task_key].time.reset()
                 self.tasks[task_key].time.save_state()
+                self.tasks[task_key].reschedule()
 
     def run(self) -> None:
         self._pre_run()
         self.start()
+        start_roster_reconciler()
 
+        get_drainer()  # delivers notifications left over from a previous run
+        self.dispatcher.start()
         log_monitor_thread = threading.Thread(target=self._run_log_monitor)
         log_monitor_thread.start()
 
-        while self.running:
-            if not is_server_running():
-                logger.warning("Server is not running. Attempting to restart...")
-                self.start()
-
-            for _, task in self.tasks.items():
-                if task.execute():
-                    break
-            time.sleep(self.sleep_time)
-
-        log_monitor_thread.join()
+        for task in self.tasks.values():
+            task.schedule(self.scheduler)
+        self.scheduler.schedule_in(
+            self.sleep_time, self._check_server, "server check", self.sleep_time
+        )
+        try:
+            self.scheduler.run()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if self.running:
+                self._exit()
+            # Wait for the log monitor to save its checkpoint, then for the
+            # events it queued to be handled
+            log_monitor_thread.join()
+            self.dispatcher.stop(timeout=10)
+            get_drainer().stop(timeout=10)
+            get_version_checker().shutdown()
 
 
 if __name__ == "__main__":
@@ -267,7 +345,4 @@ if __name__ == "__main__":
         if not run_as_admin():
             logger.error("Failed to gain administrator privileges")
             sys.exit(0)
-    try:
-        server.run()
-    except KeyboardInterrupt:
-        server._exit()
+    server.run()
@@ -0,0 +1,226 @@
+import copy
+import os
+import shutil
+import threading
+
+from config import CONFIG
+from errors import ModCacheError
+from logger import get_logger
+from mods import (
+    CURSEFORGE_GAME_ID,
+    INSTALLED_MODS,
+    MODS_PATH,
+    InstalledMod,
+    InstalledModIndex,
+    Mod,
+    ModLibrary,
+    delete_mods_folder,
+    library_path,
+    write_library,
+)
+
+logger = get_logger(__name__)
+
+
+class ModCache:
+    """
+    Keeps the mods the server has downloaded between restarts.
+
+    The server downloads any configured mod that isn't in its mod library
+    (``library.json``) when it starts. Rather than deleting every mod before
+    each start, only the mods that are outdated or whose files are missing
+    are removed from the library and disk, so the server downloads just
+    those again. Library entries the index skips (malformed, or a mod listed
+    twice) are removed the same way. An unreadable library, or mod files
+    without a library, fall back to deleting all mods. When it isn't known
+    which mods are outdated (e.g. CurseForge couldn't be reached), the
+    downloaded mods are kept as they are until the next check rather than
+    all downloaded again.
+    """
+
+    def __init__(self, install_path: str, index: InstalledModIndex | None = None):
+        self.mods_dir = os.path.join(install_path, MODS_PATH, CURSEFORGE_GAME_ID)
+        self.library_path = library_path(install_path)
+        self.index = index or InstalledModIndex(self.library_path)
+        self._lock = threading.Lock()
+
+    def _load_library(self) -> ModLibrary | None:
+        """
+        :return: A copy of the library that can be changed, or None if there is none.
+        :raises ModCacheError: If the library can't be read.
+        """
+        try:
+            library = self.index.library()
+        except (OSError, ValueError) as e:
+            raise ModCacheError(f"Can't read {self.library_path}: {e}") from e
+        return copy.deepcopy(library)
+
+    def _save_library(self, library: ModLibrary) -> None:
+        try:
+            write_library(self.library_path, library)
+        finally:
+            self.index.invalidate()
+
+    def _folders(self, mod: InstalledMod) -> list[str]:
+        """The folders holding ``mod``'s files."""
+        if mod.path:
+            return [mod.path]
+        if not os.path.isdir(self.mods_dir):
+            return []
+        return [
+            os.path.join(self.mods_dir, name)
+            for name in os.listdir(self.mods_dir)
+            if name == str(mod.mod_id) or name.startswith(f"{mod.mod_id}_")
+        ]
+
+    def _is_intact(self, mod: InstalledMod) -> bool:
+        folders = self._folders(mod)
+        return bool(folders) and all(
+            os.path.isdir(folder) and os.listdir(folder) for folder in folders
+        )
+
+    def _orphans(self, mods: list[InstalledMod]) -> list[str]:
+        """Mod folders that no installed mod accounts for."""
+        if not os.path.isdir(self.mods_dir):
+            return []
+        known = {
+            os.path.normcase(os.path.abspath(folder))
+            for mod in mods
+            for folder in self._folders(mod)
+        }
+        return [
+            path
+            for path in (
+                os.path.join(self.mods_dir, name) for name in os.listdir(self.mods_dir)
+            )
+            if os.path.isdir(path)
+            and os.path.normcase(os.path.abspath(path)) not in known
+        ]
+
+    def refresh(self, outdated: list[Mod] | None) -> None:
+        """
+        Gets the mods ready for the server to start.
+
+        :param outdated: The mods that have a newer version, or None if that
+            isn't known.
+        """
+        with self._lock:
+            if outdated is None:
+                logger.warning("Latest mod versions unknown, keeping downloaded mods")
+                outdated = []
+            try:
+                library = self._load_library()
+            except ModCacheError as e:
+                logger.warning(f"{e}, deleting all mods")
+                delete_mods_folder()
+                return
+            if library is None:
+                if os.path.isdir(self.mods_dir) and os.listdir(self.mods_dir):
+                    logger.warning("Mod files found without a mod library")
+                    delete_mods_folder()
+                return
+
+            installed = list(library.mods.values())
+            skipped = library.entries.count(None)
+            outdated_ids = {mod.mod_id for mod in outdated}
+            invalid = {}
+            for mod in installed:
+                if mod.mod_id in outdated_ids:
+                    invalid[mod.mod_id] = "outdated"
+                elif not self._is_intact(mod):
+                    invalid[mod.mod_id] = "missing files"
+            for mod in installed:
+                if mod.mod_id in invalid:
+                    logger.info(
+                        f"Removing {mod.name or mod.mod_id} ({invalid[mod.mod_id]}) so it is downloaded again"
+                    )
+                    for folder in self._folders(mod):
+                        shutil.rmtree(folder, ignore_errors=True)
+            for folder in self._orphans(
+                [mod for mod in installed if mod.mod_id not in invalid]
+            ):
+                logger.info(f"Removing mod files not in the mod library: {folder}")
+                shutil.rmtree(folder, ignore_errors=True)
+
+            if invalid or skipped:
+                if skipped:
+                    logger.info(
+                        f"Removing {skipped} unusable mod library entries so their mods are downloaded again"
+                    )
+                library.data["installedMods"] = [
+                    entry
+                    for entry, mod in zip(
+                        library.data["installedMods"], library.entries
+                    )
+                    if mod is not None and mod.mod_id not in invalid
+                ]
+                try:
+                    self._save_library(library)
+                except OSError as e:
+                    logger.error(
+                        f"Error saving the mod library, deleting all mods: {e}"
+                    )
+                    delete_mods_folder()
+                    return
+            logger.info(
+                f"Kept {len(installed) - len(invalid)} downloaded mods, removed {len(invalid)}"
+            )
+
+    def install_files(self, mod_id: int, source: str, installed_file: dict) -> None:
+        """
+        Puts a newer version of an installed mod in place of the old one and
+        records ``installed_file`` as its file in the library, so the server
+        doesn't download it again. A ``<mod id>_<file id>`` folder is renamed
+        after the new file, and its ``pathOnDisk`` with it. Run while the
+        server is down.
+
+        :param source: A folder with the new version's files, moved into place.
+        :raises ModCacheError: If the mod isn't installed in exactly one folder.
+        :raises OSError: If the files can't be moved.
+        """
+        with self._lock:
+            library = self._load_library()
+            if library is None or mod_id not in library.mods:
+                raise ModCacheError(f"Mod {mod_id} isn't installed")
+            folders = self._folders(library.mods[mod_id])
+            if len(folders) != 1 or not os.path.isdir(folders[0]):
+                raise ModCacheError(f"Can't tell where mod {mod_id} is installed")
+            target = folders[0].rstrip("/\\")
+            destination = target
+            if os.path.basename(target).startswith(f"{mod_id}_"):
+                destination = os.path.join(
+                    os.path.dirname(target), f"{mod_id}_{installed_file['id']}"
+                )
+            new, old = destination + ".new", target + ".old"
+            for path in (new, old):
+                shutil.rmtree(path, ignore_errors=True)
+            shutil.move(source, new)
+            os.replace(target, old)
+            if destination != target:
+                shutil.rmtree(destination, ignore_errors=True)
+            os.replace(new, destination)
+            shutil.rmtree(old, ignore_errors=True)
+            for entry, mod in zip(library.data["installedMods"], library.entries):
+                if mod is not None and mod.mod_id == mod_id:
+                    entry["installedFile"].update(installed_file)
+                    if entry.get("pathOnDisk"):
+                        entry["pathOnDisk"] = destination
+            self._save_library(library)
+
+
+_mod_cache = None
+
+
+def get_mod_cache() -> ModCache:
+    global _mod_cache
+    if _mod_cache is None:
+        _mod_cache = ModCache(CONFIG["server"]["install_path"], INSTALLED_MODS)
+    return _mod_cache
+
+
+def prepare_mods(outdated: list[Mod] | None) -> None:
+    """Gets the mods ready for a server start, see ``ModCache``."""
+    if CONFIG["advanced"].get("mod_cache", True):
+        get_mod_cache().refresh(outdated)
+    else:
+        delete_mods_folder()
@@ -0,0 +1,181 @@
+import hashlib
+import os
+import shutil
+import threading
+import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable
+
+from config import CONFIG, OUTDIR
+from curseforge import CurseForgeClient
+from errors import ModCacheError, ModPrefetchError
+from logger import get_logger
+from mod_cache import ModCache, get_mod_cache
+from mods import Mod, curseforge_client
+
+logger = get_logger(__name__)
+
+STAGING_DIR = os.path.join(OUTDIR, "mod_staging")
+HASH_ALGO_SHA1 = 1  # CurseForge file hash algorithm ids
+READ_SIZE = 1024 * 1024
+
+
+def _verify(path: str, file: dict) -> bool:
+    """Whether a downloaded file has the length and SHA1 CurseForge lists for it."""
+    if os.path.getsize(path) != file.get("fileLength", os.path.getsize(path)):
+        return False
+    expected = [
+        h["value"] for h in file.get("hashes", []) if h["algo"] == HASH_ALGO_SHA1
+    ]
+    if not expected:
+        return True
+    sha1 = hashlib.sha1()
+    with open(path, "rb") as f:
+        while chunk := f.read(READ_SIZE):
+            sha1.update(chunk)
+    return sha1.hexdigest() in expected
+
+
+def _library_file(file: dict) -> dict:
+    """The parts of a CurseForge file the server keeps in its mod library."""
+    released = datetime.fromisoformat(file["fileDate"][:19])
+    return {
+        "id": file["id"],
+        "modId": file["modId"],
+        "fileName": file.get("fileName", ""),
+        "fileLength": file.get("fileLength", 0),
+        "downloadUrl": file.get("downloadUrl", ""),
+        # the library's own date format, e.g. "2024.06.01-10.00.00"
+        "fileDate": released.strftime("%Y.%m.%d-%H.%M.%S"),
+    }
+
+
+class ModPrefetcher:
+    """
+    Downloads the new versions of updated mods while the restart countdown
+    for them runs, so the server doesn't have to download them while it
+    boots.
+
+    Each mod's main file is downloaded from CurseForge into a staging
+    folder, checked against its listed length and SHA1, and extracted. At
+    the restart, with the server down, the extracted files replace the
+    installed ones. A mod that couldn't be prefetched is left as it is; the
+    mod cache then removes it as outdated and the server downloads it as
+    before.
+    """
+
+    def __init__(
+        self,
+        client: CurseForgeClient,
+        cache: ModCache,
+        staging_dir: str = STAGING_DIR,
+        workers: int = 2,
+    ):
+        self.client = client
+        self.cache = cache
+        self.staging_dir = staging_dir
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="mod-prefetch")
+        self._futures: dict[int, Future] = {}
+        self._lock = threading.Lock()
+
+    def _stage(self, mod_id: int) -> tuple[str, dict]:
+        """
+        :return: The folder with the extracted files, and the library's record of them.
+        :raises ModPrefetchError: If the mod can't be downloaded or is corrupt.
+        """
+        mod = self.client.get_mods([mod_id]).get(mod_id)
+        if mod is None:
+            raise ModPrefetchError(f"Mod {mod_id} isn't on CurseForge")
+        file = self.client.get_file(mod_id, mod["mainFileId"])
+        if not file.get("downloadUrl"):
+            raise ModPrefetchError(f"{mod['name']} can only be downloaded in game")
+
+        os.makedirs(self.staging_dir, exist_ok=True)
+        name = f"{mod_id}_{file['id']}"
+        archive = os.path.join(self.staging_dir, name + ".zip")
+        # A file staged for an earlier restart that didn't happen can be reused
+        if not (os.path.isfile(archive) and _verify(archive, file)):
+            self.client.download(file["downloadUrl"], archive)
+            if not _verify(archive, file):
+                os.remove(archive)
+                raise ModPrefetchError(f"The download of {mod['name']} is corrupt")
+
+        folder = os.path.join(self.staging_dir, name)
+        tmp_folder = folder + ".tmp"
+        shutil.rmtree(tmp_folder, ignore_errors=True)
+        try:
+            with zipfile.ZipFile(archive) as zf:
+                zf.extractall(tmp_folder)
+        except zipfile.BadZipFile as e:
+            raise ModPrefetchError(f"The download of {mod['name']} is corrupt: {e}")
+        shutil.rmtree(folder, ignore_errors=True)
+        os.replace(tmp_folder, folder)
+        logger.info(f"Prefetched {mod['name']} ({file.get('fileName', name)})")
+        return folder, _library_file(file)
+
+    def start(self, mod_ids: list[int]) -> None:
+        """Starts prefetching mods, skipping those already being prefetched."""
+        with self._lock:
+            for mod_id in mod_ids:
+                if mod_id not in self._futures:
+                    self._futures[mod_id] = self._executor.submit(self._stage, mod_id)
+
+    def install(self) -> None:
+        """
+        Waits for the prefetched mods and puts them in place. Run while the
+        server is down.
+        """
+        with self._lock:
+            futures, self._futures = self._futures, {}
+        for mod_id, future in futures.items():
+            try:
+                folder, installed_file = future.result()
+            except Exception as e:
+                logger.warning(
+                    f"Mod {mod_id} wasn't prefetched, the server will download it: {e}"
+                )
+                continue
+            try:
+                self.cache.install_files(mod_id, folder, installed_file)
+                logger.info(f"Installed the prefetched files of mod {mod_id}")
+            except (ModCacheError, OSError) as e:
+                logger.warning(
+                    f"Prefetched mod {mod_id} couldn't be installed, the server will download it: {e}"
+                )
+            finally:
+                shutil.rmtree(folder, ignore_errors=True)
+                if os.path.isfile(folder + ".zip"):
+                    os.remove(folder + ".zip")
+
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_mod_prefetcher() -> ModPrefetcher:
+    global _prefetcher
+    with _prefetcher_lock:
+        if _prefetcher is None:
+            _prefetcher = ModPrefetcher(curseforge_client(), get_mod_cache())
+        return _prefetcher
+
+
+def prefetch_mods(mods: list[Mod]) -> Callable[[], None] | None:
+    """
+    Starts downloading updated mods ahead of the restart for them, if mod
+    prefetching is enabled.
+
+    :return: What to run while the server is down to install them.
+    """
+    if not (
+        CONFIG["advanced"].get("mod_prefetch", True)
+        and CONFIG["advanced"].get("mod_cache", True)
+    ):
+        return None
+    mod_ids = [mod.mod_id for mod in mods if mod.mod_id is not None]
+    if not mod_ids:
+        return None
+    prefetcher = get_mod_prefetcher()
+    prefetcher.start(mod_ids)
+    return prefetcher.install
@@ -1,15 +1,17 @@
 import json
 import os
 import shutil
+import threading
+from collections import Counter
 from dataclasses import dataclass
 from datetime import datetime
 from functools import cache
 
-import requests
 from dotenv import load_dotenv
 
 from config import CONFIG, OUTDIR
 from crypto_script import decrypt_data
+from curseforge import CurseForgeClient, get_curseforge_client
 from logger import get_logger
 from utils import resource_path
 
@@ -17,6 +19,10 @@ logger = get_logger(__name__)
 
 load_dotenv()  # Load environment variables from .env file
 
+MODS_PATH = "ShooterGame/Binaries/Win64/ShooterGame/Mods"
+MODS_USER_DATA_PATH = "ShooterGame/Binaries/Win64/ShooterGame/ModsUserData"
+CURSEFORGE_GAME_ID = "83374"
+
 
 @dataclass
 class Mod:
@@ -24,6 +30,7 @@ class Mod:
     installed_dt: datetime | None
     latest_dt: datetime | None
     is_approved: bool = False
+    mod_id: int | None = None
 
 
 @cache
@@ -55,47 +62,158 @@ def _get_api_key() -> str:
     return key
 
 
-@cache
-def _local_mod_file() -> dict:
-    file_path = os.path.join(
-        CONFIG["server"]["install_path"],
-        "ShooterGame/Binaries/Win64/ShooterGame/ModsUserData/83374/library.json",
-    )
-    # load file as json into python dict
-    with open(file_path, encoding="utf-8-sig") as f:  # Specify UTF-8 encoding
-        data = json.load(f)
+def curseforge_client() -> CurseForgeClient:
+    return get_curseforge_client(_get_api_key)
+
+
+@dataclass
+class InstalledMod:
+    mod_id: int
+    file_id: int | None
+    name: str
+    path: str | None  # the mod's folder (pathOnDisk), as recorded by the server
+    installed_dt: datetime | None
+
 
-    return data
+@dataclass
+class ModLibrary:
+    """A read of the server's mod library."""
 
+    data: dict  # as read, to write changes back
+    encoding: str  # "utf-8-sig" if the server wrote it with a BOM
+    # One per installedMods entry, None where the entry was skipped: it is
+    # malformed, or lists a mod that another entry lists too
+    entries: list[InstalledMod | None]
+    mods: dict[int, InstalledMod]  # the entries that weren't skipped, by mod id
 
-def _get_installed_mods() -> set[int]:
-    mods = set()
-    for i in _local_mod_file()["installedMods"]:
-        mods.add(int(i["installedFile"]["modId"]))
-    return mods
 
+def _parse_installed_date(date_string: str) -> datetime:
+    # e.g. "2024.06.01-10.00.00", seconds dropped
+    return datetime.strptime(date_string[: date_string.rfind(".")], "%Y.%m.%d-%H.%M")
 
-def _get_installed_mod_timestamp(mod_id: int) -> tuple[str, datetime | None]:
-    date_format = "%Y.%m.%d-%H.%M"
-    local_mod_data = _local_mod_file()
 
+def _parse_entry(entry: dict) -> InstalledMod:
+    """Reads one installedMods entry, raising if it is malformed."""
+    installed_file = entry["installedFile"]
+    mod_id = int(installed_file["modId"])
+    name = (entry.get("details") or {}).get("name", "")
     try:
-        for mod in local_mod_data["installedMods"]:
-            if int(mod["installedFile"]["modId"]) == mod_id:
-                mod_name = mod["details"]["name"]
-                date_string = mod["installedFile"]["fileDate"]
-                last_period_pos = date_string.rfind(".")
-                new_string = date_string[:last_period_pos]
+        installed_dt = _parse_installed_date(installed_file["fileDate"])
+    except (KeyError, ValueError) as e:
+        logger.error(f"Invalid installed date for {name or mod_id}: {e}")
+        installed_dt = None
+    logger.debug(f"{name} installed timestamp: {installed_dt}")
+    return InstalledMod(
+        mod_id,
+        int(installed_file["id"]) if "id" in installed_file else None,
+        name,
+        entry.get("pathOnDisk"),
+        installed_dt,
+    )
 
-                timestamp = datetime.strptime(new_string, date_format)
-                logger.debug(f"{mod_name} installed timestamp: {timestamp}")
 
-                return mod_name, timestamp
-    except Exception as e:
-        logger.error(f"_get_installed_mod_timestamp: {e}")
-        # pretty print the local_mod_data as json
-        print(json.dumps(local_mod_data, indent=4))
-    return "", None
+def read_library(path: str) -> ModLibrary:
+    """
+    Reads a mod library. Entries that can't be used are skipped (and logged)
+    one by one rather than failing the whole read.
+
+    :raises OSError: If the library can't be read.
+    :raises ValueError: If it isn't valid JSON or has no installedMods list.
+    """
+    with open(path, "rb") as f:
+        raw = f.read()
+    encoding = "utf-8-sig" if raw.startswith(b"\xef\xbb\xbf") else "utf-8"
+    data = json.loads(raw.decode(encoding))
+    if not isinstance(data, dict) or not isinstance(data.get("installedMods"), list):
+        raise ValueError(f"No installedMods in {path}")
+
+    entries = []
+    for entry in data["installedMods"]:
+        try:
+            entries.append(_parse_entry(entry))
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            logger.warning(f"Skipping malformed mod library entry: {e!r}")
+            entries.append(None)
+    counts = Counter(mod.mod_id for mod in entries if mod is not None)
+    for i, mod in enumerate(entries):
+        if mod is not None and counts[mod.mod_id] > 1:
+            logger.warning(f"Skipping mod {mod.mod_id}, it is installed twice")
+            entries[i] = None
+    mods = {mod.mod_id: mod for mod in entries if mod is not None}
+    return ModLibrary(data, encoding, entries, mods)
+
+
+def write_library(path: str, library: ModLibrary) -> None:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding=library.encoding) as f:
+        json.dump(library.data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def library_path(install_path: str) -> str:
+    return os.path.join(
+        install_path, MODS_USER_DATA_PATH, CURSEFORGE_GAME_ID, "library.json"
+    )
+
+
+class InstalledModIndex:
+    """
+    The mods installed on the server, by mod id, read from the server's mod
+    library (``library.json``). The library is read again whenever its
+    mtime or size changes, e.g. after the server downloaded new mod versions.
+    No library means no mods are installed yet.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._signature: tuple[int, int] | None = None
+        self._library: ModLibrary | None = None
+        self._lock = threading.Lock()
+
+    def _build(self) -> ModLibrary:
+        return read_library(self.path)
+
+    def library(self) -> ModLibrary | None:
+        """
+        The library as last read, shared between callers: copy ``data``
+        before changing it.
+
+        :return: The library, or None if there is none.
+        :raises OSError: If the library can't be read.
+        :raises ValueError: If it isn't a valid library.
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            with self._lock:
+                self._signature, self._library = None, None
+                return None
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if signature != self._signature:
+                self._library = self._build()
+                self._signature = signature
+            return self._library
+
+    def invalidate(self) -> None:
+        """
+        Makes the next read rebuild the index, for writers of the library:
+        a rewrite of the same size within the filesystem's mtime resolution
+        wouldn't be noticed otherwise.
+        """
+        with self._lock:
+            self._signature = None
+
+    def mods(self) -> dict[int, InstalledMod]:
+        """
+        :raises OSError: If the library can't be read.
+        :raises ValueError: If it isn't a valid library.
+        """
+        library = self.library()
+        return library.mods if library is not None else {}
+
+
+INSTALLED_MODS = InstalledModIndex(library_path(CONFIG["server"]["install_path"]))
 
 
 def _fetch_mod_data(mod_ids: int | list[int]) -> dict:
@@ -104,26 +222,14 @@ def _fetch_mod_data(mod_ids: int | list[int]) -> dict:
 
     :param mod_ids: A single mod ID or a list of mod IDs to query.
     :return: A dictionary containing the response data from the API.
+    :raises requests.RequestException: If CurseForge can't be reached or returns an error.
     """
-    try:
-        # Convert a single integer to a list
-        if isinstance(mod_ids, int):
-            mod_ids = [mod_ids]
-
-        headers = {
-            "Content-Type": "application/json",
-            "Accept": "application/json",
-            "x-api-key": _get_api_key(),
-        }
-        payload = {"modIds": mod_ids, "filterPcOnly": True}
-        response = requests.post(
-            "https://api.curseforge.com/v1/mods", headers=headers, json=payload
-        )
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        logger.error(f"_fetch_mod_data: {e}")
-        return {}
+    # Convert a single integer to a list
+    if isinstance(mod_ids, int):
+        mod_ids = [mod_ids]
+
+    mods = curseforge_client().get_mods(mod_ids)
+    return {"data": list(mods.values())}
 
 
 def _get_remote_mod_info(
@@ -134,10 +240,10 @@ def _get_remote_mod_info(
 
     :param mod_ids: A list of mod IDs to query.
     :return: A dictionary mapping mod IDs to a tuple of mod name, latest timestamp, and approval status.
+    :raises requests.RequestException: If CurseForge can't be reached or returns an error.
     """
+    response_data = _fetch_mod_data(mod_ids)
     try:
-        date_format = "%Y-%m-%dT%H:%M"
-        response_data = _fetch_mod_data(mod_ids)
         if CONFIG["advanced"]["log_level"] == "debug":
             timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
             outdir = os.path.join(OUTDIR, "mods")
@@ -150,10 +256,8 @@ def _get_remote_mod_info(
         for mod in response_data.get("data", []):
             mod_id = int(mod["id"])
             mod_name = mod["name"]
-            date_string = mod["dateReleased"]
-            last_colon_pos = date_string.rfind(":")
-            new_string = date_string[:last_colon_pos]
-            timestamp = datetime.strptime(new_string, date_format)
+            # e.g. "2024-06-05T12:00:42.123Z", to the minute
+            timestamp = datetime.fromisoformat(mod["dateReleased"][:16])
 
             # get latest file info to determine whether the mod is approved
             is_approved = False
@@ -177,22 +281,22 @@ def _get_remote_mod_info(
 
 
 def get_all_mods() -> list[Mod]:
-    mod_list = list(_get_installed_mods())
-    remote_mod_info = _get_remote_mod_info(mod_list)
+    installed = INSTALLED_MODS.mods()
+    remote_mod_info = _get_remote_mod_info(list(installed))
 
     all_mods = []
-    for mod_id in mod_list:
-        installed_name, installed_timestamp = _get_installed_mod_timestamp(mod_id)
+    for mod_id, mod in installed.items():
         _, latest_timestamp, is_approved = remote_mod_info.get(
             mod_id, ("", None, False)
         )
 
         all_mods.append(
             Mod(
-                name=installed_name,
-                installed_dt=installed_timestamp,
+                name=mod.name,
+                installed_dt=mod.installed_dt,
                 latest_dt=latest_timestamp,
                 is_approved=is_approved,
+                mod_id=mod_id,
             )
         )
 
@@ -216,13 +320,9 @@ def mods_needing_update() -> list[Mod]:
 
 
 def delete_mods_folder() -> None:
-    mods_folder = os.path.join(
-        CONFIG["server"]["install_path"],
-        "ShooterGame/Binaries/Win64/ShooterGame/Mods",
-    )
+    mods_folder = os.path.join(CONFIG["server"]["install_path"], MODS_PATH)
     mods_user_data_folder = os.path.join(
-        CONFIG["server"]["install_path"],
-        "ShooterGame/Binaries/Win64/ShooterGame/ModsUserData",
+        CONFIG["server"]["install_path"], MODS_USER_DATA_PATH
     )
 
     try:
@@ -0,0 +1,380 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Iterable
+
+from config import CONFIG, OUTDIR
+from logger import get_logger
+from webhook import Delivery, get_sender
+
+logger = get_logger(__name__)
+
+# A deliverer receives the channel suffix (e.g. "log_webhook" for
+# "discord:log_webhook") and the queued payloads, oldest first, and returns
+# what became of each payload.
+Deliverer = Callable[[str, list[str]], list[Delivery]]
+# Given the same channel suffix, tells how many seconds the channel asked to
+# be left alone for (e.g. a rate limit's reset), or 0 if it didn't.
+RetryHint = Callable[[str], float]
+
+
+class Outbox:
+    """
+    Durable FIFO of outbound notifications, kept in a SQLite table in WAL mode.
+
+    Enqueueing is a single append. With ``synchronous=NORMAL``, commits are
+    written to the WAL without waiting for an fsync, and fsyncs happen in
+    batches at checkpoints. Messages survive a crash of the suite. Delivered
+    rows are deleted, and the WAL and free pages are reclaimed by ``compact``,
+    so disk use stays bounded by ``max_messages``. Messages that can't be
+    delivered are moved to a ``dead_letter`` table, which keeps the latest
+    ``max_messages`` of them.
+    """
+
+    def __init__(self, path: str, max_messages: int = 10000):
+        self.path = path
+        self.max_messages = max_messages
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.execute("PRAGMA synchronous = NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "channel TEXT NOT NULL, "
+            "payload TEXT NOT NULL, "
+            "created REAL NOT NULL, "
+            "attempts INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS dead_letter ("
+            "id INTEGER PRIMARY KEY, "
+            "channel TEXT NOT NULL, "
+            "payload TEXT NOT NULL, "
+            "created REAL NOT NULL, "
+            "attempts INTEGER NOT NULL, "
+            "reason TEXT NOT NULL)"
+        )
+        (self._count,) = self._db.execute("SELECT COUNT(*) FROM outbox").fetchone()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def enqueue(self, channel: str, payload: str) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO outbox (channel, payload, created) VALUES (?, ?, ?)",
+                (channel, payload, time.time()),
+            )
+            self._count += 1
+            if self._count > self.max_messages:
+                overflow = self._count - self.max_messages
+                self._db.execute(
+                    "DELETE FROM outbox WHERE id IN "
+                    "(SELECT id FROM outbox ORDER BY id LIMIT ?)",
+                    (overflow,),
+                )
+                self._count -= overflow
+                logger.warning(f"Outbox full, dropped {overflow} oldest messages")
+
+    def pending(
+        self, limit: int = 500, exclude: Iterable[str] = ()
+    ) -> list[tuple[int, str, str, int]]:
+        """
+        Returns up to ``limit`` queued ``(id, channel, payload, attempts)``
+        rows, oldest first.
+
+        :param exclude: Channels to leave out, so that a backlog in them
+            doesn't fill the limit.
+        """
+        exclude = tuple(exclude)
+        placeholders = ", ".join("?" * len(exclude))
+        with self._lock:
+            return self._db.execute(
+                "SELECT id, channel, payload, attempts FROM outbox "
+                f"WHERE channel NOT IN ({placeholders}) ORDER BY id LIMIT ?",
+                (*exclude, limit),
+            ).fetchall()
+
+    def ack(self, ids: list[int]) -> None:
+        """Removes delivered messages."""
+        with self._lock:
+            self._db.executemany("DELETE FROM outbox WHERE id = ?", [(i,) for i in ids])
+            self._count -= len(ids)
+
+    def retry_later(self, ids: list[int], max_attempts: int) -> None:
+        """
+        Records a failed delivery of messages, moving those that ran out of
+        attempts to the dead letters.
+        """
+        with self._lock:
+            self._db.executemany(
+                "UPDATE outbox SET attempts = attempts + 1 WHERE id = ?",
+                [(i,) for i in ids],
+            )
+            expired = [
+                row_id
+                for (row_id,) in self._db.execute(
+                    "SELECT id FROM outbox WHERE attempts >= ?", (max_attempts,)
+                )
+            ]
+            self._dead_letter(expired, f"failed {max_attempts} times")
+        if expired:
+            logger.error(
+                f"Gave up on {len(expired)} messages after {max_attempts} attempts"
+            )
+
+    def dead_letter(self, ids: list[int], reason: str) -> None:
+        """Moves messages that will never be delivered to the dead letters."""
+        with self._lock:
+            self._dead_letter(ids, reason)
+        if ids:
+            logger.error(f"Moved {len(ids)} undeliverable messages aside: {reason}")
+
+    def _dead_letter(self, ids: list[int], reason: str) -> None:
+        if not ids:
+            return
+        self._db.execute("BEGIN")
+        try:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO dead_letter "
+                "(id, channel, payload, created, attempts, reason) "
+                "SELECT id, channel, payload, created, attempts, ? "
+                "FROM outbox WHERE id = ?",
+                [(reason, i) for i in ids],
+            )
+            self._db.executemany("DELETE FROM outbox WHERE id = ?", [(i,) for i in ids])
+            self._db.execute(
+                "DELETE FROM dead_letter WHERE id NOT IN "
+                "(SELECT id FROM dead_letter ORDER BY id DESC LIMIT ?)",
+                (self.max_messages,),
+            )
+            self._db.execute("COMMIT")
+        except sqlite3.Error:
+            self._db.execute("ROLLBACK")
+            raise
+        self._count -= len(ids)
+
+    def dead_letters(self, limit: int = 100) -> list[tuple[int, str, str, str]]:
+        """Returns up to ``limit`` ``(id, channel, payload, reason)`` dead letters, newest first."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT id, channel, payload, reason FROM dead_letter "
+                "ORDER BY id DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+
+    def compact(self) -> None:
+        with self._lock:
+            self._db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._db.execute("PRAGMA incremental_vacuum")
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class OutboxDrainer:
+    """
+    Background thread that delivers outbox messages in order, at least once.
+
+    After a message is enqueued, the drainer waits ``window`` seconds so that
+    messages arriving close together go out as one batch. Each channel is
+    delivered in id order. Only the messages that failed are retried: a
+    failing channel waits as long as its retry hint asks, or else backs off
+    exponentially, and does not hold up the others. A message the deliverer
+    rejects outright is moved to the dead letters without holding up the
+    rest of its channel. Deliverers never wait themselves, so all retry
+    timing happens here.
+    """
+
+    def __init__(
+        self,
+        outbox: Outbox,
+        window: float = 1.0,
+        max_attempts: int = 20,
+        max_backoff: float = 60,
+        compact_interval: float = 600,
+    ):
+        self.outbox = outbox
+        self.window = window
+        self.max_attempts = max_attempts
+        self.max_backoff = max_backoff
+        self.compact_interval = compact_interval
+        self._deliverers: dict[str, Deliverer] = {}
+        self._retry_hints: dict[str, RetryHint] = {}
+        self._retry_at: dict[str, float] = {}
+        self._failures: dict[str, int] = {}
+        self._wake = threading.Event()
+        self._idle = threading.Event()
+        self._stopped = False
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def register(
+        self, kind: str, deliverer: Deliverer, retry_hint: RetryHint | None = None
+    ) -> None:
+        """
+        Registers the deliverer for channels named ``"<kind>:<name>"``.
+
+        :param retry_hint: Tells how long to wait before retrying a channel,
+            in place of the exponential backoff.
+        """
+        self._deliverers[kind] = deliverer
+        if retry_hint is not None:
+            self._retry_hints[kind] = retry_hint
+
+    def notify(self) -> None:
+        self._idle.clear()
+        self._wake.set()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="outbox-drainer", daemon=True
+                )
+                self._thread.start()
+        self.notify()  # deliver anything left over from a previous run
+
+    def _run(self) -> None:
+        last_compact = time.monotonic()
+        while not self._stopped:
+            timeout = None
+            if self._retry_at:
+                timeout = max(0, min(self._retry_at.values()) - time.monotonic())
+            self._wake.wait(timeout)  # a new message or an expired backoff
+            self._wake.clear()
+            if self._stopped:
+                return
+            if self.window:
+                time.sleep(self.window)
+            try:
+                self.drain()
+            except Exception as e:
+                logger.error(f"Error draining outbox: {e}")
+            if time.monotonic() - last_compact >= self.compact_interval:
+                self.outbox.compact()
+                last_compact = time.monotonic()
+            if not len(self.outbox):
+                self._idle.set()
+
+    def drain(self) -> None:
+        """Delivers every channel that isn't backing off, oldest message first."""
+        now = time.monotonic()
+        self._retry_at = {c: t for c, t in self._retry_at.items() if t > now}
+        blocked = set(self._retry_at)
+        while rows := self.outbox.pending(exclude=blocked):
+            batches: dict[str, list[tuple[int, str]]] = {}
+            for row_id, channel, payload, _ in rows:
+                batches.setdefault(channel, []).append((row_id, payload))
+            for channel, batch in batches.items():
+                results = self._deliver(channel, [payload for _, payload in batch])
+                ids: dict[Delivery, list[int]] = {result: [] for result in Delivery}
+                for (row_id, _), result in zip(batch, results):
+                    ids[result].append(row_id)
+                self.outbox.ack(ids[Delivery.SENT])
+                self.outbox.dead_letter(
+                    ids[Delivery.REJECTED], f"rejected by {channel}"
+                )
+                if not (ids[Delivery.RETRY] or ids[Delivery.PENDING]):
+                    self._retry_at.pop(channel, None)
+                    self._failures.pop(channel, None)
+                else:
+                    # Pending messages weren't tried, so they don't use up attempts
+                    self.outbox.retry_later(ids[Delivery.RETRY], self.max_attempts)
+                    failures = self._failures.get(channel, 0) + 1
+                    self._failures[channel] = failures
+                    delay = self._retry_hint(channel) or min(
+                        self.max_backoff, 2 ** (failures - 1)
+                    )
+                    self._retry_at[channel] = time.monotonic() + delay
+                    blocked.add(channel)
+                    logger.warning(
+                        f"Delivery to {channel} failed, retrying in {delay:.2f}s"
+                    )
+
+    def _deliver(self, channel: str, payloads: list[str]) -> list[Delivery]:
+        kind, _, name = channel.partition(":")
+        deliverer = self._deliverers.get(kind)
+        if deliverer is None:
+            logger.error(f"No deliverer registered for {channel}")
+            return [Delivery.REJECTED] * len(payloads)
+        try:
+            results = deliverer(name, payloads)
+        except Exception as e:
+            logger.error(f"Error delivering to {channel}: {e}")
+            return [Delivery.RETRY] * len(payloads)
+        if len(results) != len(payloads):
+            logger.error(
+                f"Delivery to {channel} returned {len(results)} results for {len(payloads)} messages"
+            )
+            return [Delivery.RETRY] * len(payloads)
+        return results
+
+    def _retry_hint(self, channel: str) -> float:
+        kind, _, name = channel.partition(":")
+        retry_hint = self._retry_hints.get(kind)
+        if retry_hint is None:
+            return 0
+        try:
+            return max(0.0, retry_hint(name))
+        except Exception as e:
+            logger.error(f"Error getting the retry hint for {channel}: {e}")
+            return 0
+
+    def wait_idle(self, timeout: float | None = None) -> bool:
+        """Blocks until the outbox has been emptied."""
+        return self._idle.wait(timeout)
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stopped = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+def _deliver_discord(webhook_type: str, payloads: list[str]) -> list[Delivery]:
+    url = CONFIG["discord"].get(webhook_type)
+    if not url:
+        logger.warning(f"Discord {webhook_type} is no longer configured")
+        return [Delivery.REJECTED] * len(payloads)
+    return get_sender(url).deliver(payloads)
+
+
+def _discord_retry_hint(webhook_type: str) -> float:
+    url = CONFIG["discord"].get(webhook_type)
+    return get_sender(url).retry_after if url else 0
+
+
+_drainer = None
+_drainer_lock = threading.Lock()
+
+
+def get_drainer() -> OutboxDrainer:
+    """Returns the shared outbox drainer, starting it on first use."""
+    global _drainer
+    with _drainer_lock:
+        if _drainer is None:
+            outbox_config = CONFIG["advanced"].get("outbox", {}) or {}
+            outbox = Outbox(
+                os.path.join(OUTDIR, "outbox.sqlite3"),
+                max_messages=outbox_config.get("max_messages", 10000),
+            )
+            _drainer = OutboxDrainer(
+                outbox,
+                window=CONFIG["discord"].get("batch_window", 1.0),
+                max_attempts=outbox_config.get("max_attempts", 20),
+            )
+            _drainer.register("discord", _deliver_discord, _discord_retry_hint)
+            _drainer.start()
+        return _drainer
+
+
+def enqueue_notification(channel: str, payload: str) -> None:
+    drainer = get_drainer()
+    drainer.outbox.enqueue(channel, payload)
+    drainer.notify()
@@ -1,76 +1,532 @@
 import socket
 import struct
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, TypeVar
 
 from config import CONFIG
+from errors import RCONAuthError, RCONError
 from logger import get_logger
 from utils import send_to_discord, time_as_string
 
 logger = get_logger(__name__)
 
 
-class RCON:
-    SERVERDATA_EXECCOMMAND = 2
-    SERVERDATA_AUTH = 3
+SERVERDATA_RESPONSE_VALUE = 0
+SERVERDATA_AUTH_RESPONSE = 2
+SERVERDATA_EXECCOMMAND = 2
+SERVERDATA_AUTH = 3
+
+PACKET_HEADER = struct.Struct("<iii")  # size, id, type
+MIN_PACKET_SIZE = 10  # id + type + two null terminators
+MAX_PACKET_SIZE = 1 << 20
+
+T = TypeVar("T")
+
+
+def encode_packet(req_id: int, out_type: int, body: str) -> bytes:
+    payload = body.encode("utf-8")
+    return (
+        PACKET_HEADER.pack(len(payload) + MIN_PACKET_SIZE, req_id, out_type)
+        + payload
+        + b"\x00\x00"
+    )
+
+
+class PacketBuffer:
+    """
+    Reassembles RCON packets from a byte stream.
+
+    Incoming bytes are written into one reusable bytearray (either directly via
+    ``recv_into`` on the view returned by ``writable`` or through ``feed``), and
+    complete packet bodies are copied out exactly once into the caller's buffer,
+    no matter how the stream was split across reads.
+    """
+
+    def __init__(self, size: int = 4096):
+        self._buf = bytearray(size)
+        self._start = 0
+        self._end = 0
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    def _reserve(self, n: int) -> None:
+        if len(self._buf) - self._end >= n:
+            return
+        pending = self._end - self._start
+        if self._start:
+            self._buf[:pending] = self._buf[self._start : self._end]
+            self._start, self._end = 0, pending
+        if len(self._buf) - self._end < n:
+            self._buf.extend(bytes(max(n, len(self._buf))))
+
+    def writable(self, n: int = 4096) -> memoryview:
+        """Returns a view with room for at least ``n`` bytes; call ``commit`` after filling it."""
+        self._reserve(n)
+        return memoryview(self._buf)[self._end :]
+
+    def commit(self, n: int) -> None:
+        self._end += n
+
+    def feed(self, data: bytes) -> None:
+        self._reserve(len(data))
+        self._buf[self._end : self._end + len(data)] = data
+        self._end += len(data)
+
+    def peek(self) -> tuple[int, int] | None:
+        """Returns ``(request_id, packet_type)`` of the next complete packet without consuming it."""
+        if len(self) < PACKET_HEADER.size:
+            return None
+        size, req_id, pkt_type = PACKET_HEADER.unpack_from(self._buf, self._start)
+        if len(self) < size + 4:
+            return None
+        return req_id, pkt_type
+
+    def next_packet(self, out: bytearray | None = None) -> tuple[int, int] | None:
+        """
+        Pops the next complete packet, appending its body to ``out``.
+
+        :return: ``(request_id, packet_type)``, or None if no complete packet is buffered yet.
+        """
+        if len(self) < PACKET_HEADER.size:
+            return None
+        size, req_id, pkt_type = PACKET_HEADER.unpack_from(self._buf, self._start)
+        if not MIN_PACKET_SIZE <= size <= MAX_PACKET_SIZE:
+            raise RCONError(f"Invalid RCON packet size: {size}")
+        if len(self) < size + 4:
+            return None
+        if out is not None:
+            body_start = self._start + PACKET_HEADER.size
+            body_end = self._start + 4 + size - 2
+            with memoryview(self._buf) as view:
+                out += view[body_start:body_end]
+        self._start += size + 4
+        if self._start == self._end:
+            self._start = self._end = 0
+        return req_id, pkt_type
+
 
-    def __init__(self, host, port, password):
+class RCON:
+    SERVERDATA_EXECCOMMAND = SERVERDATA_EXECCOMMAND
+    SERVERDATA_AUTH = SERVERDATA_AUTH
+
+    def __init__(
+        self,
+        host,
+        port,
+        password,
+        timeout: float | None = None,
+        multi_packet: bool = True,
+        sentinel_timeout: float = 1.0,
+    ):
         self.host = host
         self.port = port
         self.password = password
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.req_id = 1
-
-    def _send(self, out_type, command):
-        data = (
-            struct.pack("<ii", self.req_id, out_type)
-            + command.encode("utf-8")
-            + b"\x00\x00"
+        self.sock.settimeout(timeout)
+        self.timeout = timeout
+        self.req_id = 0
+        self.multi_packet = multi_packet
+        # The mirror follows the response right away, so there is no need to
+        # wait the full timeout for one that isn't coming
+        self.sentinel_timeout = (
+            sentinel_timeout if timeout is None else min(timeout, sentinel_timeout)
         )
-        self.sock.send(struct.pack("<i", len(data)) + data)
-
-        (length,) = struct.unpack("<i", self.sock.recv(4))
-        resp = self.sock.recv(length)
-
-        if len(resp) < 8:
-            raise Exception(f"Unexpected RCON response: {resp}")
-
-        (
-            resp_id,
-            resp_type,
-        ) = struct.unpack("<ii", resp[:8])
-
-        if resp_id == -1:
-            raise Exception("RCON authentication failed.")
-        return resp[8:-2].decode("utf-8")
+        self._buffer = PacketBuffer()
+
+    def _next_id(self) -> int:
+        self.req_id = self.req_id % 0x7FFFFFFF + 1
+        return self.req_id
+
+    def _read_packet(self, out: bytearray | None = None) -> tuple[int, int]:
+        while (packet := self._buffer.next_packet(out)) is None:
+            with self._buffer.writable() as view:
+                n = self.sock.recv_into(view)
+            if not n:
+                raise RCONError("RCON connection closed by server.")
+            self._buffer.commit(n)
+        return packet
+
+    def _auth(self) -> None:
+        req_id = self._next_id()
+        self.sock.sendall(encode_packet(req_id, SERVERDATA_AUTH, self.password))
+        while True:
+            resp_id, resp_type = self._read_packet()
+            if resp_type != SERVERDATA_AUTH_RESPONSE:
+                continue  # Source servers send an empty RESPONSE_VALUE first
+            if resp_id == -1:
+                raise RCONAuthError("RCON authentication failed.")
+            if resp_id == req_id:
+                return
+
+    def _execute(self, commands: list[str]) -> list[str]:
+        """
+        Sends commands back to back in a single write and joins every
+        response packet belonging to each of them.
+
+        When ``multi_packet`` is set, an empty RESPONSE_VALUE packet is sent
+        right after each command. The server answers packets in order, so its
+        mirror marks the end of a response that was split across packets, and
+        an answer to a later command arriving first means the server ignores
+        empty packets. Once a response has arrived, its mirror is only waited
+        for ``sentinel_timeout`` seconds. Packets with ids from earlier
+        commands are discarded.
+        """
+        multi_packet = self.multi_packet
+        positions = {}
+        sentinel_ids = []
+        payload = bytearray()
+        for index, command in enumerate(commands):
+            req_id = self._next_id()
+            positions[req_id] = index
+            payload += encode_packet(req_id, SERVERDATA_EXECCOMMAND, command)
+            if multi_packet:
+                sentinel_ids.append(self._next_id())
+                payload += encode_packet(
+                    sentinel_ids[-1], SERVERDATA_RESPONSE_VALUE, ""
+                )
+        self.sock.sendall(payload)
+
+        bodies = [bytearray() for _ in commands]
+        current = 0
+        received = False
+        try:
+            while current < len(commands):
+                packet = bytearray()
+                self._set_timeout(
+                    self.sentinel_timeout if multi_packet and received else self.timeout
+                )
+                try:
+                    resp_id, _ = self._read_packet(packet)
+                except socket.timeout:
+                    if not (multi_packet and received):
+                        raise
+                    # Server answered but never mirrored the sentinel
+                    multi_packet = False
+                    self._disable_multi_packet()
+                    current += 1
+                    received = False
+                    continue
+                index = positions.get(resp_id, -1)
+                if index >= current:
+                    if index > current:
+                        # Server skipped the sentinel and went on to the next command
+                        multi_packet = False
+                        self._disable_multi_packet()
+                        current = index
+                    bodies[index] += packet
+                    received = True
+                    if not multi_packet:
+                        current += 1
+                        received = False
+                elif multi_packet and resp_id == sentinel_ids[current]:
+                    current += 1
+                    received = False
+        finally:
+            self._set_timeout(self.timeout)
+        return [body.decode("utf-8", errors="replace") for body in bodies]
+
+    def _set_timeout(self, timeout: float | None) -> None:
+        if self.sock.gettimeout() != timeout:
+            self.sock.settimeout(timeout)
+
+    def _disable_multi_packet(self) -> None:
+        logger.debug("RCON server ignores empty packets, disabling multi-packet reads")
+        self.multi_packet = False
 
     def connect(self):
         self.sock.connect((self.host, self.port))
-        self._send(self.SERVERDATA_AUTH, self.password)
+        self._auth()
 
     def send(self, command):
-        return self._send(self.SERVERDATA_EXECCOMMAND, command)
+        return self._execute([command])[0]
+
+    def send_many(self, commands: list[str]) -> list[str]:
+        """Pipelines commands, paying for a single round trip."""
+        return self._execute(commands)
 
     def close(self):
         self.sock.close()
 
 
+@dataclass
+class PoolStats:
+    connections: int
+    idle: int
+    in_flight: int
+    commands: int
+    failures: int
+    reconnects: int
+    auth_latency_last: float | None
+    auth_latency_avg: float | None
+
+
+class _PooledConnection:
+    def __init__(self, rcon: RCON):
+        self.rcon = rcon
+        self.last_used = time.monotonic()
+        self.fresh = True
+
+
+class RCONPool:
+    """
+    Keeps a small set of authenticated RCON connections open and hands them out
+    to callers, so that back-to-back commands don't each pay for a connect and
+    an auth round trip. Dead connections (e.g. after a server restart) are
+    dropped and transparently replaced on the next command.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        password: str,
+        size: int = 2,
+        heartbeat_interval: float = 30,
+        timeout: float = 10,
+        multi_packet: bool = True,
+        sentinel_timeout: float = 1.0,
+    ):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.multi_packet = multi_packet
+        self.sentinel_timeout = sentinel_timeout
+        self.size = max(1, size)
+        self.heartbeat_interval = heartbeat_interval
+        self.timeout = timeout
+
+        self._cond = threading.Condition()
+        self._idle: list[_PooledConnection] = []
+        self._open = 0
+        self._in_flight = 0
+        self._commands = 0
+        self._failures = 0
+        self._reconnects = 0
+        self._dropped = 0
+        self._auth_count = 0
+        self._auth_total = 0.0
+        self._auth_last = None
+        self._closed = False
+        self._heartbeat_thread = None
+
+    def _connect(self) -> _PooledConnection:
+        rcon = RCON(
+            self.host,
+            self.port,
+            self.password,
+            timeout=self.timeout,
+            multi_packet=self.multi_packet,
+            sentinel_timeout=self.sentinel_timeout,
+        )
+        start = time.perf_counter()
+        try:
+            rcon.connect()
+        except RCONAuthError:
+            rcon.close()
+            raise
+        except (OSError, RCONError, struct.error) as e:
+            rcon.close()
+            raise RCONError(f"Could not connect to {self.host}:{self.port}: {e}") from e
+        elapsed = time.perf_counter() - start
+        with self._cond:
+            self._auth_count += 1
+            self._auth_total += elapsed
+            self._auth_last = elapsed
+            if self._dropped:
+                self._dropped -= 1
+                self._reconnects += 1
+        logger.debug(f"RCON connection authenticated in {elapsed * 1000:.1f} ms")
+        return _PooledConnection(rcon)
+
+    def _acquire(self) -> _PooledConnection:
+        with self._cond:
+            while not self._idle and self._open >= self.size:
+                self._cond.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._open += 1
+        try:
+            return self._connect()
+        except BaseException:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+
+    def _release(self, conn: _PooledConnection) -> None:
+        with self._cond:
+            conn.last_used = time.monotonic()
+            if self._closed:
+                self._open -= 1
+                conn.rcon.close()
+            else:
+                self._idle.append(conn)
+            self._cond.notify()
+
+    def _discard(self, conn: _PooledConnection) -> None:
+        conn.rcon.close()
+        with self._cond:
+            self._open -= 1
+            self._dropped += 1
+            self._cond.notify()
+
+    def execute(self, command: str) -> str:
+        """
+        Sends a command over a pooled connection and returns the response.
+
+        A reused connection that turns out to be dead is replaced and the
+        command retried once; errors on a fresh connection are raised.
+        """
+        return self._run(lambda rcon: rcon.send(command), 1)
+
+    def execute_many(self, commands: list[str]) -> list[str]:
+        """
+        Pipelines several commands over one pooled connection and returns
+        their responses in order. Dead connections are handled as in
+        ``execute``.
+        """
+        return self._run(lambda rcon: rcon.send_many(commands), len(commands))
+
+    def _run(self, send: Callable[[RCON], T], commands: int) -> T:
+        self._ensure_heartbeat()
+        with self._cond:
+            self._in_flight += 1
+            self._commands += commands
+        try:
+            for attempt in range(2):
+                conn = self._acquire()
+                try:
+                    response = send(conn.rcon)
+                except RCONAuthError:
+                    self._discard(conn)
+                    raise
+                except (OSError, RCONError, struct.error) as e:
+                    self._discard(conn)
+                    if attempt == 0 and not conn.fresh:
+                        logger.debug(f"RCON connection lost ({e}), reconnecting...")
+                        continue
+                    raise RCONError(f"RCON command failed: {e}") from e
+                conn.fresh = False
+                if self.multi_packet and not conn.rcon.multi_packet:
+                    self._disable_multi_packet()
+                self._release(conn)
+                return response
+        except BaseException:
+            with self._cond:
+                self._failures += 1
+            raise
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+
+    def _disable_multi_packet(self) -> None:
+        """
+        Remembers that the server ignores empty packets, so that neither new
+        nor already open connections wait for the sentinel again.
+        """
+        with self._cond:
+            self.multi_packet = False
+            for conn in self._idle:
+                conn.rcon.multi_packet = False
+
+    def _ensure_heartbeat(self) -> None:
+        if not self.heartbeat_interval or self._heartbeat_thread is not None:
+            return
+        with self._cond:
+            if self._heartbeat_thread is None:
+                self._heartbeat_thread = threading.Thread(
+                    target=self._heartbeat, name="rcon-heartbeat", daemon=True
+                )
+                self._heartbeat_thread.start()
+
+    def _heartbeat(self) -> None:
+        while not self._closed:
+            time.sleep(self.heartbeat_interval)
+            now = time.monotonic()
+            with self._cond:
+                stale = [
+                    conn
+                    for conn in self._idle
+                    if now - conn.last_used >= self.heartbeat_interval
+                ]
+                for conn in stale:
+                    self._idle.remove(conn)
+            for conn in stale:
+                try:
+                    conn.rcon.send("")
+                except (OSError, RCONError, struct.error) as e:
+                    logger.debug(f"RCON heartbeat failed ({e}), dropping connection")
+                    self._discard(conn)
+                else:
+                    self._release(conn)
+
+    def stats(self) -> PoolStats:
+        with self._cond:
+            return PoolStats(
+                connections=self._open,
+                idle=len(self._idle),
+                in_flight=self._in_flight,
+                commands=self._commands,
+                failures=self._failures,
+                reconnects=self._reconnects,
+                auth_latency_last=self._auth_last,
+                auth_latency_avg=(
+                    self._auth_total / self._auth_count if self._auth_count else None
+                ),
+            )
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            conn.rcon.close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> RCONPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            rcon_config = CONFIG["advanced"].get("rcon", {}) or {}
+            _pool = RCONPool(
+                CONFIG["server"]["ip_address"],
+                CONFIG["server"]["rcon_port"],
+                CONFIG["server"]["admin_password"],
+                size=rcon_config.get("pool_size", 2),
+                heartbeat_interval=rcon_config.get("heartbeat_interval", 30),
+                timeout=rcon_config.get("timeout", 10),
+                multi_packet=rcon_config.get("multi_packet_responses", True),
+                sentinel_timeout=rcon_config.get("sentinel_timeout", 1.0),
+            )
+        return _pool
+
+
 def _rcon_cmd(command) -> str | None:
     try:
-        args = (
-            CONFIG["server"]["ip_address"],
-            CONFIG["server"]["rcon_port"],
-            CONFIG["server"]["admin_password"],
-        )
         logger.info(f"Sending RCON command: {command}")
-        rcon = RCON(*args)
-        rcon.connect()
-        response = rcon.send(command)
-        return response
+        return get_pool().execute(command)
     except Exception as e:
-        # Logging or raising an exception might be better than print
-        logger.error(f"RCON with args {args} and command {command} failed: {e}")
+        logger.error(f"RCON command {command} failed: {e}")
         return None
-    finally:
-        rcon.close()
+
+
+def _rcon_cmds(commands: list[str]) -> list[str] | list[None]:
+    """Pipelines several commands over one connection, returning Nones on failure."""
+    try:
+        logger.info(f"Sending RCON commands: {commands}")
+        return get_pool().execute_many(commands)
+    except Exception as e:
+        logger.error(f"RCON commands {commands} failed: {e}")
+        return [None] * len(commands)
 
 
 from logger import get_logger
@@ -94,6 +550,15 @@ def broadcast(message: str, discord_msg: bool = True) -> str:
     return _rcon_cmd(f"broadcast {message}")
 
 
+def announce(message: str, discord_msg: bool = True) -> list[str | None] | None:
+    """Sends a message to server chat and as a broadcast in a single burst."""
+    if message == "":
+        return None
+    if discord_msg:
+        send_to_discord(message)
+    return _rcon_cmds([f"serverchat {message}", f"broadcast {message}"])
+
+
 def save_world() -> bool:
     res = _rcon_cmd("saveworld")
     if res == "World Saved":
@@ -108,7 +573,7 @@ def destroy_wild_dinos() -> bool:
     return res
 
 
-def get_active_players() -> int:
+def get_player_names() -> list[str] | None:
     response = _rcon_cmd("ListPlayers")
     if not response:
         logger.error(f"Error getting active players")
@@ -116,11 +581,23 @@ def get_active_players() -> int:
 
     # Check for the "No Players Connected" response
     if "No Players Connected" in response:
-        logger.info(f"Found 0 active players")
-        return 0
+        return []
+
+    # Each line looks like "0. PlayerName, 0002a1b2c3d4e5f6..."
+    names = []
+    for line in response.strip().split("\n"):
+        _, _, entry = line.partition(". ")
+        name, _, _ = entry.rpartition(",")
+        names.append((name or entry or line).strip())
+    return names
+
+
+def get_active_players() -> int:
+    names = get_player_names()
+    if names is None:
+        return None
 
-    # Split the response by lines and count them to get the number of players
-    count = len(response.strip().split("\n"))
+    count = len(names)
     logger.info(f"Found {count} active players")
     return count
 
@@ -0,0 +1,126 @@
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta
+from typing import Callable
+
+from countdown import Countdown, warning_message
+from logger import get_logger
+from rcon import announce
+from scheduler import ScheduledItem, Scheduler
+from time_tracker import TimeTracker
+
+logger = get_logger(__name__)
+
+# Why a task wants the server restarted. ``install`` (if any) is run while the
+# server is down, e.g. to apply the update that prompted the restart.
+RestartIntent = namedtuple(
+    "RestartIntent", "description reason extra install", defaults=("", None)
+)
+
+
+class RestartBroker:
+    """
+    Collects restart intents from tasks and turns them into as few restarts
+    as possible.
+
+    The first intent opens a ``window`` (in seconds) during which others are
+    collected, and then a single warning countdown starts for all of them.
+    Intents that arrive during the countdown join it. If a planned restart
+    (the routine restart) is due before a countdown would end anyway,
+    intents wait for that restart instead of causing one of their own.
+    """
+
+    def __init__(
+        self,
+        scheduler: Scheduler,
+        restart: Callable[[str], None],
+        window: float = 120,
+        planned_restart: Callable[[], datetime | None] = lambda: None,
+    ):
+        self.scheduler = scheduler
+        self.restart = restart
+        self.window = window
+        self.planned_restart = planned_restart
+        self.countdown = Countdown(
+            scheduler, self._warn, self._finish, "restart countdown"
+        )
+        self._pending: list[RestartIntent] = []  # waiting for the window to close
+        self._warning_times: set[int] = set()
+        self._window_item: ScheduledItem | None = None
+        self._deferred: list[RestartIntent] = []  # waiting for the planned restart
+        self._due: list[RestartIntent] = []  # the countdown ended, restart running
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> bool:
+        """Whether a restart has been asked for and hasn't happened yet."""
+        with self._lock:
+            waiting = self._pending or self._deferred or self._due
+        return bool(waiting) or self.countdown.active
+
+    def submit(self, intent: RestartIntent, warning_times: list[int]) -> None:
+        """Asks for a restart, announced with ``warning_times`` (minutes) of warnings."""
+        with self._lock:
+            if self.countdown.active:
+                self.countdown.start(intent, warning_times)
+                return
+            now = datetime.now()
+            planned = self.planned_restart()
+            latest = now + timedelta(
+                seconds=self.window, minutes=max(warning_times, default=0)
+            )
+            if planned is not None and planned <= latest:
+                logger.info(
+                    f"Deferring {intent.reason} to the restart planned at {planned}"
+                )
+                self._deferred.append(intent)
+                return
+            self._pending.append(intent)
+            self._warning_times.update(warning_times)
+            if self._window_item is None:
+                logger.info(
+                    f"Restart requested for {intent.reason}, waiting {self.window}s for other reasons"
+                )
+                self._window_item = self.scheduler.schedule_in(
+                    self.window, self._start_countdown, "restart window"
+                )
+
+    def _start_countdown(self) -> None:
+        with self._lock:
+            intents, self._pending = self._pending, []
+            warning_times = sorted(self._warning_times, reverse=True)
+            self._warning_times = set()
+            self._window_item = None
+        for intent in intents:
+            self.countdown.start(intent, warning_times)
+
+    def _warn(self, warning_minute: int, intents: list[RestartIntent]) -> None:
+        description = " and ".join(dict.fromkeys(i.description for i in intents))
+        extra = "; ".join(i.extra for i in intents if i.extra)
+        at = TimeTracker.display(self.countdown.deadline or datetime.now())
+        announce(warning_message(description, warning_minute, at, extra))
+
+    def _finish(self, intents: list[RestartIntent]) -> None:
+        with self._lock:
+            self._due = intents
+        self.restart(combined_reason(intents))
+
+    def take_all(self) -> list[RestartIntent]:
+        """
+        Hands over every outstanding intent, for a restart that is about to
+        happen, and stops any window or countdown that was running for them.
+        """
+        with self._lock:
+            intents = self._due + self._deferred + self._pending
+            self._due, self._deferred, self._pending = [], [], []
+            self._warning_times = set()
+            if self._window_item is not None:
+                self._window_item.cancel()
+                self._window_item = None
+        intents += self.countdown.cancel()
+        return list(dict.fromkeys(intents))
+
+
+def combined_reason(intents: list[RestartIntent], reason: str | None = None) -> str:
+    reasons = ([reason] if reason else []) + [i.reason for i in intents]
+    return ", ".join(dict.fromkeys(reasons))
@@ -0,0 +1,119 @@
+import threading
+import time
+from typing import Callable, Iterable
+
+from config import CONFIG
+from logger import get_logger
+from rcon import get_player_names
+
+logger = get_logger(__name__)
+
+
+class PlayerRoster:
+    """
+    In-memory set of online players.
+
+    Kept current from join/leave log events, and periodically reconciled
+    against ``ListPlayers`` to correct for missed or unparseable log lines.
+    """
+
+    def __init__(self):
+        self._players: dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._reconciler = None
+        self._stop = threading.Event()
+        self.last_reconciled: float | None = None
+
+    @staticmethod
+    def _key(name: str) -> str:
+        return name.strip().casefold()
+
+    def add(self, name: str) -> bool:
+        """Marks a player as online, returning False if they already were."""
+        key = self._key(name)
+        with self._lock:
+            if key in self._players:
+                return False
+            self._players[key] = name.strip()
+            return True
+
+    def remove(self, name: str) -> bool:
+        """Marks a player as offline, returning False if they weren't online."""
+        with self._lock:
+            return self._players.pop(self._key(name), None) is not None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._players.clear()
+
+    def __contains__(self, name: str) -> bool:
+        return self._key(name) in self._players
+
+    def __len__(self) -> int:
+        return len(self._players)
+
+    def count(self) -> int:
+        return len(self._players)
+
+    def names(self) -> list[str]:
+        with self._lock:
+            return list(self._players.values())
+
+    @property
+    def is_synced(self) -> bool:
+        return self.last_reconciled is not None
+
+    def reconcile(self, names: Iterable[str]) -> None:
+        """Replaces the roster with an authoritative list of online players."""
+        players = {self._key(name): name.strip() for name in names}
+        with self._lock:
+            joined = players.keys() - self._players.keys()
+            left = self._players.keys() - players.keys()
+            self._players = players
+            self.last_reconciled = time.time()
+        if joined or left:
+            logger.debug(
+                f"Roster reconciled: {len(joined)} missed joins, {len(left)} missed leaves"
+            )
+
+    def sync(self, fetch: Callable[[], list[str] | None] = get_player_names) -> bool:
+        names = fetch()
+        if names is None:
+            return False
+        self.reconcile(names)
+        return True
+
+    def start_reconciler(self, interval: float) -> None:
+        if self._reconciler is not None or not interval:
+            return
+        self._reconciler = threading.Thread(
+            target=self._reconcile_loop,
+            args=(interval,),
+            name="roster-reconciler",
+            daemon=True,
+        )
+        self._reconciler.start()
+
+    def _reconcile_loop(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.sync()
+            except Exception as e:
+                logger.error(f"Error reconciling player roster: {e}")
+
+    def stop_reconciler(self) -> None:
+        self._stop.set()
+
+
+ROSTER = PlayerRoster()
+
+
+def online_player_count() -> int | None:
+    """Number of online players, falling back to ``ListPlayers`` until the roster has synced."""
+    if ROSTER.is_synced or ROSTER.sync():
+        return ROSTER.count()
+    return None
+
+
+def start_roster_reconciler() -> None:
+    ROSTER.start_reconciler(CONFIG["advanced"].get("roster_reconcile_interval", 300))
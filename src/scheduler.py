@@ -0,0 +1,169 @@
+import heapq
+import itertools
+import threading
+from datetime import datetime, timedelta
+from typing import Callable
+
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class ScheduledItem:
+    """Handle to a scheduled callback, used to cancel it."""
+
+    __slots__ = ("when", "callback", "name", "interval", "cancelled", "_scheduler")
+
+    def __init__(
+        self,
+        scheduler: "Scheduler",
+        when: datetime,
+        callback: Callable[[], None],
+        name: str,
+        interval: float | None,
+    ):
+        self._scheduler = scheduler
+        self.when = when
+        self.callback = callback
+        self.name = name
+        self.interval = interval
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        self._scheduler.cancel(self)
+
+    def __repr__(self):
+        return f"ScheduledItem({self.name!r}, {self.when:%Y-%m-%d %H:%M:%S})"
+
+
+class Scheduler:
+    """
+    Runs callbacks at wall-clock deadlines kept in a min-heap.
+
+    The run loop sleeps until the earliest deadline, or until a new entry with
+    an earlier deadline is scheduled or the scheduler is stopped, so idle time
+    costs nothing and nothing fires late. Cancelled entries stay in the heap
+    and are skipped when they come up; the heap is rebuilt once they make up
+    more than half of it.
+    """
+
+    def __init__(self, max_wait: float = 300):
+        # Re-check at least this often (in seconds), in case the clock changes
+        self.max_wait = max_wait
+        self._heap: list[tuple[datetime, int, ScheduledItem]] = []
+        self._counter = itertools.count()
+        self._cancelled = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._heap) - self._cancelled
+
+    def _push(self, item: ScheduledItem) -> None:
+        heapq.heappush(self._heap, (item.when, next(self._counter), item))
+
+    def schedule(
+        self,
+        when: datetime,
+        callback: Callable[[], None],
+        name: str = "",
+        interval: float | None = None,
+    ) -> ScheduledItem:
+        """
+        Runs ``callback`` at ``when``, and then every ``interval`` seconds if
+        an interval is given.
+
+        :return: A handle that can be cancelled.
+        """
+        item = ScheduledItem(self, when, callback, name, interval)
+        with self._lock:
+            self._push(item)
+            earliest = self._heap[0][2] is item
+        if earliest:
+            self._wake.set()
+        return item
+
+    def schedule_in(
+        self,
+        seconds: float,
+        callback: Callable[[], None],
+        name: str = "",
+        interval: float | None = None,
+    ) -> ScheduledItem:
+        return self.schedule(
+            datetime.now() + timedelta(seconds=seconds), callback, name, interval
+        )
+
+    def cancel(self, item: ScheduledItem) -> None:
+        with self._lock:
+            if item.cancelled:
+                return
+            item.cancelled = True
+            self._cancelled += 1
+            if self._cancelled > len(self._heap) // 2:
+                self._heap = [entry for entry in self._heap if not entry[2].cancelled]
+                heapq.heapify(self._heap)
+                self._cancelled = 0
+
+    def _pop_due(self, now: datetime) -> ScheduledItem | None:
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                _, _, item = heapq.heappop(self._heap)
+                if item.cancelled:
+                    self._cancelled -= 1
+                    continue
+                if item.interval:
+                    interval = timedelta(seconds=item.interval)
+                    item.when += interval
+                    if item.when <= now:
+                        item.when = now + interval  # don't run missed repeats
+                    self._push(item)
+                return item
+            return None
+
+    def next_deadline(self) -> datetime | None:
+        with self._lock:
+            while self._heap and self._heap[0][2].cancelled:
+                heapq.heappop(self._heap)
+                self._cancelled -= 1
+            return self._heap[0][0] if self._heap else None
+
+    def run_pending(self, now: datetime | None = None) -> int:
+        """
+        Runs every callback that is due, earliest first.
+
+        :return: The number of callbacks run.
+        """
+        now = now or datetime.now()
+        ran = 0
+        while item := self._pop_due(now):
+            ran += 1
+            try:
+                item.callback()
+            except Exception as e:
+                logger.error(
+                    f"Error running scheduled {item.name or item.callback}: {e}"
+                )
+        return ran
+
+    def run(self) -> None:
+        """Runs callbacks as they come due until ``stop`` is called."""
+        while not self._stopped:
+            self.run_pending()
+            deadline = self.next_deadline()
+            timeout = self.max_wait
+            if deadline is not None:
+                timeout = min(
+                    timeout, max(0, (deadline - datetime.now()).total_seconds())
+                )
+            self._wake.wait(timeout)
+            self._wake.clear()
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def stop(self) -> None:
+        self._stopped = True
+        self._wake.set()
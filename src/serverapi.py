@@ -14,6 +14,7 @@ logger = get_logger(__name__)
 
 OWNER = "ServersHub"
 REPO = "ServerAPI"
+HTTP_TIMEOUT = 30  # seconds to wait for GitHub to connect or respond
 LOCAL_VERSION_FILE = os.path.join(OUTDIR, f"{OWNER}_{REPO}_timestamp.txt")
 API_OUTDIR = os.path.join(
     CONFIG["server"]["install_path"], "ShooterGame", "Binaries", "Win64"
@@ -59,7 +60,7 @@ def _extract_zip_and_move(zip_path: str, outdir: str):
 
 def _get_latest_release_info(owner: str, repo: str) -> dict:
     api_url = f"https://api.github.com/repos/{owner}/{repo}/releases/latest"
-    response = requests.get(api_url)
+    response = requests.get(api_url, timeout=HTTP_TIMEOUT)
     if response.status_code == 200:
         release_data = response.json()
         return release_data["assets"][0]  # Assuming you want the first asset
@@ -140,15 +141,23 @@ def use_serverapi() -> bool:
     return "use_server_api" in CONFIG["server"] and CONFIG["server"]["use_server_api"]
 
 
-def serverapi_needs_update() -> bool:
+def serverapi_needs_update() -> dict | bool:
+    """
+    :return: The latest release's info if it is newer than the local version, else False.
+    :raises RuntimeError: If GitHub can't be reached.
+    """
     logger.info("Checking if the Ark server API needs an update...")
+    try:
+        latest_release_info = _get_latest_release_info(OWNER, REPO)
+    except requests.RequestException as e:
+        raise RuntimeError(f"Failed to reach GitHub: {e}") from e
     res = _needs_update(
-        latest_release_info=_get_latest_release_info(OWNER, REPO),
+        latest_release_info=latest_release_info,
         local_version_file=LOCAL_VERSION_FILE,
     )
     if res:
         logger.info(f"Latest {OWNER}/{REPO} release is newer than the local version.")
-        return True
+        return res
     else:
         logger.debug(f"Latest {OWNER}/{REPO} release is already downloaded.")
         return False
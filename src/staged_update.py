@@ -0,0 +1,260 @@
+import os
+import shutil
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Iterator
+
+from config import CONFIG
+from integrity import record_install
+from keyvalues import read_app_manifest
+from logger import get_logger
+from steamcmd import update_server
+
+logger = get_logger(__name__)
+
+# Never copied into the stage or touched when applying it: the live saves
+# and configs, and steamcmd's own scratch space.
+DEFAULT_EXCLUDE = (
+    os.path.join("ShooterGame", "Saved"),
+    os.path.join("steamapps", "downloading"),
+    os.path.join("steamapps", "temp"),
+)
+# Always copied, even with hardlinks, since steamcmd rewrites these in place
+COPY_DIRS = ("steamapps",)
+
+
+def _same_file(a: str, b: str) -> bool:
+    try:
+        a_stat, b_stat = os.stat(a), os.stat(b)
+    except OSError:
+        return False
+    if (a_stat.st_dev, a_stat.st_ino) == (b_stat.st_dev, b_stat.st_ino):
+        return True
+    return (a_stat.st_size, a_stat.st_mtime_ns) == (b_stat.st_size, b_stat.st_mtime_ns)
+
+
+def _place(src: str, dst: str, link: bool) -> None:
+    """Puts ``src`` at ``dst`` as a hardlink (or a copy), replacing ``dst`` atomically."""
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    tmp = dst + ".staging"
+    if os.path.lexists(tmp):
+        os.remove(tmp)
+    try:
+        if not link:
+            raise OSError("copy requested")
+        os.link(src, tmp)
+    except OSError:
+        shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+
+
+class StagedInstall:
+    """
+    A shadow copy of the server install that steamcmd can update while the
+    live server keeps running.
+
+    The stage is seeded with copies of the live files. Seeding an existing
+    stage only copies the files that changed since, so after the first time
+    it is cheap. Applying the stage then only copies the files steamcmd
+    changed into the live install.
+
+    With ``hardlinks``, the stage is seeded with hardlinks instead (copies
+    where that isn't possible, e.g. another drive), which takes almost no
+    disk space or time. That is only safe if steamcmd writes every updated
+    file as a new file: a file it patches in place would change the live
+    server's file behind the link too. So it is off by default.
+    """
+
+    def __init__(
+        self,
+        live_dir: str,
+        stage_dir: str,
+        exclude: tuple[str, ...] = DEFAULT_EXCLUDE,
+        hardlinks: bool = False,
+    ):
+        self.live_dir = live_dir
+        self.stage_dir = stage_dir
+        self.exclude = tuple(os.path.normcase(path) for path in exclude)
+        self.hardlinks = hardlinks
+        self._seeded: set[str] = set()
+
+    def _excluded(self, relpath: str) -> bool:
+        relpath = os.path.normcase(relpath)
+        return any(
+            relpath == path or relpath.startswith(path + os.sep)
+            for path in self.exclude
+        )
+
+    def _files(self, root: str) -> Iterator[str]:
+        """Yields the paths of the files under ``root``, relative to it."""
+        for dirpath, dirnames, filenames in os.walk(root):
+            reldir = os.path.relpath(dirpath, root)
+            reldir = "" if reldir == os.curdir else reldir
+            dirnames[:] = [
+                d for d in dirnames if not self._excluded(os.path.join(reldir, d))
+            ]
+            for filename in filenames:
+                relpath = os.path.join(reldir, filename)
+                if not self._excluded(relpath):
+                    yield relpath
+
+    def _link(self, relpath: str) -> bool:
+        top = os.path.normcase(relpath).split(os.sep, 1)[0]
+        return self.hardlinks and top not in COPY_DIRS
+
+    def seed(self) -> int:
+        """
+        Makes the stage a mirror of the live install. Files that are already
+        the same in both are left alone, so seeding an existing stage is cheap.
+
+        :return: The number of files linked or copied.
+        """
+        placed = 0
+        live_files = set(self._files(self.live_dir))
+        for relpath in live_files:
+            live = os.path.join(self.live_dir, relpath)
+            staged = os.path.join(self.stage_dir, relpath)
+            if not _same_file(live, staged):
+                _place(live, staged, self._link(relpath))
+                placed += 1
+        if os.path.isdir(self.stage_dir):
+            for relpath in set(self._files(self.stage_dir)) - live_files:
+                os.remove(os.path.join(self.stage_dir, relpath))
+        self._seeded = live_files
+        logger.info(f"Seeded {self.stage_dir} from {self.live_dir}, {placed} files")
+        return placed
+
+    def apply(self) -> int:
+        """
+        Brings the live install up to date with the stage. Only the files
+        that differ are replaced, and files steamcmd removed from the stage
+        are removed from the live install. Must be run with the server down.
+
+        :return: The number of live files replaced or removed.
+        """
+        changed = 0
+        staged_files = set(self._files(self.stage_dir))
+        for relpath in staged_files:
+            staged = os.path.join(self.stage_dir, relpath)
+            live = os.path.join(self.live_dir, relpath)
+            if not _same_file(staged, live):
+                _place(staged, live, self._link(relpath))
+                changed += 1
+        for relpath in self._seeded - staged_files:
+            live = os.path.join(self.live_dir, relpath)
+            if os.path.isfile(live):
+                os.remove(live)
+                changed += 1
+        self._seeded = staged_files
+        logger.info(f"Applied {changed} changed files from {self.stage_dir}")
+        return changed
+
+
+class StagedServerUpdate:
+    """
+    Downloads a server update into a ``StagedInstall`` in the background, so
+    that the restart for it only has to apply the changed files. If staging
+    fails, the update is installed in place as before.
+    """
+
+    def __init__(
+        self,
+        stage: StagedInstall,
+        download: Callable[[str], None],
+        fallback: Callable[[], None],
+        steam_app_id: int = CONFIG["steam_app_id"],
+    ):
+        self.stage = stage
+        self.download = download
+        self.fallback = fallback
+        self.steam_app_id = steam_app_id
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="staged-update")
+        self._future: Future | None = None
+        self._lock = threading.Lock()
+
+    def _prepare(self) -> str:
+        self.stage.seed()
+        self.download(self.stage.stage_dir)
+        manifest = read_app_manifest(
+            os.path.join(
+                self.stage.stage_dir,
+                "steamapps",
+                f"appmanifest_{self.steam_app_id}.acf",
+            )
+        )
+        if not manifest.fully_installed:
+            raise RuntimeError(
+                f"steamcmd left the staged install incomplete (StateFlags {manifest.state_flags})"
+            )
+        logger.info(f"Staged server build {manifest.build_id}")
+        return manifest.build_id
+
+    def start(self) -> None:
+        """Starts staging the update, unless it is already being staged."""
+        with self._lock:
+            if self._future is None:
+                self._future = self._executor.submit(self._prepare)
+
+    def install(self) -> None:
+        """
+        Waits for staging to finish and applies it. Run while the server is
+        down. The live install then matches the complete stage, so it is
+        recorded as known-good, as ``update_server`` does for an update in
+        place.
+        """
+        with self._lock:
+            future, self._future = self._future, None
+        try:
+            if future is None:
+                raise RuntimeError("no update was staged")
+            future.result()
+            self.stage.apply()
+        except Exception as e:
+            logger.error(f"Staged update failed, updating in place instead: {e}")
+            self.fallback()
+            return
+        record_install(self.stage.live_dir)
+
+
+def _stage_dir() -> str:
+    install_path = os.path.normpath(CONFIG["server"]["install_path"])
+    stage_config = CONFIG["advanced"].get("staged_update", {}) or {}
+    return stage_config.get("directory") or install_path + ".staged"
+
+
+_staged_update = None
+_staged_update_lock = threading.Lock()
+
+
+def get_staged_update() -> StagedServerUpdate:
+    global _staged_update
+    with _staged_update_lock:
+        if _staged_update is None:
+            stage_config = CONFIG["advanced"].get("staged_update", {}) or {}
+            _staged_update = StagedServerUpdate(
+                StagedInstall(
+                    CONFIG["server"]["install_path"],
+                    _stage_dir(),
+                    hardlinks=stage_config.get("hardlinks", False),
+                ),
+                lambda stage_dir: update_server(
+                    "Staging the Ark server update...", install_dir=stage_dir
+                ),
+                update_server,
+            )
+        return _staged_update
+
+
+def prepare_server_update() -> Callable[[], None]:
+    """
+    Gets a server update ready while the server is still running, if staged
+    updates are enabled.
+
+    :return: What to run while the server is down to install the update.
+    """
+    stage_config = CONFIG["advanced"].get("staged_update", {}) or {}
+    if not stage_config.get("enable", False):
+        return update_server
+    staged_update = get_staged_update()
+    staged_update.start()
+    return staged_update.install
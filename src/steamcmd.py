@@ -1,10 +1,19 @@
 import os
+import queue
+import re
+import subprocess
+import threading
+import time
 import urllib.request
 import zipfile
+from dataclasses import dataclass, field
+from typing import Callable, TextIO
 
 from config import CONFIG
+from errors import KeyValuesError, SteamCmdError, SteamCmdStalledError
+from integrity import needs_validate, record_install
+from keyvalues import read_app_manifest
 from logger import get_logger
-from shell_operations import run_shell_cmd
 
 logger = get_logger(__name__)
 
@@ -15,9 +24,184 @@ STEAMCMD_DIR = os.path.join(
 STEAMCMD_PATH = os.path.join(STEAMCMD_DIR, "steamcmd.exe")
 
 
-def _run_steamcmd(args: str) -> None:
-    logger.debug(f"Run steamcmd.exe with {STEAMCMD_PATH} {args}")
-    run_shell_cmd(f"{STEAMCMD_PATH} {args}")
+# e.g. " Update state (0x61) downloading, progress: 12.34 (1234567 / 10000000)"
+_PROGRESS = re.compile(
+    r"Update state \(0x(?P<state>[0-9a-fA-F]+)\) (?P<phase>[^,]+), "
+    r"progress: (?P<percent>[\d.]+) \((?P<done>\d+) / (?P<total>\d+)\)"
+)
+PROGRESS_LOG_INTERVAL = 30  # seconds between progress log lines within a phase
+RATE_SMOOTHING = 0.3  # weight of the latest sample in the download rate
+
+
+@dataclass
+class ProgressEvent:
+    phase: str
+    state: int
+    percent: float
+    done: int  # bytes
+    total: int  # bytes
+    rate: float = 0.0  # bytes per second, smoothed over the phase
+    elapsed: float = 0.0  # seconds since the phase started
+
+    @property
+    def eta(self) -> float | None:
+        """Seconds until the phase completes at the current rate."""
+        if self.rate <= 0 or self.total <= self.done:
+            return None
+        return (self.total - self.done) / self.rate
+
+
+@dataclass
+class SteamCmdResult:
+    returncode: int
+    phases: dict[str, float] = field(default_factory=dict)  # seconds per phase
+    last_progress: ProgressEvent | None = None
+    output: list[str] = field(default_factory=list)
+
+
+def parse_progress(line: str) -> ProgressEvent | None:
+    match = _PROGRESS.search(line)
+    if match is None:
+        return None
+    return ProgressEvent(
+        match.group("phase").strip(),
+        int(match.group("state"), 16),
+        float(match.group("percent")),
+        int(match.group("done")),
+        int(match.group("total")),
+    )
+
+
+def _log_progress(event: ProgressEvent) -> None:
+    eta = f", {event.eta:.0f}s left" if event.eta is not None else ""
+    logger.info(
+        f"steamcmd {event.phase}: {event.percent:.1f}% "
+        f"({event.done / 2**20:.0f} / {event.total / 2**20:.0f} MiB, "
+        f"{event.rate / 2**20:.1f} MiB/s{eta})"
+    )
+
+
+def _read_lines(stream: TextIO, lines: queue.Queue) -> None:
+    for line in stream:
+        lines.put(line)
+    lines.put(None)
+
+
+def stream_steamcmd(
+    cmd: list[str],
+    stall_timeout: float = 300,
+    on_progress: Callable[[ProgressEvent], None] | None = None,
+) -> SteamCmdResult:
+    """
+    Runs steamcmd (or anything that prints like it), following its output as
+    it is printed. Progress lines become ``ProgressEvent``s, passed to
+    ``on_progress`` and logged every ``PROGRESS_LOG_INTERVAL`` seconds, and
+    the time spent in each phase (downloading, verifying, ...) is measured.
+
+    :param stall_timeout: Seconds without any progress after which steamcmd
+        is killed.
+    :raises SteamCmdStalledError: If steamcmd stalled.
+    :raises SteamCmdError: If steamcmd reported an error.
+    """
+    started = time.monotonic()
+    process = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,  # also turns steamcmd's \r progress updates into lines
+        errors="replace",
+    )
+    lines: queue.Queue = queue.Queue()
+    threading.Thread(
+        target=_read_lines,
+        args=(process.stdout, lines),
+        name="steamcmd-output",
+        daemon=True,
+    ).start()
+
+    result = SteamCmdResult(returncode=-1)
+    errors = []
+    phase, phase_started = "starting", started
+    last_activity = last_logged = started
+    sample_time = started
+    try:
+        while True:
+            remaining = last_activity + stall_timeout - time.monotonic()
+            try:
+                line = lines.get(timeout=max(0, remaining))
+            except queue.Empty:
+                raise SteamCmdStalledError(
+                    f"steamcmd made no progress for {stall_timeout}s"
+                    f" while {phase}, giving up"
+                )
+            if line is None:
+                break
+            line = line.strip()
+            if not line:
+                continue
+            now = time.monotonic()
+            result.output.append(line)
+            event = parse_progress(line)
+            if event is None:
+                # Anything other than a repeated progress line counts as activity
+                last_activity = now
+                if line.startswith("Error!"):
+                    errors.append(line)
+                logger.debug(f"steamcmd: {line}")
+                continue
+
+            previous = result.last_progress
+            if event.phase != phase:
+                result.phases[phase] = result.phases.get(phase, 0) + now - phase_started
+                phase, phase_started = event.phase, now
+                previous = None
+                last_activity = sample_time = now
+                logger.info(f"steamcmd is {phase}")
+            elif previous is not None and event.done != previous.done:
+                last_activity = now
+                rate = (event.done - previous.done) / max(now - sample_time, 1e-3)
+                event.rate = (
+                    rate
+                    if not previous.rate
+                    else RATE_SMOOTHING * rate + (1 - RATE_SMOOTHING) * previous.rate
+                )
+                sample_time = now
+            elif previous is not None:
+                event.rate = previous.rate
+            event.elapsed = now - phase_started
+            result.last_progress = event
+            if on_progress is not None:
+                on_progress(event)
+            if now - last_logged >= PROGRESS_LOG_INTERVAL:
+                _log_progress(event)
+                last_logged = now
+        result.returncode = process.wait()
+    except BaseException:
+        process.kill()
+        process.wait()
+        raise
+    finally:
+        end = time.monotonic()
+        result.phases[phase] = result.phases.get(phase, 0) + end - phase_started
+        timings = ", ".join(
+            f"{name} {secs:.1f}s" for name, secs in result.phases.items()
+        )
+        logger.info(f"steamcmd ran for {end - started:.1f}s ({timings})")
+
+    if errors:
+        raise SteamCmdError("; ".join(errors))
+    if result.returncode != 0:
+        logger.warning(f"steamcmd exited with code {result.returncode}")
+    return result
+
+
+def _run_steamcmd(args: list[str]) -> SteamCmdResult:
+    logger.debug(f"Run steamcmd.exe with {STEAMCMD_PATH} {' '.join(args)}")
+    steamcmd_config = CONFIG["advanced"].get("steamcmd", {}) or {}
+    return stream_steamcmd(
+        [STEAMCMD_PATH, *args],
+        stall_timeout=steamcmd_config.get("stall_timeout", 300),
+    )
 
 
 def is_steam_cmd_installed():
@@ -54,11 +238,51 @@ def check_and_download_steamcmd():
             raise e
 
 
-def update_server(msg: str = "Updating the Ark server...") -> None:
+def update_server(
+    msg: str = "Updating the Ark server...",
+    install_dir: str | None = None,
+    validate: bool | None = None,
+) -> None:
+    """
+    :param install_dir: Where to install, the server's install path by default.
+    :param validate: Whether steamcmd should validate the whole install. By
+        default, only if it has drifted from its recorded content manifest.
+    :raises SteamCmdError: If steamcmd failed or stalled.
+    """
     logger.info(msg)
     check_and_download_steamcmd()
-    args = f"+force_install_dir {os.path.join(CONFIG['server']['install_path'])} +login anonymous +app_update {CONFIG['steam_app_id']} validate +quit"
-    _run_steamcmd(args)
+    install_dir = install_dir or CONFIG["server"]["install_path"]
+    if validate is None:
+        validate = needs_validate(install_dir)
+    result = _run_steamcmd(
+        [
+            "+force_install_dir",
+            os.path.join(install_dir),
+            "+login",
+            "anonymous",
+            "+app_update",
+            str(CONFIG["steam_app_id"]),
+            *(["validate"] if validate else []),
+            "+quit",
+        ]
+    )
+    # Only a complete install is known-good enough to skip validating next time
+    if result.returncode == 0 and _fully_installed(install_dir):
+        record_install(install_dir)
+    else:
+        logger.warning("steamcmd didn't fully install the server, not recording it")
+
+
+def _fully_installed(install_dir: str) -> bool:
+    """Whether the install's app manifest says it is fully installed."""
+    path = os.path.join(
+        install_dir, "steamapps", f"appmanifest_{CONFIG['steam_app_id']}.acf"
+    )
+    try:
+        return read_app_manifest(path).fully_installed
+    except (OSError, KeyValuesError) as e:
+        logger.warning(f"Error reading {path}: {e}")
+        return False
 
 
 if __name__ == "__main__":
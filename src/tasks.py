@@ -1,15 +1,21 @@
 import logging
 import os
-import time
 from datetime import datetime, timedelta
-from typing import TYPE_CHECKING
+from functools import partial
+from typing import TYPE_CHECKING, Any, Callable
 
 from config import CONFIG
-from mods import Mod, mods_needing_update
-from rcon import broadcast, destroy_wild_dinos, get_active_players, send_message
-from serverapi import serverapi_needs_update, use_serverapi
+from countdown import warning_message
+from mod_prefetch import prefetch_mods
+from mods import Mod
+from rcon import announce, destroy_wild_dinos
+from restart_broker import RestartIntent
+from roster import online_player_count
+from scheduler import ScheduledItem, Scheduler
+from serverapi import install_serverapi
+from staged_update import prepare_server_update
 from time_tracker import TimeTracker
-from update import does_server_need_update
+from version_checks import get_version_checker
 
 if TYPE_CHECKING:
     from main import ArkServer
@@ -19,6 +25,13 @@ logger = logging.getLogger(__name__)
 
 
 class Task:
+    # Whether warnings are announced ahead of the scheduled time. Tasks that
+    # only find out when they run whether a restart is needed warn then instead.
+    warns_ahead = True
+    # Remote version check (see version_checks) whose result the task acts on.
+    # It is started ahead of the task so that the task itself never waits.
+    version_source: str | None = None
+
     def __init__(self, server: "ArkServer", task_name: str):
         self.task_name = task_name
         self.server = server
@@ -34,49 +47,117 @@ class Task:
         # time
         self.time = TimeTracker(self)
 
-    def _warn_before_task(self, extra: str = ""):
-        """Send warnings if the time for a task is approaching."""
-        if not self.warning_times:
-            return
-
-        minutes_until_task = round(self.time.seconds_until() / 60)
-        # logger.debug(f"Minutes until {self.task_name}: {minutes_until_task}")
-
-        # Iterate over the warning times that have not been warned yet
+        # scheduling
+        self.scheduler: Scheduler | None = None
+        self._scheduled: list[ScheduledItem] = []
+
+    def _warn(self, warning_minute: int, extra: str = "") -> None:
+        """Announce that the task is coming up."""
+        self.warned_times.add(warning_minute)
+        announce(
+            warning_message(
+                self.description, warning_minute, self.time.display_next_time(), extra
+            )
+        )
+
+    def _restart_after_warnings(
+        self, reason: str, extra: str = "", install: Callable[[], None] | None = None
+    ) -> None:
+        """
+        Ask for a restart, announced with this task's warnings. Returns straight
+        away; ``install`` is run while the server is down.
+        """
+        self.server.request_restart(
+            RestartIntent(self.description, reason, extra, install),
+            self.warning_times,
+        )
+
+    def _schedule_warnings(self) -> list[ScheduledItem]:
+        """
+        Schedule an announcement for each warning still ahead. If some are
+        already overdue (e.g. the suite started just before the task), only
+        the most imminent of them is sent, right away.
+        """
+        now = datetime.now()
+        items = []
+        overdue = []
         for warning_minute in self.warning_times:
-            if (
-                minutes_until_task <= warning_minute
-                and warning_minute not in self.warned_times
-            ):
-                self.warned_times.add(warning_minute)
-                msg = f"Warning: {self.description} will occur in {warning_minute} {'minute' if warning_minute == 1 else 'minutes'} at approximately {self.time.display_next_time()}"
-                if extra:
-                    msg += f", ({extra})"
-                msg += "."
-                broadcast(msg, discord_msg=False)
-                send_message(msg)
-
-    def _warn_then_wait(self, extra: str = ""):
-        for cnt, warning_minute in enumerate(self.warning_times):
-            msg = f"Warning: {self.description} will occur in {warning_minute} {'minute' if warning_minute == 1 else 'minutes'} at approximately {self.time.display(datetime.now() + timedelta(minutes=warning_minute))}"
-            if extra:
-                msg += f", ({extra})"
-            msg += "."
-            broadcast(msg, discord_msg=False)
-            send_message(msg)
-            if cnt < len(self.warning_times) - 1:
-                time.sleep((warning_minute - self.warning_times[cnt + 1]) * 60)
-            else:
-                time.sleep(warning_minute * 60)
+            if warning_minute in self.warned_times:
+                continue
+            when = self.time.next_time - timedelta(minutes=warning_minute)
+            if when <= now:
+                overdue.append(warning_minute)
+                continue
+            items.append(
+                self.scheduler.schedule(
+                    when,
+                    partial(self._warn, warning_minute),
+                    f"{self.task_name} warning",
+                )
+            )
+        if overdue:
+            self.warned_times.update(overdue)
+            items.append(
+                self.scheduler.schedule(
+                    min(now, self.time.next_time),
+                    partial(self._warn, min(overdue)),
+                    f"{self.task_name} warning",
+                )
+            )
+        return items
+
+    def schedule(self, scheduler: Scheduler) -> None:
+        """Put the task's next run, and its warnings, on the scheduler."""
+        self.scheduler = scheduler
+        self.reschedule()
+
+    def reschedule(self) -> None:
+        """Replace the scheduled entries after the next run time has changed."""
+        if self.scheduler is None:
+            return
+        for item in self._scheduled:
+            item.cancel()
+        # Warnings first, so an overdue warning goes out before an overdue task
+        self._scheduled = self._schedule_warnings() if self.warns_ahead else []
+        run_at = self.time.next_time
+        if self.version_source:
+            checker = get_version_checker()
+            lead = timedelta(seconds=checker.timeout_for(self.version_source))
+            check_at = max(datetime.now(), run_at - lead)
+            run_at = max(run_at, check_at + lead)
+            self._scheduled.append(
+                self.scheduler.schedule(
+                    check_at,
+                    partial(checker.refresh, [self.version_source]),
+                    f"{self.task_name} version check",
+                )
+            )
+        self._scheduled.append(
+            self.scheduler.schedule(run_at, self.execute, self.task_name)
+        )
+
+    def _version_check(self) -> Any:
+        """
+        The result of the version check started ahead of this run, or None if
+        it failed or didn't finish in time (the task then waits for its next run).
+        """
+        checker = get_version_checker()
+        max_age = 2 * checker.timeout_for(self.version_source)
+        result = checker.latest(self.version_source, max_age=max_age)
+        if result is None:
+            logger.warning(f"No recent {self.version_source} version check result")
+            return None
+        if not result.ok:
+            logger.warning(
+                f"{self.version_source} version check failed: {result.error}"
+            )
+            return None
+        return result.value
 
     def _reset_sent_warnings(self) -> None:
         """Reset the warned times list after task execution."""
         self.warned_times = set()
 
-    def _pre_run(self) -> None:
-        self.time.current_time = datetime.now()
-        self._warn_before_task()
-
     def _post_run(self) -> None:
         """Cleanup after task execution."""
         self._reset_sent_warnings()
@@ -88,13 +169,16 @@ class Task:
         raise NotImplementedError("Subclasses should implement this!")
 
     def execute(self) -> bool:
-        """Execute the task if it's time."""
-        self._pre_run()
-        if self.time.is_time_to_execute():
-            res = self._run_task()
+        """Execute the task if it's time, then schedule the next run."""
+        self.time.current_time = datetime.now()
+        if not self.time.is_time_to_execute():
+            self.reschedule()
+            return False
+        try:
+            return self._run_task()
+        finally:
             self._post_run()
-            return res
-        return False
+            self.reschedule()
 
 
 class SendAnnouncement(Task):
@@ -103,8 +187,7 @@ class SendAnnouncement(Task):
 
     def _run_task(self) -> bool:
         # general announcement
-        send_message(self.description, discord_msg=False)
-        broadcast(self.description, discord_msg=False)
+        announce(self.description, discord_msg=False)
         # next_wipe = self.server.tasks["destroy_wild_dinos"].time.display_next_time()
         # broadcast(f"Next dino wipe: {next_wipe}", discord_msg=False)
 
@@ -118,7 +201,7 @@ class HandleEmptyServerRestart(Task):
         self.first_empty_server_time = None
 
     def _run_task(self) -> bool:
-        if get_active_players() == 0:
+        if online_player_count() == 0:
             if self.first_empty_server_time is None:
                 logger.info("Server is empty, starting stale check timer...")
                 self.first_empty_server_time = self.time.current_time
@@ -126,7 +209,7 @@ class HandleEmptyServerRestart(Task):
                 hours=self.threshold
             ):
                 logger.info("Server is stale, restarting...")
-                self.server.restart("stale server", skip_warnings=True)
+                self.server.restart("stale server")
                 return True
         else:
             if self.first_empty_server_time is not None:
@@ -136,71 +219,60 @@ class HandleEmptyServerRestart(Task):
 
 
 class CheckForArkUpdatesAndRestart(Task):
+    warns_ahead = False
+    version_source = "server"
+
     def __init__(self, server: "ArkServer", task_name: str):
         super().__init__(server, task_name)
 
     def _run_task(self) -> bool:
-        if does_server_need_update():
-            self._warn_then_wait()
-            self.server.restart("server update")
+        if self._version_check():
+            self._restart_after_warnings(
+                "server update", install=prepare_server_update()
+            )
             return True
         return False
 
-    def execute(self) -> bool:
-        """Execute the task if it's time."""
-        self.time.current_time = datetime.now()
-        if self.time.is_time_to_execute():
-            res = self._run_task()
-            self._post_run()
-            return res
-        return False
-
 
 class CheckForModUpdatesAndRestart(Task):
+    warns_ahead = False
+    version_source = "mods"
+
     def __init__(self, server: "ArkServer", task_name: str):
         super().__init__(server, task_name)
 
     def _run_task(self) -> bool:
-        mods: list[Mod] = mods_needing_update()
+        mods: list[Mod] = self._version_check() or []
         if len(mods) > 0:
             # make a string of all the mod names needing update
             mod_names = ", ".join([mod.name for mod in mods])
-            self._warn_then_wait(extra=mod_names)
-            self.server.restart(f"mod update ({mod_names})")
+            self._restart_after_warnings(
+                f"mod update ({mod_names})",
+                extra=mod_names,
+                install=prefetch_mods(mods),
+            )
             return True
         return False
 
-    def execute(self) -> bool:
-        """Execute the task if it's time."""
-        self.time.current_time = datetime.now()
-        if self.time.is_time_to_execute():
-            res = self._run_task()
-            self._post_run()
-            return res
-        return False
-
 
 class CheckForServerAPIUpdateAndRestart(Task):
+    warns_ahead = False
+    version_source = "serverapi"
+
     def __init__(self, server: "ArkServer", task_name: str):
         super().__init__(server, task_name)
 
     def _run_task(self) -> bool:
-        if use_serverapi() and (res := serverapi_needs_update()):
+        if res := self._version_check():
             # make a string of all the mod names needing update
-            self._warn_then_wait(f"upgrade to version {res['name']}")
-            self.server.restart(f"ServerAPI update")
+            self._restart_after_warnings(
+                "ServerAPI update",
+                extra=f"upgrade to version {res['name']}",
+                install=install_serverapi,
+            )
             return True
         return False
 
-    def execute(self) -> bool:
-        """Execute the task if it's time."""
-        self.time.current_time = datetime.now()
-        if self.time.is_time_to_execute():
-            res = self._run_task()
-            self._post_run()
-            return res
-        return False
-
 
 class PerformRoutineRestart(Task):
     def __init__(self, server: "ArkServer", task_name: str):
@@ -154,7 +154,8 @@ class TimeTracker:
         """Check if it's time to execute the task."""
         return self.current_time >= self.next_time
 
-    def display(self, time: datetime) -> str:
+    @staticmethod
+    def display(time: datetime) -> str:
         # if the time is on a future date, print out the date as well
         if time.date() > datetime.now().date():
             time_format: str = "%a %b %d %I:%M %p"
@@ -1,37 +1,136 @@
 import os
+import time
+from typing import Callable
 
-import steam.client
 from steam.client import SteamClient
+from steam.enums import EResult
 
 from config import CONFIG
+from errors import KeyValuesError
+from keyvalues import read_app_manifest
 from logger import get_logger
 
 logger = get_logger(__name__)
 
-client = SteamClient()
+STEAM_TIMEOUT = 30  # seconds to wait for Steam to answer a product info request
+
+
+class SteamSession:
+    """
+    One anonymous Steam session, kept logged in between update checks, with
+    the public branch build id cached for ``ttl`` seconds.
+
+    Within the TTL, a check only asks Steam whether the app's product info
+    changed since the cached build id was fetched. That is a cheap PICS
+    change-number query, so only an actual change costs a product info
+    request. The client runs on gevent and only does network I/O while it is
+    being called, so Steam may drop an idle session. A dropped session is
+    logged in again, and a request that fails on a stale session is retried
+    once on a fresh one.
+    """
+
+    def __init__(
+        self,
+        app_id: int,
+        ttl: float = 3600,
+        timeout: float = STEAM_TIMEOUT,
+        client_factory: Callable[[], SteamClient] = SteamClient,
+    ):
+        self.app_id = app_id
+        self.ttl = ttl
+        self.timeout = timeout
+        self.client_factory = client_factory
+        self._client = None
+        self._build_id: str | None = None
+        self._fetched_at = 0.0
+        self._change_number: int | None = None
+
+    def _logged_in_client(self) -> SteamClient:
+        if self._client is None:
+            self._client = self.client_factory()
+        if not self._client.logged_on:
+            result = self._client.anonymous_login()
+            if result != EResult.OK:
+                self._client.disconnect()
+                raise RuntimeError(f"Anonymous Steam login failed: {result!r}")
+            logger.debug("Logged in to Steam anonymously")
+        return self._client
+
+    def _app_changed(self, client: SteamClient) -> bool:
+        """Whether the app's product info changed since the cached build id was fetched."""
+        if self._change_number is None:
+            return True
+        changes = client.get_changes_since(
+            self._change_number, app_changes=True, package_changes=False
+        )
+        if changes is None:
+            raise TimeoutError("Steam didn't answer a change number request")
+        if changes.force_full_update or any(
+            change.appid == self.app_id for change in changes.app_changes
+        ):
+            return True
+        self._change_number = changes.current_change_number
+        return False
+
+    def _fetch_build_id(self, client: SteamClient) -> str:
+        app_info = client.get_product_info(apps=[self.app_id], timeout=self.timeout)
+        if not app_info or self.app_id not in app_info.get("apps", {}):
+            raise TimeoutError(f"No product info returned for app {self.app_id}")
+        app = app_info["apps"][self.app_id]
+        self._change_number = app.get("_change_number")
+        self._fetched_at = time.monotonic()
+        # Extract the public branch buildid
+        self._build_id = app["depots"]["branches"]["public"]["buildid"]
+        return self._build_id
+
+    def _latest_build_id(self) -> str:
+        client = self._logged_in_client()
+        fresh = time.monotonic() - self._fetched_at < self.ttl
+        if self._build_id is not None and fresh and not self._app_changed(client):
+            return self._build_id
+        return self._fetch_build_id(client)
+
+    def latest_build_id(self) -> str:
+        """
+        :raises RuntimeError: If Steam can't be reached or doesn't answer in time.
+        """
+        for attempt in range(2):
+            try:
+                return self._latest_build_id()
+            except Exception as e:
+                self.close()  # start over on a new session
+                if attempt:
+                    raise RuntimeError(f"Steam build id lookup failed: {e}") from e
+                logger.debug(f"Steam request failed, reconnecting: {e}")
+
+    def close(self) -> None:
+        if self._client is not None:
+            self._client.disconnect()
+            self._client = None
+
+
+_session = None
+
+
+def get_steam_session() -> SteamSession:
+    # Created on (and only used from) the thread that first asks for it: the
+    # version check service's Steam thread.
+    global _session
+    if _session is None:
+        _session = SteamSession(
+            CONFIG["steam_app_id"],
+            ttl=CONFIG["advanced"].get("steam_build_id_ttl", 3600),
+        )
+    return _session
 
 
-def _get_latest_build_id(steam_app_id: int = CONFIG["steam_app_id"]) -> str:
-    max_attempts = 2  # Number of attempts before giving up
+def _get_latest_build_id() -> str:
+    """
+    Looks up the build id of the public branch on Steam.
 
-    for attempt in range(max_attempts):
-        try:
-            if client.anonymous_login():
-                app_info = client.get_product_info(apps=[steam_app_id])
-                if app_info:
-                    # Extract the public branch buildid
-                    public_branch_info = app_info["apps"][steam_app_id]["depots"][
-                        "branches"
-                    ]["public"]
-                    client.disconnect()
-                    return public_branch_info["buildid"]
-        except Exception as e:
-            logger.error(f"Attempt {attempt + 1} failed with error: {e}")
-            if attempt < max_attempts - 1:
-                logger.info("Retrying...")
-            else:
-                logger.error("All attempts failed. Returning None.")
-                return None
+    :raises RuntimeError: If Steam can't be reached or doesn't answer in time.
+    """
+    return get_steam_session().latest_build_id()
 
 
 def _get_installed_build_id(
@@ -49,17 +148,15 @@ def _get_installed_build_id(
         return None
 
     try:
-        with open(appmanifest_path, "r") as acf_file:
-            for line in acf_file:
-                if '"buildid"' in line:
-                    build_id = line.split('"')[-2]
-                    return build_id
-    except IOError as e:
+        build_id = read_app_manifest(appmanifest_path).build_id
+    except (OSError, KeyValuesError) as e:
         logger.error(f"Error reading from {appmanifest_path}: {e}")
         return None
 
-    logger.error(f"Build ID not found in {appmanifest_path}.")
-    return None
+    if not build_id:
+        logger.error(f"Build ID not found in {appmanifest_path}.")
+        return None
+    return build_id
 
 
 def is_server_installed() -> bool:
@@ -70,13 +167,15 @@ def is_server_installed() -> bool:
 
 
 def does_server_need_update() -> bool:
+    """
+    :raises RuntimeError: If the latest build id can't be looked up.
+    """
     logger.info("Checking if the Ark server needs to be updated...")
 
-    latest_build_id = _get_latest_build_id()
     installed_build_id = _get_installed_build_id()
-
-    if latest_build_id is None or installed_build_id is None:
+    if installed_build_id is None:
         return False
+    latest_build_id = _get_latest_build_id()
 
     status = (
         f"installed build_id: {installed_build_id}, latest build_id: {latest_build_id}"
@@ -10,6 +10,7 @@ import requests
 
 from config import CONFIG
 from logger import get_logger
+from outbox import enqueue_notification
 
 logger = get_logger(__name__)
 
@@ -39,16 +40,14 @@ def wait_until(
 
 
 def send_to_discord(content: str, webhook_type: str = "updates_webhook") -> bool | None:
-    """Sends a message to Discord via a webhook."""
+    """Queues a message to be sent to Discord via a webhook."""
     if (
         content
         and webhook_type in CONFIG["discord"]
         and CONFIG["discord"][webhook_type]
     ):
-        data = {"content": content}
-        response = requests.post(CONFIG["discord"][webhook_type], json=data)
-        logger.info(f"Sent message to Discord: {content}")
-        return response.status_code == 204
+        enqueue_notification(f"discord:{webhook_type}", content)
+        return True
     return None
 
 
@@ -60,7 +59,7 @@ def resource_path(relative_path):
 
 def download_file(url, target_path=None, return_content=False):
     try:
-        response = requests.get(url)
+        response = requests.get(url, timeout=(10, 60))
         response.raise_for_status()
     except requests.RequestException as e:
         logger.error(f"Error downloading file: {e}")
@@ -0,0 +1,184 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Any, Callable
+
+from config import CONFIG
+from logger import get_logger
+from mods import mods_needing_update
+from serverapi import serverapi_needs_update, use_serverapi
+from update import does_server_need_update
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class CheckResult:
+    value: Any = None
+    error: str | None = None
+    checked_at: datetime | None = None
+    duration: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.checked_at is not None
+
+
+class VersionChecker:
+    """
+    Runs remote version checks (Steam, CurseForge, GitHub) concurrently and
+    keeps the latest result of each in a snapshot.
+
+    Every source has its own worker thread, so a slow or hung upstream only
+    holds up its own checks, and a client that must stay on one thread (the
+    gevent-based Steam client) always does. A failed check is retried with
+    exponential backoff. A source's timeout bounds all of its attempts
+    together. ``refresh`` never blocks; ``wait`` blocks for at most the
+    longest timeout of the sources it waits on.
+    """
+
+    def __init__(
+        self,
+        checks: dict[str, Callable[[], Any]],
+        timeout: float = 60,
+        retries: int = 2,
+        backoff: float = 2,
+        timeouts: dict[str, float] | None = None,
+    ):
+        self.checks = checks
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.timeouts = timeouts or {}
+        self._executors = {
+            source: ThreadPoolExecutor(1, thread_name_prefix=f"version-check-{source}")
+            for source in checks
+        }
+        self._in_flight: dict[str, Future] = {}
+        self._snapshot: dict[str, CheckResult] = {}
+        self._lock = threading.Lock()
+
+    def timeout_for(self, source: str) -> float:
+        return self.timeouts.get(source, self.timeout)
+
+    def _check(self, source: str) -> CheckResult:
+        started = time.monotonic()
+        for attempt in range(self.retries + 1):
+            try:
+                value = self.checks[source]()
+                return CheckResult(
+                    value, None, datetime.now(), time.monotonic() - started
+                )
+            except Exception as e:
+                error = str(e) or type(e).__name__
+                logger.warning(
+                    f"{source} version check failed (attempt {attempt + 1}): {error}"
+                )
+                delay = self.backoff * 2**attempt
+                elapsed = time.monotonic() - started
+                if attempt == self.retries or elapsed + delay >= self.timeout_for(
+                    source
+                ):
+                    break
+                time.sleep(delay)
+        return CheckResult(None, error, datetime.now(), time.monotonic() - started)
+
+    def _store(self, source: str, future: Future) -> None:
+        if future.cancelled():
+            return
+        result = future.result()
+        with self._lock:
+            self._snapshot[source] = result
+        if result.ok:
+            logger.debug(f"{source} version check took {result.duration:.1f}s")
+
+    def refresh(self, sources: list[str] | None = None) -> dict[str, Future]:
+        """
+        Starts checking ``sources`` (all of them by default) in the
+        background. A source that is still being checked isn't checked twice.
+
+        :return: The futures of the checks, by source.
+        """
+        futures = {}
+        started = []
+        with self._lock:
+            for source in sources or self.checks:
+                future = self._in_flight.get(source)
+                if future is None or future.done():
+                    future = self._executors[source].submit(self._check, source)
+                    self._in_flight[source] = future
+                    started.append(source)
+                futures[source] = future
+        # Outside the lock: a check that has already finished calls back at once
+        for source in started:
+            futures[source].add_done_callback(partial(self._store, source))
+        return futures
+
+    def wait(self, sources: list[str] | None = None) -> dict[str, CheckResult]:
+        """Checks ``sources`` concurrently, blocking until each finishes or times out."""
+        started = time.monotonic()
+        results = {}
+        for source, future in self.refresh(sources).items():
+            remaining = self.timeout_for(source) - (time.monotonic() - started)
+            try:
+                results[source] = future.result(max(0, remaining))
+                self._store(source, future)  # its callback may not have run yet
+            except FutureTimeoutError:
+                logger.warning(f"{source} version check timed out")
+                results[source] = CheckResult(
+                    error="timed out", checked_at=datetime.now()
+                )
+        return results
+
+    def latest(self, source: str, max_age: float | None = None) -> CheckResult | None:
+        """
+        The last completed check of ``source``, or None if there is none (no
+        older than ``max_age`` seconds, if given).
+        """
+        with self._lock:
+            result = self._snapshot.get(source)
+        if result is None or result.checked_at is None:
+            return None
+        if max_age is not None and datetime.now() - result.checked_at > timedelta(
+            seconds=max_age
+        ):
+            return None
+        return result
+
+    def snapshot(self) -> dict[str, CheckResult]:
+        with self._lock:
+            return dict(self._snapshot)
+
+    def shutdown(self) -> None:
+        for executor in self._executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _check_serverapi() -> dict | bool:
+    return use_serverapi() and serverapi_needs_update()
+
+
+_checker = None
+_checker_lock = threading.Lock()
+
+
+def get_version_checker() -> VersionChecker:
+    """Returns the shared checker for the server, mods and ServerAPI."""
+    global _checker
+    with _checker_lock:
+        if _checker is None:
+            check_config = CONFIG["advanced"].get("version_checks", {}) or {}
+            _checker = VersionChecker(
+                {
+                    "server": does_server_need_update,
+                    "mods": mods_needing_update,
+                    "serverapi": _check_serverapi,
+                },
+                timeout=check_config.get("timeout", 60),
+                retries=check_config.get("retries", 2),
+            )
+        return _checker
@@ -0,0 +1,176 @@
+import threading
+import time
+from collections import deque
+from enum import Enum
+
+import requests
+
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+DISCORD_CONTENT_LIMIT = 2000
+
+
+class Delivery(Enum):
+    """What became of a message handed to ``WebhookSender.deliver``."""
+
+    SENT = 1
+    PENDING = 2  # not posted yet (rate limited, or behind a message to retry)
+    RETRY = 3  # failed for now (a server or connection error)
+    REJECTED = 4  # refused by Discord (a 4xx other than 429), retrying won't help
+
+
+def _pack(
+    messages: list[str], limit: int = DISCORD_CONTENT_LIMIT
+) -> list[list[tuple[int, str]]]:
+    """
+    Joins messages into as few posts as fit within ``limit``, splitting the
+    ones that are too long.
+
+    :return: The posts, as the ``(message index, text)`` pieces they are made of.
+    """
+    posts = []
+    current = []
+    length = 0
+    for index, message in enumerate(messages):
+        pieces = [message[i : i + limit] for i in range(0, len(message), limit)]
+        for piece in pieces or [""]:
+            if length and length + 1 + len(piece) <= limit:
+                current.append((index, piece))
+                length += 1 + len(piece)
+            else:
+                if length:
+                    posts.append(current)
+                current = [(index, piece)]
+                length = len(piece)
+    if length:
+        posts.append(current)
+    return posts
+
+
+def pack_messages(messages: list[str], limit: int = DISCORD_CONTENT_LIMIT) -> list[str]:
+    """Joins messages into as few newline-separated posts as fit within ``limit``."""
+    return ["\n".join(piece for _, piece in post) for post in _pack(messages, limit)]
+
+
+class WebhookSender:
+    """
+    Delivers batches of messages to one Discord webhook over a pooled HTTP
+    session.
+
+    Each batch is packed into as few posts as Discord allows. Nothing is
+    retried or waited for here, so one webhook can't hold up the caller: a
+    post that hits Discord's rate limit (an exhausted bucket, or a 429) is
+    left pending and ``retry_after`` says when to try again, and a post that
+    fails with a server or connection error is left for the caller to retry.
+    A post Discord rejects outright (a 4xx other than 429) isn't retried.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        session: requests.Session | None = None,
+        timeout: float = 10,
+    ):
+        self.url = url
+        self.session = session or requests.Session()
+        self.timeout = timeout
+        self._reset_at = 0.0  # monotonic time at which an exhausted bucket refills
+        self._lock = threading.Lock()
+
+    @property
+    def retry_after(self) -> float:
+        """Seconds until Discord's rate limit allows posting again."""
+        return max(0.0, self._reset_at - time.monotonic())
+
+    def deliver(self, messages: list[str]) -> list[Delivery]:
+        """
+        Posts messages now, in order, packed into as few posts as possible.
+        When a post fails, the messages after it are left pending, so they
+        aren't posted out of order. When Discord rejects a post of several
+        messages, they are posted one by one, so only the ones it objects to
+        are rejected.
+
+        :return: What became of each message. A message split over several
+            posts gets the outcome of its worst post.
+        """
+        results = [Delivery.SENT] * len(messages)
+        with self._lock:
+            posts = deque(_pack(messages))
+            while posts:
+                post = posts.popleft()
+                result = self._post("\n".join(piece for _, piece in post))
+                if result is Delivery.REJECTED and len(post) > 1:
+                    posts.extendleft([piece] for piece in reversed(post))
+                    continue
+                outcomes = [(post, result)]
+                if result in (Delivery.RETRY, Delivery.PENDING):
+                    outcomes += [(rest, Delivery.PENDING) for rest in posts]
+                    posts.clear()
+                for pieces, outcome in outcomes:
+                    for index, _ in pieces:
+                        results[index] = max(
+                            results[index], outcome, key=lambda d: d.value
+                        )
+        return results
+
+    def _update_bucket(self, response: requests.Response) -> None:
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset_after = response.headers.get("X-RateLimit-Reset-After")
+        if remaining is not None and reset_after is not None and int(remaining) == 0:
+            self._reset_at = time.monotonic() + float(reset_after)
+
+    @staticmethod
+    def _retry_after(response: requests.Response) -> float:
+        try:
+            return float(response.json()["retry_after"])
+        except (ValueError, KeyError, TypeError):
+            return float(response.headers.get("Retry-After", 1))
+
+    def _post(self, content: str) -> Delivery:
+        if self.retry_after > 0:
+            logger.debug(
+                f"Discord rate limit reached, holding messages for {self.retry_after:.2f}s"
+            )
+            return Delivery.PENDING
+        try:
+            response = self.session.post(
+                self.url, json={"content": content}, timeout=self.timeout
+            )
+        except requests.RequestException as e:
+            logger.warning(f"Error sending message to Discord: {e}")
+            return Delivery.RETRY
+        self._update_bucket(response)
+        if response.status_code == 429:
+            retry_after = self._retry_after(response)
+            logger.warning(
+                f"Discord rate limited the webhook, retrying in {retry_after:.2f}s"
+            )
+            self._reset_at = time.monotonic() + retry_after
+            return Delivery.PENDING
+        if response.ok:
+            logger.info(f"Sent message to Discord: {content}")
+            return Delivery.SENT
+        if response.status_code < 500:
+            logger.error(
+                f"Discord rejected message ({response.status_code}): {response.text}"
+            )
+            return Delivery.REJECTED
+        logger.warning(f"Discord returned {response.status_code}, will retry")
+        return Delivery.RETRY
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_senders: dict[str, WebhookSender] = {}
+_senders_lock = threading.Lock()
+
+
+def get_sender(url: str) -> WebhookSender:
+    """Returns the shared sender for a webhook URL."""
+    with _senders_lock:
+        if url not in _senders:
+            _senders[url] = WebhookSender(url)
+        return _senders[url]
@@ -0,0 +1,32 @@
+"""
+Stands in for steamcmd by printing a recorded session, for testing.
+
+Usage: fake_steamcmd.py <recording> [--delay SECONDS] [--stall-at LINE]
+    [--error MESSAGE]
+"""
+
+import argparse
+import sys
+import time
+
+parser = argparse.ArgumentParser()
+parser.add_argument("recording")
+parser.add_argument("--delay", type=float, default=0.0)
+parser.add_argument("--stall-at", type=int)
+parser.add_argument("--error")
+args = parser.parse_args()
+
+with open(args.recording) as f:
+    lines = f.read().splitlines()
+for number, line in enumerate(lines):
+    if args.stall_at is not None and number >= args.stall_at:
+        # keep repeating the last progress line, like a stuck download
+        while True:
+            print(lines[args.stall_at - 1], flush=True)
+            time.sleep(0.05)
+    if args.error and line.startswith("Success!"):
+        line = f"Error! {args.error}"
+    # steamcmd updates progress in place with a carriage return
+    print(line, end="\r\n" if "Update state" not in line else "\r", flush=True)
+    time.sleep(args.delay)
+sys.exit(8 if args.error else 0)
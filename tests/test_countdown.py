@@ -0,0 +1,60 @@
+from datetime import timedelta
+
+from countdown import Countdown
+from scheduler import Scheduler
+
+
+def make_countdown():
+    scheduler = Scheduler()
+    warnings, finished = [], []
+    countdown = Countdown(
+        scheduler,
+        lambda minute, subjects: warnings.append((minute, subjects)),
+        finished.append,
+    )
+    return scheduler, countdown, warnings, finished
+
+
+def test_warns_then_finishes_without_blocking():
+    scheduler, countdown, warnings, finished = make_countdown()
+    assert countdown.start("update", [1, 10, 5])
+    deadline = countdown.deadline
+
+    scheduler.run_pending(deadline - timedelta(minutes=10))
+    assert warnings == [(10, ["update"])]
+    scheduler.run_pending(deadline - timedelta(minutes=1))
+    assert [minute for minute, _ in warnings] == [10, 5, 1]
+    assert finished == []
+
+    scheduler.run_pending(deadline)
+    assert finished == [["update"]]
+    assert not countdown.active
+    assert len(scheduler) == 0
+
+
+def test_second_subject_joins_running_countdown():
+    scheduler, countdown, warnings, finished = make_countdown()
+    countdown.start("update", [10, 5, 1])
+    deadline = countdown.deadline
+    scheduler.run_pending(deadline - timedelta(minutes=10))
+
+    assert not countdown.start("mod update", [30, 1])
+    assert countdown.deadline == deadline
+    scheduler.run_pending(deadline)
+    assert warnings[-1] == (1, ["update", "mod update"])
+    assert finished == [["update", "mod update"]]
+
+
+def test_cancel_stops_warnings_and_action():
+    scheduler, countdown, warnings, finished = make_countdown()
+    countdown.start("update", [10, 5, 1])
+    deadline = countdown.deadline
+
+    assert countdown.cancel() == ["update"]
+    scheduler.run_pending(deadline + timedelta(minutes=1))
+    assert warnings == [] and finished == []
+
+    # A new countdown can start afterwards
+    assert countdown.start("mod update", [])
+    scheduler.run_pending(countdown.deadline)
+    assert finished == [["mod update"]]
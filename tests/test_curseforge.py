@@ -0,0 +1,93 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from curseforge import CurseForgeClient
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """A local CurseForge /v1/mods that fails the first ``failures`` requests."""
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server.requests.append(body["modIds"])
+        if server.failures:
+            server.failures -= 1
+            self.send_response(server.failure_status)
+            self.end_headers()
+            return
+        data = [
+            {
+                "id": mod_id,
+                "name": f"Mod {mod_id}",
+                "dateReleased": "2024-06-05T12:00:42.123Z",
+            }
+            for mod_id in body["modIds"]
+            if mod_id != 404
+        ]
+        payload = json.dumps({"data": data}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def standin():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    server.requests = []
+    server.failures = 0
+    server.failure_status = 503
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def client_for(server, **kwargs):
+    return CurseForgeClient(
+        lambda: "key",
+        base_url=f"http://127.0.0.1:{server.server_port}",
+        backoff=0.01,
+        **kwargs,
+    )
+
+
+def test_mods_are_fetched_in_bounded_batches(standin):
+    client = client_for(standin, batch_size=3)
+    mods = client.get_mods(list(range(1, 9)) + [404])
+    assert sorted(mods) == list(range(1, 9))
+    assert sorted(len(batch) for batch in standin.requests) == [3, 3, 3]
+
+
+def test_cached_mods_are_not_fetched_again(standin, tmp_path):
+    cache_path = str(tmp_path / "cache.json")
+    client_for(standin, cache_path=cache_path).get_mods([1, 2])
+    # a new client (e.g. after the suite restarted) reads the cache from disk
+    client = client_for(standin, cache_path=cache_path)
+    assert client.get_mods([1, 2, 3])[1]["name"] == "Mod 1"
+    assert standin.requests == [[1, 2], [3]]
+    client.get_mods([1], max_age=0)
+    assert standin.requests[-1] == [1]
+
+
+def test_server_errors_are_retried(standin):
+    standin.failures = 2
+    assert list(client_for(standin).get_mods([1])) == [1]
+    assert len(standin.requests) == 3
+
+
+def test_client_errors_are_not_retried(standin):
+    standin.failures = 1
+    standin.failure_status = 403
+    with pytest.raises(requests.HTTPError):
+        client_for(standin).get_mods([1])
+    assert len(standin.requests) == 1
@@ -0,0 +1,78 @@
+import threading
+import time
+
+from dispatcher import EventDispatcher
+
+
+class FakeEvent:
+    def __init__(self, key, handled, gate=None):
+        self.ordering_key = key
+        self.handled = handled
+        self.gate = gate
+
+    def handle(self):
+        if self.gate:
+            self.gate.wait()
+        self.handled.append(self)
+
+
+def test_events_with_same_key_stay_in_order():
+    handled = []
+    dispatcher = EventDispatcher(workers=4)
+    dispatcher.start()
+    events = [FakeEvent("player_connect", handled) for _ in range(50)]
+    for event in events:
+        dispatcher.submit(event)
+    dispatcher.join()
+    dispatcher.stop()
+    assert handled == events
+    assert dispatcher.stats()["FakeEvent"].handled == 50
+
+
+def test_drop_oldest_when_full():
+    handled = []
+    gate = threading.Event()
+    dispatcher = EventDispatcher(workers=1, queue_size=2, drop_policy="drop_oldest")
+    dispatcher.start()
+    blocker = FakeEvent("k", handled, gate)
+    dispatcher.submit(blocker)
+    while dispatcher._queues[0].qsize():
+        pass  # wait until the worker is busy with the blocker
+    events = [FakeEvent("k", handled) for _ in range(4)]
+    for event in events:
+        assert dispatcher.submit(event)
+    gate.set()
+    dispatcher.join()
+    dispatcher.stop()
+    assert handled == [blocker] + events[2:]
+    assert dispatcher.stats()["FakeEvent"].dropped == 2
+
+
+def test_drop_newest_and_failures():
+    gate = threading.Event()
+    dispatcher = EventDispatcher(workers=1, queue_size=1, drop_policy="drop_newest")
+    dispatcher.start()
+    dispatcher.submit(FakeEvent("k", [], gate))
+    while dispatcher._queues[0].qsize():
+        pass
+    assert dispatcher.submit(FakeEvent("k", None))
+    assert not dispatcher.submit(FakeEvent("k", []))
+    gate.set()
+    dispatcher.join()
+    dispatcher.stop()
+    stats = dispatcher.stats()["FakeEvent"]
+    assert (stats.handled, stats.failed, stats.dropped) == (1, 1, 1)
+
+
+def test_stop_gives_up_on_a_stuck_worker():
+    gate = threading.Event()
+    dispatcher = EventDispatcher(workers=1, queue_size=1, drop_policy="block")
+    dispatcher.start()
+    dispatcher.submit(FakeEvent("k", [], gate))
+    while dispatcher._queues[0].qsize():
+        pass  # wait until the worker is stuck on the first event
+    dispatcher.submit(FakeEvent("k", []))  # fills the queue
+    started = time.monotonic()
+    dispatcher.stop(timeout=0.2)
+    assert time.monotonic() - started < 1
+    gate.set()
@@ -0,0 +1,95 @@
+import os
+
+import pytest
+
+import integrity
+from integrity import ContentManifest, record, verify
+
+
+@pytest.fixture
+def install(tmp_path):
+    root = tmp_path / "server"
+    (root / "ShooterGame" / "Content").mkdir(parents=True)
+    (root / "ShooterGame" / "Saved").mkdir()
+    (root / "ShooterGame" / "Content" / "map.pak").write_bytes(os.urandom(10_000))
+    (root / "ShooterGame" / "Content" / "empty.txt").write_bytes(b"")
+    (root / "server.exe").write_bytes(b"binary")
+    (root / "ShooterGame" / "Saved" / "world.ark").write_bytes(b"save")
+    return root
+
+
+def set_mtime(path, mtime_ns):
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_unchanged_install_has_no_drift(install):
+    manifest = record(str(install), chunk_size=1024)
+    assert set(manifest.files) == {
+        "ShooterGame/Content/map.pak",
+        "ShooterGame/Content/empty.txt",
+        "server.exe",
+    }
+    assert len(manifest.files["ShooterGame/Content/map.pak"].chunks) == 10
+    assert not verify(str(install), manifest)
+    assert not verify(str(install), manifest, full=True)
+
+
+def test_segments_hash_like_whole_files(install, monkeypatch):
+    whole = record(str(install), chunk_size=1024)
+    monkeypatch.setattr(integrity, "SEGMENT_CHUNKS", 3)
+    assert record(str(install), chunk_size=1024, workers=4) == whole
+
+
+def test_drift_is_detected(install):
+    manifest = record(str(install), chunk_size=1024)
+    pak = install / "ShooterGame" / "Content" / "map.pak"
+    mtime = pak.stat().st_mtime_ns
+
+    # touched but identical: hashed, and not drift
+    set_mtime(pak, mtime + 10**9)
+    assert not verify(str(install), manifest)
+
+    # same size, different content
+    pak.write_bytes(b"x" + pak.read_bytes()[1:])
+    assert verify(str(install), manifest).changed == ["ShooterGame/Content/map.pak"]
+
+    # restoring the mtime hides it from the quick check, but not a full one
+    set_mtime(pak, mtime)
+    assert not verify(str(install), manifest)
+    assert verify(str(install), manifest, full=True)
+
+    (install / "server.exe").unlink()
+    (install / "ShooterGame" / "Saved" / "world.ark").write_bytes(b"other save")
+    drift = verify(str(install), manifest)
+    assert drift.missing == ["server.exe"]
+
+
+def test_record_reuses_unchanged_hashes(install, monkeypatch):
+    previous = record(str(install), chunk_size=1024)
+    (install / "server.exe").write_bytes(b"new binary")
+    hashed = []
+    hash_segment = integrity._hash_segment
+    monkeypatch.setattr(
+        integrity,
+        "_hash_segment",
+        lambda path, *args: hashed.append(path) or hash_segment(path, *args),
+    )
+    manifest = record(str(install), previous, chunk_size=1024)
+    assert hashed == [os.path.join(str(install), "server.exe")]
+    assert not verify(str(install), manifest, full=True)
+
+
+def test_manifest_round_trip(install, tmp_path):
+    manifest = record(str(install), chunk_size=1024)
+    path = str(tmp_path / "manifest.json")
+    manifest.save(path)
+    assert ContentManifest.load(path) == manifest
+    assert ContentManifest.load(str(tmp_path / "missing.json")) is None
+    (tmp_path / "manifest.json").write_text("{")
+    assert ContentManifest.load(path) is None
+
+
+def test_manifest_path_is_per_install_dir(tmp_path):
+    live = str(tmp_path / "server")
+    assert integrity.manifest_path(live) == integrity.manifest_path(live + os.sep)
+    assert integrity.manifest_path(live) != integrity.manifest_path(live + ".staged")
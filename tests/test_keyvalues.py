@@ -0,0 +1,75 @@
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+import keyvalues
+from errors import KeyValuesError
+from keyvalues import load_cached, loads, read_app_manifest
+
+MANIFEST = Path(__file__).parent / "assets" / "appmanifest_2430930.acf"
+
+
+def test_loads_nested_sections_escapes_and_comments():
+    data = loads("""
+        // leading comment
+        "root"
+        {
+            "path"    "C:\\\\Games\\\\\\"Ark\\""  // trailing comment
+            bare      value
+            "cond"    "1"  [$WIN32]
+            "child" { "empty" "" }
+        }
+        """)
+    assert data == {
+        "root": {
+            "path": 'C:\\Games\\"Ark"',
+            "bare": "value",
+            "cond": "1",
+            "child": {"empty": ""},
+        }
+    }
+
+
+@pytest.mark.parametrize(
+    "text", ['"a" {', '"a" "b" }', "{ }", '"a" "unterminated', '"key"']
+)
+def test_malformed_input_raises(text):
+    with pytest.raises(KeyValuesError):
+        loads(text)
+
+
+def test_tokens_spanning_chunks(monkeypatch):
+    monkeypatch.setattr(keyvalues, "_READ_SIZE", 3)
+    text = MANIFEST.read_text()
+    with open(MANIFEST) as f:
+        assert keyvalues.load(f) == loads(text)
+    assert loads(text)["AppState"]["name"] == "ARK: Survival Ascended Dedicated Server"
+
+
+def test_read_app_manifest():
+    manifest = read_app_manifest(str(MANIFEST))
+    assert manifest.app_id == 2430930
+    assert manifest.build_id == "14776564"
+    assert manifest.state_flags == 4
+    assert manifest.depots[2430931].manifest == "6219540127343522138"
+    assert manifest.last_updated is not None
+
+
+def test_cache_is_invalidated_when_the_file_changes(tmp_path, monkeypatch):
+    path = tmp_path / MANIFEST.name
+    shutil.copy(MANIFEST, path)
+    parses = []
+    load = keyvalues.load
+    monkeypatch.setattr(keyvalues, "load", lambda fp: parses.append(1) or load(fp))
+
+    first = load_cached(str(path))
+    assert load_cached(str(path)) is first
+    assert len(parses) == 1
+
+    path.write_text(path.read_text().replace("14776564", "14899999"))
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert read_app_manifest(str(path)).build_id == "14899999"
+    assert len(parses) == 2
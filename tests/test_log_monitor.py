@@ -0,0 +1,98 @@
+import json
+
+import pytest
+
+import log_monitor
+from config import CONFIG
+from log_monitor import (
+    DinoTamed,
+    GlobalChatMessage,
+    LogEventFactory,
+    LogMonitor,
+    PlayerDied,
+    PlayerJoined,
+    PlayerLeft,
+)
+from roster import PlayerRoster
+
+PREFIX = "[2023.11.21-21.07.55:731][258]2023.11.21_21.07.55: "
+
+lines = [
+    ("Bob ID 123456789 joined this ARK!", PlayerJoined),
+    ("Bob ID 123456789 left this ARK!", PlayerLeft),
+    (
+        'Tribe Brohalla, ID 123456: Day 12, 08:15:22: <RichColor Color="1, 0, 0, 1">Tribemember Bob - Lvl 45 was killed by a Raptor - Lvl 30!</>)',
+        PlayerDied,
+    ),
+    ("Tribe Brohalla Tamed an Anglerfish - Lvl 224 (Anglerfish)!", DinoTamed),
+    ("bob123 (Bob): anyone want to trade metal?", GlobalChatMessage),
+    ('<RichColor Color="1, 1, 0, 1">Bob Tamed a Raptor</>', None),
+    ("Tribe Brohalla, ID 123456: Day 12, 08:15:23: Bob unclaimed 'Raptor'", None),
+]
+
+
+@pytest.mark.parametrize("message,expected", lines)
+def test_classify(message, expected):
+    assert LogEventFactory.classify(PREFIX + message) is expected
+
+
+def test_register_recompiles():
+    class ServerCrashed(PlayerJoined):
+        triggers = ("fatal error",)
+
+        @classmethod
+        def is_event(cls, line):
+            return "Fatal error" in line
+
+    LogEventFactory.register_event_type(ServerCrashed)
+    try:
+        assert LogEventFactory.classify(PREFIX + "Fatal error!") is ServerCrashed
+    finally:
+        LogEventFactory.event_types.remove(ServerCrashed)
+        LogEventFactory._trigger_pattern = None
+
+
+class RecordingDispatcher:
+    def __init__(self):
+        self.events = []
+
+    def submit(self, event):
+        self.events.append(event)
+        return True
+
+
+def test_monitor_resumes_from_checkpoint(tmp_path):
+    log_path = tmp_path / "ShooterGame.log"
+    checkpoint_path = tmp_path / "checkpoint.json"
+    log_path.write_text(PREFIX + "Bob ID 1 joined this ARK!\n")
+
+    # Without a checkpoint, what is already in the log is skipped
+    dispatcher = RecordingDispatcher()
+    monitor = LogMonitor(dispatcher, str(log_path), str(checkpoint_path))
+    with open(log_path, "a") as f:
+        f.write(PREFIX + "Alice ID 2 joined this ARK!\n")
+    assert [e.player_name for e in monitor.process_new_entries()] == ["Alice"]
+    assert dispatcher.events[0].player_name == "Alice"
+    monitor.save_checkpoint()
+    assert json.loads(checkpoint_path.read_text())["offset"] == log_path.stat().st_size
+
+    # Lines written while the monitor was down are caught up on
+    with open(log_path, "a") as f:
+        f.write(PREFIX + "Alice ID 2 left this ARK!\n")
+    monitor = LogMonitor(RecordingDispatcher(), str(log_path), str(checkpoint_path))
+    assert [type(e) for e in monitor.process_new_entries()] == [PlayerLeft]
+
+
+def test_connect_events_update_roster_without_discord(monkeypatch):
+    monkeypatch.setitem(CONFIG["discord"]["events"], "player_connect", False)
+    sent = []
+    monkeypatch.setattr(log_monitor, "send_to_discord", lambda *args: sent.append(args))
+    roster = PlayerRoster()
+    monkeypatch.setattr(log_monitor, "ROSTER", roster)
+    line = PREFIX + "Carol ID 3 joined this ARK!"
+    assert LogEventFactory.classify(line) is PlayerJoined
+    LogEventFactory.create(line).handle()
+    assert "Carol" in roster
+    LogEventFactory.create(PREFIX + "Carol ID 3 left this ARK!").handle()
+    assert "Carol" not in roster
+    assert sent == []
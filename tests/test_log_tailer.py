@@ -0,0 +1,94 @@
+import os
+
+from log_tailer import LogTailer
+
+
+def read_all(tailer):
+    return [line for lines in tailer.read_lines() for line in lines]
+
+
+def test_partial_lines_are_carried_over(tmp_path):
+    path = tmp_path / "ShooterGame.log"
+    path.write_bytes(b"first\r\nsec")
+    tailer = LogTailer(str(path))
+    assert read_all(tailer) == ["first"]
+    with open(path, "ab") as f:
+        f.write(b"ond\nthird\n")
+    assert read_all(tailer) == ["second", "third"]
+    assert read_all(tailer) == []
+
+
+def test_bounded_chunks_and_bad_bytes(tmp_path):
+    path = tmp_path / "ShooterGame.log"
+    path.write_bytes(
+        b"".join(b"line %d\n" % i for i in range(100)) + b"bad \xff byte\n"
+    )
+    tailer = LogTailer(str(path), chunk_size=64)
+    chunks = list(tailer.read_lines())
+    assert len(chunks) > 1
+    lines = [line for chunk in chunks for line in chunk]
+    assert lines[:2] == ["line 0", "line 1"]
+    assert lines[-1] == "bad � byte"
+    assert len(lines) == 101
+
+
+def test_truncation_and_replacement(tmp_path):
+    path = tmp_path / "ShooterGame.log"
+    path.write_bytes(b"old line one\nold line two\n")
+    tailer = LogTailer(str(path))
+    tailer.seek_to_end()
+    path.write_bytes(b"new\n")
+    assert read_all(tailer) == ["new"]
+
+    replacement = tmp_path / "ShooterGame.new"
+    replacement.write_bytes(b"rotated\n")
+    os.replace(replacement, path)
+    assert read_all(tailer) == ["rotated"]
+
+
+def test_missing_file(tmp_path):
+    tailer = LogTailer(str(tmp_path / "missing.log"))
+    tailer.seek_to_end()
+    assert read_all(tailer) == []
+
+
+def test_resume_from_checkpoint(tmp_path):
+    path = tmp_path / "ShooterGame.log"
+    path.write_bytes(b"one\ntwo\npart")
+    tailer = LogTailer(str(path))
+    assert read_all(tailer) == ["one", "two"]
+    checkpoint = tailer.checkpoint()
+
+    with open(path, "ab") as f:
+        f.write(b"ial\nthree\n")
+    resumed = LogTailer(str(path))
+    assert resumed.resume(checkpoint, max_catchup=1 << 20) == len(b"partial\nthree\n")
+    assert read_all(resumed) == ["partial", "three"]
+
+
+def test_resume_caps_backlog(tmp_path):
+    path = tmp_path / "ShooterGame.log"
+    path.write_bytes(b"")
+    tailer = LogTailer(str(path))
+    tailer.seek_to_end()
+    checkpoint = tailer.checkpoint()
+    path.write_bytes(b"".join(b"line %03d\n" % i for i in range(100)))
+
+    resumed = LogTailer(str(path))
+    resumed.resume(checkpoint, max_catchup=25)
+    assert read_all(resumed) == ["line 098", "line 099"]
+
+
+def test_resume_after_replacement_reads_new_file(tmp_path):
+    path = tmp_path / "ShooterGame.log"
+    path.write_bytes(b"old\n" * 10)
+    tailer = LogTailer(str(path))
+    read_all(tailer)
+    checkpoint = tailer.checkpoint()
+
+    replacement = tmp_path / "ShooterGame.new"
+    replacement.write_bytes(b"fresh\n")
+    os.replace(replacement, path)
+    resumed = LogTailer(str(path))
+    resumed.resume(checkpoint, max_catchup=1 << 20)
+    assert read_all(resumed) == ["fresh"]
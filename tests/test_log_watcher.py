@@ -0,0 +1,79 @@
+import sys
+import threading
+import time
+
+import pytest
+
+from log_watcher import InotifyWatcher, PollingWatcher
+
+
+def append_later(path, delay=0.2):
+    def write():
+        time.sleep(delay)
+        with open(path, "a") as f:
+            f.write("line\n")
+
+    threading.Thread(target=write, daemon=True).start()
+
+
+watchers = [PollingWatcher]
+if sys.platform.startswith("linux"):
+    watchers.append(InotifyWatcher)
+
+
+@pytest.mark.parametrize("watcher_class", watchers)
+def test_wakes_on_append(tmp_path, watcher_class):
+    path = tmp_path / "ShooterGame.log"
+    path.write_text("")
+    watcher = watcher_class(str(path))
+    try:
+        assert not watcher.wait(timeout=0.2)
+        append_later(path)
+        start = time.monotonic()
+        assert watcher.wait(timeout=5)
+        assert time.monotonic() - start < 2
+    finally:
+        watcher.close()
+
+
+@pytest.mark.parametrize("watcher_class", watchers)
+def test_wake_interrupts_wait(tmp_path, watcher_class):
+    path = tmp_path / "ShooterGame.log"
+    path.write_text("")
+    watcher = watcher_class(str(path))
+    try:
+        threading.Timer(0.1, watcher.wake).start()
+        start = time.monotonic()
+        assert not watcher.wait(timeout=5)
+        assert time.monotonic() - start < 2
+    finally:
+        watcher.close()
+
+
+def test_polling_backs_off(tmp_path):
+    path = tmp_path / "ShooterGame.log"
+    path.write_text("")
+    watcher = PollingWatcher(str(path), min_interval=0.01, max_interval=0.08)
+    watcher.wait(timeout=0.3)
+    assert watcher.interval == 0.08
+    path.write_text("changed")
+    assert watcher.wait(timeout=1)
+    assert watcher.interval == 0.01
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="needs inotify")
+def test_inotify_ignores_other_files(tmp_path):
+    path = tmp_path / "ShooterGame.log"
+    path.write_text("")
+    watcher = InotifyWatcher(str(path))
+    try:
+        append_later(tmp_path / "ShooterGame_backup.log", delay=0.1)
+        start = time.monotonic()
+        assert not watcher.wait(timeout=0.5)
+        assert time.monotonic() - start >= 0.5
+        append_later(tmp_path / "other.log", delay=0.1)
+        append_later(path, delay=0.3)
+        assert watcher.wait(timeout=5)
+        assert time.monotonic() - start < 3
+    finally:
+        watcher.close()
@@ -0,0 +1,131 @@
+import json
+import os
+
+import pytest
+
+import mod_cache
+from mod_cache import ModCache
+from mods import Mod
+
+
+def entry(mod_id, file_id, name):
+    return {
+        "details": {"name": name},
+        "installedFile": {
+            "id": file_id,
+            "modId": mod_id,
+            "fileDate": "2024.06.01-10.00.00",
+        },
+    }
+
+
+@pytest.fixture
+def install(tmp_path, monkeypatch):
+    mods_dir = tmp_path / "ShooterGame/Binaries/Win64/ShooterGame/Mods/83374"
+    for folder in ["100_1", "200_2"]:
+        (mods_dir / folder).mkdir(parents=True)
+        (mods_dir / folder / "mod.pak").write_bytes(b"pak")
+    library = (
+        tmp_path
+        / "ShooterGame/Binaries/Win64/ShooterGame/ModsUserData/83374/library.json"
+    )
+    library.parent.mkdir(parents=True)
+    library.write_text(
+        json.dumps({"installedMods": [entry(100, 1, "Foo"), entry(200, 2, "Bar")]}),
+        encoding="utf-8-sig",
+    )
+    wipes = []
+    monkeypatch.setattr(mod_cache, "delete_mods_folder", lambda: wipes.append(1))
+    return ModCache(str(tmp_path)), mods_dir, library, wipes
+
+
+def installed_ids(library):
+    data = json.loads(library.read_text(encoding="utf-8-sig"))
+    return [e["installedFile"]["modId"] for e in data["installedMods"]]
+
+
+def test_up_to_date_mods_are_kept(install):
+    cache, mods_dir, library, wipes = install
+    cache.refresh([])
+    assert installed_ids(library) == [100, 200]
+    assert (mods_dir / "100_1" / "mod.pak").exists()
+    assert wipes == []
+
+
+def test_only_outdated_and_broken_mods_are_removed(install):
+    cache, mods_dir, library, wipes = install
+    (mods_dir / "200_2" / "mod.pak").unlink()
+    (mods_dir / "300_3").mkdir()  # not in the library
+    cache.refresh([Mod("Foo", None, None, True, mod_id=100)])
+    assert installed_ids(library) == []
+    assert not (mods_dir / "100_1").exists()
+    assert not (mods_dir / "200_2").exists()
+    assert not (mods_dir / "300_3").exists()
+    assert library.read_bytes().startswith(b"\xef\xbb\xbf")
+    assert wipes == []
+
+
+def test_unreadable_library_wipes_all_mods(install):
+    cache, _, library, wipes = install
+    library.write_text("{")
+    cache.refresh([])
+    assert wipes == [1]
+
+
+def test_unusable_entries_are_removed_alone(install):
+    cache, mods_dir, library, wipes = install
+    library.write_text(
+        json.dumps(
+            {
+                "installedMods": [
+                    entry(100, 1, "Foo"),
+                    entry(200, 2, "Bar"),
+                    entry(200, 2, "Bar"),
+                    {"details": {}},
+                ]
+            }
+        )
+    )
+    cache.refresh([])
+    assert installed_ids(library) == [100]
+    assert (mods_dir / "100_1" / "mod.pak").exists()
+    assert not (mods_dir / "200_2").exists()
+    assert library.read_bytes().startswith(b"{")  # written back without a BOM
+    assert wipes == []
+
+
+def test_unknown_remote_state_keeps_mods(install):
+    cache, mods_dir, library, wipes = install
+    cache.refresh(None)
+    assert installed_ids(library) == [100, 200]
+    assert (mods_dir / "100_1" / "mod.pak").exists()
+    assert wipes == []
+
+
+def test_installed_files_move_to_the_new_file_folder(install, tmp_path):
+    cache, mods_dir, library, _ = install
+    source = tmp_path / "staged"
+    source.mkdir()
+    (source / "mod.pak").write_bytes(b"new pak")
+    cache.install_files(200, str(source), {"id": 5, "modId": 200})
+    assert (mods_dir / "200_5" / "mod.pak").read_bytes() == b"new pak"
+    assert not (mods_dir / "200_2").exists()
+    data = json.loads(library.read_text(encoding="utf-8-sig"))
+    assert data["installedMods"][1]["installedFile"]["id"] == 5
+    assert "pathOnDisk" not in data["installedMods"][1]
+    cache.refresh([])  # the renamed folder is still the mod's
+    assert (mods_dir / "200_5" / "mod.pak").exists()
+
+
+def test_saved_library_is_read_again(install):
+    cache, _, library, _ = install
+    cache._save_library(cache._load_library())
+    assert cache.index.mods()[200].file_id == 2
+    stat = library.stat()
+    read = cache._load_library()
+    read.data["installedMods"][1]["installedFile"]["id"] = 3
+    cache._save_library(read)
+    # same size, and within the same mtime tick
+    os.utime(library, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert library.stat().st_size == stat.st_size
+    assert cache.index.mods()[200].file_id == 3
@@ -0,0 +1,137 @@
+import hashlib
+import io
+import json
+import re
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from curseforge import CurseForgeClient
+from mod_cache import ModCache
+from mod_prefetch import ModPrefetcher
+
+
+def mod_zip():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        zf.writestr("WindowsServer/Foo.pak", b"new pak")
+        zf.writestr("WindowsServer/Foo.ucas", b"new ucas")
+    return buffer.getvalue()
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """CurseForge's mods and files APIs, and a CDN serving the mod archives."""
+
+    def _send(self, status, payload, content_type="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        data = [{"id": i, "name": f"Mod {i}", "mainFileId": 2} for i in body["modIds"]]
+        self._send(200, json.dumps({"data": data}).encode())
+
+    def do_GET(self):
+        server = self.server
+        if match := re.fullmatch(r"/v1/mods/(\d+)/files/(\d+)", self.path):
+            mod_id, file_id = map(int, match.groups())
+            file = {
+                "id": file_id,
+                "modId": mod_id,
+                "fileName": f"mod-{mod_id}.zip",
+                "fileLength": len(server.archive),
+                "fileDate": "2024-06-05T12:00:42.123Z",
+                "downloadUrl": f"{server.url}/files/{mod_id}.zip",
+                "hashes": [{"value": server.sha1, "algo": 1}],
+            }
+            self._send(200, json.dumps({"data": file}).encode())
+        elif self.path.startswith("/files/"):
+            server.downloads.append(self.path)
+            self._send(200, server.archive, "application/zip")
+        else:
+            self._send(404, b"")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def standin():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    server.url = f"http://127.0.0.1:{server.server_port}"
+    server.archive = mod_zip()
+    server.sha1 = hashlib.sha1(server.archive).hexdigest()
+    server.downloads = []
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def prefetcher(standin, tmp_path):
+    mods_dir = tmp_path / "ShooterGame/Binaries/Win64/ShooterGame/Mods/83374"
+    (mods_dir / "100_1" / "WindowsServer").mkdir(parents=True)
+    (mods_dir / "100_1" / "WindowsServer" / "Foo.pak").write_bytes(b"old pak")
+    library = (
+        tmp_path
+        / "ShooterGame/Binaries/Win64/ShooterGame/ModsUserData/83374/library.json"
+    )
+    library.parent.mkdir(parents=True)
+    library.write_text(
+        json.dumps(
+            {
+                "installedMods": [
+                    {
+                        "details": {"name": "Foo"},
+                        "pathOnDisk": str(mods_dir / "100_1"),
+                        "installedFile": {
+                            "id": 1,
+                            "modId": 100,
+                            "fileDate": "2024.06.01-10.00.00",
+                        },
+                    }
+                ]
+            }
+        )
+    )
+    client = CurseForgeClient(lambda: "key", base_url=standin.url, backoff=0.01)
+    return ModPrefetcher(client, ModCache(str(tmp_path)), str(tmp_path / "staging"))
+
+
+def test_prefetched_mod_replaces_the_installed_one(prefetcher, standin, tmp_path):
+    prefetcher.start([100])
+    prefetcher.start([100])  # already being prefetched
+    prefetcher.install()
+
+    mods_dir = tmp_path / "ShooterGame/Binaries/Win64/ShooterGame/Mods/83374"
+    mod_dir = mods_dir / "100_2"  # named after the new file
+    assert (mod_dir / "WindowsServer" / "Foo.pak").read_bytes() == b"new pak"
+    assert (mod_dir / "WindowsServer" / "Foo.ucas").read_bytes() == b"new ucas"
+    assert [path.name for path in mods_dir.iterdir()] == ["100_2"]
+    with open(prefetcher.cache.library_path) as f:
+        library = json.load(f)
+    entry = library["installedMods"][0]
+    assert entry["pathOnDisk"] == str(mod_dir)
+    installed_file = entry["installedFile"]
+    assert installed_file["id"] == 2
+    assert installed_file["fileDate"] == "2024.06.05-12.00.42"
+    assert standin.downloads == ["/files/100.zip"]
+    assert not list((tmp_path / "staging").iterdir())
+
+
+def test_corrupt_download_leaves_the_mod_for_the_server(prefetcher, standin, tmp_path):
+    standin.sha1 = "0" * 40
+    prefetcher.start([100])
+    prefetcher.install()
+
+    mod_dir = tmp_path / "ShooterGame/Binaries/Win64/ShooterGame/Mods/83374/100_1"
+    assert (mod_dir / "WindowsServer" / "Foo.pak").read_bytes() == b"old pak"
+    with open(prefetcher.cache.library_path) as f:
+        library = json.load(f)
+    assert library["installedMods"][0]["installedFile"]["id"] == 1
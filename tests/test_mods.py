@@ -0,0 +1,94 @@
+import json
+import os
+from datetime import datetime
+
+import mods
+from mods import InstalledModIndex
+
+
+def write_library(path, entries):
+    path.write_text(
+        json.dumps(
+            {
+                "installedMods": [
+                    {
+                        "details": {"name": name},
+                        "installedFile": {"modId": mod_id, "fileDate": file_date},
+                    }
+                    for mod_id, name, file_date in entries
+                ]
+            }
+        ),
+        encoding="utf-8-sig",
+    )
+
+
+def test_index_is_rebuilt_when_the_library_changes(tmp_path, monkeypatch):
+    library = tmp_path / "library.json"
+    write_library(library, [(100, "Foo", "2024.06.01-10.00.00"), (200, "Bar", "bad")])
+    index = InstalledModIndex(str(library))
+    builds = []
+    build = index._build
+    monkeypatch.setattr(index, "_build", lambda: builds.append(1) or build())
+
+    installed = index.mods()
+    assert installed[100].name == "Foo"
+    assert installed[100].installed_dt == datetime(2024, 6, 1, 10, 0)
+    assert installed[200].installed_dt is None
+    assert index.mods() is installed
+    assert len(builds) == 1
+
+    # the server downloaded a new version of Foo
+    write_library(library, [(100, "Foo", "2024.07.02-11.30.00")])
+    stat = library.stat()
+    os.utime(library, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert index.mods()[100].installed_dt == datetime(2024, 7, 2, 11, 30)
+    assert list(index.mods()) == [100]
+    assert len(builds) == 2
+
+
+def test_get_all_mods_joins_installed_and_remote(tmp_path, monkeypatch):
+    library = tmp_path / "library.json"
+    write_library(
+        library,
+        [(100, "Foo", "2024.06.01-10.00.00"), (200, "Bar", "2024.06.01-10.00.00")],
+    )
+    monkeypatch.setattr(mods, "INSTALLED_MODS", InstalledModIndex(str(library)))
+    latest = datetime(2024, 6, 5, 12, 0)
+    monkeypatch.setattr(
+        mods, "_get_remote_mod_info", lambda ids: {100: ("Foo", latest, True)}
+    )
+    all_mods = {mod.mod_id: mod for mod in mods.get_all_mods()}
+    assert all_mods[100].latest_dt == latest and all_mods[100].is_approved
+    assert all_mods[200].latest_dt is None
+    assert [mod.mod_id for mod in mods.mods_needing_update()] == [100]
+
+
+def test_missing_library_means_no_mods(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        mods, "INSTALLED_MODS", InstalledModIndex(str(tmp_path / "library.json"))
+    )
+    monkeypatch.setattr(mods, "_get_remote_mod_info", lambda ids: {})
+    assert mods.INSTALLED_MODS.mods() == {}
+    assert mods.mods_needing_update() == []
+
+
+def test_index_skips_unusable_entries(tmp_path):
+    library = tmp_path / "library.json"
+    library.write_text(
+        json.dumps(
+            {
+                "installedMods": [
+                    {"installedFile": {"modId": 100, "id": 1, "fileDate": "bad"}},
+                    {"details": {"name": "Broken"}},
+                    {"installedFile": {"modId": 200}, "details": {"name": "Twice"}},
+                    {"installedFile": {"modId": 200}, "details": {"name": "Twice"}},
+                ]
+            }
+        )
+    )
+    read = InstalledModIndex(str(library)).library()
+    assert list(read.mods) == [100]
+    assert read.mods[100].name == "" and read.mods[100].file_id == 1
+    assert read.entries[1:] == [None, None, None]
+    assert read.encoding == "utf-8"
@@ -0,0 +1,147 @@
+import time
+
+from outbox import Outbox, OutboxDrainer
+from webhook import Delivery
+
+
+def test_messages_survive_reopen(tmp_path):
+    path = str(tmp_path / "outbox.sqlite3")
+    outbox = Outbox(path)
+    for i in range(3):
+        outbox.enqueue("discord:log_webhook", f"message {i}")
+    outbox.close()
+
+    outbox = Outbox(path)
+    assert len(outbox) == 3
+    rows = outbox.pending()
+    assert [payload for _, _, payload, _ in rows] == [f"message {i}" for i in range(3)]
+    outbox.ack([rows[0][0]])
+    assert len(outbox) == 2
+    outbox.compact()
+    outbox.close()
+
+
+def test_oldest_messages_dropped_when_full(tmp_path):
+    outbox = Outbox(str(tmp_path / "outbox.sqlite3"), max_messages=2)
+    for i in range(5):
+        outbox.enqueue("discord:log_webhook", f"message {i}")
+    assert [row[2] for row in outbox.pending()] == ["message 3", "message 4"]
+
+
+def test_drainer_batches_in_order(tmp_path):
+    outbox = Outbox(str(tmp_path / "outbox.sqlite3"))
+    delivered = []
+    drainer = OutboxDrainer(outbox, window=0.2)
+    drainer.register(
+        "discord",
+        lambda name, payloads: delivered.append((name, payloads))
+        or [Delivery.SENT] * len(payloads),
+    )
+    drainer.start()
+    for i in range(3):
+        outbox.enqueue("discord:chat_webhook", f"chat {i}")
+        drainer.notify()
+    assert drainer.wait_idle(timeout=5)
+    drainer.stop()
+    assert delivered == [("chat_webhook", ["chat 0", "chat 1", "chat 2"])]
+    assert len(outbox) == 0
+
+
+def test_failing_channel_backs_off_without_blocking_others(tmp_path):
+    outbox = Outbox(str(tmp_path / "outbox.sqlite3"))
+    attempts = []
+    delivered = []
+
+    def deliver(name, payloads):
+        if name == "down":
+            attempts.append(time.monotonic())
+            return [Delivery.SENT if len(attempts) > 1 else Delivery.RETRY]
+        delivered.extend(payloads)
+        return [Delivery.SENT] * len(payloads)
+
+    outbox.enqueue("discord:down", "retried")
+    outbox.enqueue("discord:up", "sent")
+    drainer = OutboxDrainer(outbox, window=0)
+    drainer.register("discord", deliver)
+    drainer.start()
+    assert drainer.wait_idle(timeout=5)
+    drainer.stop()
+    assert delivered == ["sent"]
+    assert len(attempts) == 2
+    assert attempts[1] - attempts[0] >= 1
+
+
+def test_rejected_message_is_dead_lettered_alone(tmp_path):
+    outbox = Outbox(str(tmp_path / "outbox.sqlite3"))
+    delivered = []
+
+    def deliver(name, payloads):
+        delivered.extend(payload for payload in payloads if payload != "POISON")
+        return [
+            Delivery.REJECTED if payload == "POISON" else Delivery.SENT
+            for payload in payloads
+        ]
+
+    for payload in ("good1", "POISON", "good2"):
+        outbox.enqueue("discord:chat_webhook", payload)
+    drainer = OutboxDrainer(outbox, window=0, max_attempts=3)
+    drainer.register("discord", deliver)
+    drainer.drain()
+    assert delivered == ["good1", "good2"]
+    assert len(outbox) == 0
+    assert [row[2] for row in outbox.dead_letters()] == ["POISON"]
+
+
+def test_only_failed_messages_use_up_attempts(tmp_path):
+    outbox = Outbox(str(tmp_path / "outbox.sqlite3"))
+    for payload in ("sent", "failed", "pending"):
+        outbox.enqueue("discord:chat_webhook", payload)
+    drainer = OutboxDrainer(outbox, window=0)
+    drainer.register(
+        "discord",
+        lambda name, payloads: [Delivery.SENT, Delivery.RETRY, Delivery.PENDING],
+    )
+    drainer.drain()
+    assert [(row[2], row[3]) for row in outbox.pending()] == [
+        ("failed", 1),
+        ("pending", 0),
+    ]
+
+
+def test_backlog_of_blocked_channel_does_not_starve_others(tmp_path):
+    outbox = Outbox(str(tmp_path / "outbox.sqlite3"))
+    for i in range(600):
+        outbox.enqueue("discord:chat_webhook", f"chat {i}")
+    outbox.enqueue("discord:log_webhook", "log")
+    delivered = []
+
+    def deliver(name, payloads):
+        if name == "chat_webhook":
+            return [Delivery.RETRY] + [Delivery.PENDING] * (len(payloads) - 1)
+        delivered.extend(payloads)
+        return [Delivery.SENT] * len(payloads)
+
+    drainer = OutboxDrainer(outbox, window=0)
+    drainer.register("discord", deliver)
+    drainer.drain()
+    assert delivered == ["log"]
+    assert len(outbox) == 600
+
+
+def test_retry_hint_replaces_backoff(tmp_path):
+    outbox = Outbox(str(tmp_path / "outbox.sqlite3"))
+    attempts = []
+
+    def deliver(name, payloads):
+        attempts.append(time.monotonic())
+        return [Delivery.SENT if len(attempts) > 1 else Delivery.PENDING]
+
+    outbox.enqueue("discord:chat_webhook", "rate limited")
+    drainer = OutboxDrainer(outbox, window=0)
+    drainer.register("discord", deliver, lambda name: 0.1)
+    drainer.start()
+    assert drainer.wait_idle(timeout=5)
+    drainer.stop()
+    assert len(attempts) == 2
+    assert 0.1 <= attempts[1] - attempts[0] < 1
+    assert not outbox.dead_letters()
@@ -0,0 +1,245 @@
+import socket
+import struct
+import threading
+import time
+
+import pytest
+
+from errors import RCONAuthError
+from rcon import RCON, PacketBuffer, RCONPool, encode_packet
+
+
+class FakeRCONServer:
+    """Minimal Source RCON server that echoes commands back."""
+
+    def __init__(self, password="secret", max_body=4096, chunk=None, mirror=True):
+        self.password = password
+        self.mirror = mirror  # whether empty RESPONSE_VALUE packets are answered
+        self.max_body = max_body
+        self.chunk = chunk
+        self.responses = {}
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen()
+        self.port = self.listener.getsockname()[1]
+        self.accepted = 0
+        self.clients = []
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                client, _ = self.listener.accept()
+            except OSError:
+                return
+            self.accepted += 1
+            self.clients.append(client)
+            threading.Thread(target=self._serve, args=(client,), daemon=True).start()
+
+    @staticmethod
+    def _recv_exact(sock, n):
+        data = b""
+        while len(data) < n:
+            chunk = sock.recv(n - len(data))
+            if not chunk:
+                raise ConnectionError
+            data += chunk
+        return data
+
+    @staticmethod
+    def _packet(req_id, pkt_type, body):
+        data = struct.pack("<ii", req_id, pkt_type) + body.encode() + b"\x00\x00"
+        return struct.pack("<i", len(data)) + data
+
+    def _serve(self, sock):
+        try:
+            while True:
+                (length,) = struct.unpack("<i", self._recv_exact(sock, 4))
+                payload = self._recv_exact(sock, length)
+                req_id, pkt_type = struct.unpack("<ii", payload[:8])
+                body = payload[8:-2].decode()
+                data = self.respond(req_id, pkt_type, body)
+                step = self.chunk or len(data) or 1
+                for i in range(0, len(data), step):
+                    sock.sendall(data[i : i + step])
+        except (ConnectionError, OSError):
+            sock.close()
+
+    def respond(self, req_id, pkt_type, body):
+        if pkt_type == 3:
+            ok = body == self.password
+            return self._packet(req_id if ok else -1, 2, "")
+        if pkt_type == 0:
+            if not self.mirror:
+                return b""
+            # SRCDS mirrors the empty packet, then sends an extra junk packet
+            return self._packet(req_id, 0, "") + self._packet(req_id, 0, "\x01")
+        text = self.responses.get(body, f"echo {body}")
+        return b"".join(
+            self._packet(req_id, 0, text[i : i + self.max_body])
+            for i in range(0, max(len(text), 1), self.max_body)
+        )
+
+    def drop_clients(self):
+        for client in self.clients:
+            try:
+                client.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            client.close()
+        self.clients = []
+
+    def close(self):
+        self.listener.close()
+        self.drop_clients()
+
+
+@pytest.fixture
+def server():
+    srv = FakeRCONServer()
+    yield srv
+    srv.close()
+
+
+def test_pool_reuses_connection(server):
+    pool = RCONPool("127.0.0.1", server.port, "secret", size=1, heartbeat_interval=0)
+    for i in range(5):
+        assert pool.execute(f"cmd {i}") == f"echo cmd {i}"
+    assert server.accepted == 1
+    stats = pool.stats()
+    assert stats.commands == 5
+    assert stats.in_flight == 0
+    assert stats.auth_latency_last is not None
+    pool.close()
+
+
+def test_pool_reconnects_after_server_restart(server):
+    pool = RCONPool("127.0.0.1", server.port, "secret", size=1, heartbeat_interval=0)
+    assert pool.execute("before") == "echo before"
+    server.drop_clients()
+    assert pool.execute("after") == "echo after"
+    assert server.accepted == 2
+    assert pool.stats().reconnects == 1
+    pool.close()
+
+
+def test_pool_auth_failure(server):
+    pool = RCONPool("127.0.0.1", server.port, "wrong", size=1, heartbeat_interval=0)
+    with pytest.raises(RCONAuthError):
+        pool.execute("listplayers")
+    assert pool.stats().connections == 0
+
+
+def test_packet_buffer_reassembles_split_stream():
+    data = encode_packet(7, 0, "hello") + encode_packet(8, 0, "world")
+    buffer = PacketBuffer(size=4)
+    body = bytearray()
+    for byte in data[:-1]:
+        buffer.feed(bytes([byte]))
+        packet = buffer.next_packet(body)
+        if packet:
+            assert packet == (7, 0)
+    assert body == b"hello"
+    assert buffer.next_packet() is None
+    buffer.feed(data[-1:])
+    assert buffer.next_packet(body) == (8, 0)
+    assert body == b"helloworld"
+    assert len(buffer) == 0
+
+
+def test_multi_packet_response_is_joined():
+    server = FakeRCONServer(max_body=100, chunk=7)
+    players = "\n".join(f"{i}. Player{i}, 000{i}" for i in range(70))
+    server.responses["ListPlayers"] = players
+    rcon = RCON("127.0.0.1", server.port, "secret", timeout=5)
+    try:
+        rcon.connect()
+        assert rcon.send("ListPlayers") == players
+        assert rcon.send("next") == "echo next"
+    finally:
+        rcon.close()
+        server.close()
+
+
+def test_pool_execute_many_matches_responses():
+    server = FakeRCONServer(max_body=16, chunk=5)
+    server.responses["ListPlayers"] = "0. Alice, 1\n1. Bob, 2\n2. Carol, 3"
+    pool = RCONPool("127.0.0.1", server.port, "secret", size=1, heartbeat_interval=0)
+    try:
+        assert pool.execute_many(["serverchat hi", "ListPlayers", "broadcast hi"]) == [
+            "echo serverchat hi",
+            server.responses["ListPlayers"],
+            "echo broadcast hi",
+        ]
+        assert pool.execute("next") == "echo next"
+        assert server.accepted == 1
+        assert pool.stats().commands == 4
+    finally:
+        pool.close()
+        server.close()
+
+
+def test_pool_execute_many_reconnects(server):
+    pool = RCONPool("127.0.0.1", server.port, "secret", size=1, heartbeat_interval=0)
+    assert pool.execute_many(["a", "b"]) == ["echo a", "echo b"]
+    server.drop_clients()
+    assert pool.execute_many(["c", "d"]) == ["echo c", "echo d"]
+    assert server.accepted == 2
+    pool.close()
+
+
+def test_execute_many_falls_back_when_sentinel_is_not_mirrored():
+    server = FakeRCONServer(mirror=False)
+    pool = RCONPool(
+        "127.0.0.1", server.port, "secret", size=1, heartbeat_interval=0, timeout=0.3
+    )
+    try:
+        # The answer to "b" arriving before the mirror gives the server away
+        assert pool.execute_many(["a", "b", "c"]) == ["echo a", "echo b", "echo c"]
+        assert not pool.multi_packet
+        assert pool.execute("d") == "echo d"
+    finally:
+        pool.close()
+        server.close()
+
+
+def test_send_falls_back_when_sentinel_is_not_mirrored():
+    server = FakeRCONServer(mirror=False)
+    rcon = RCON("127.0.0.1", server.port, "secret", timeout=0.3)
+    try:
+        rcon.connect()
+        assert rcon.send("a") == "echo a"
+        assert not rcon.multi_packet
+        assert rcon.send_many(["b", "c"]) == ["echo b", "echo c"]
+    finally:
+        rcon.close()
+        server.close()
+
+
+def test_missing_sentinel_is_only_waited_for_briefly_once():
+    server = FakeRCONServer(mirror=False)
+    pool = RCONPool(
+        "127.0.0.1",
+        server.port,
+        "secret",
+        size=2,
+        heartbeat_interval=0,
+        timeout=5,
+        sentinel_timeout=0.2,
+    )
+    try:
+        first, second = pool._acquire(), pool._acquire()
+        pool._release(first)
+        pool._release(second)
+        start = time.monotonic()
+        assert pool.execute("a") == "echo a"
+        assert time.monotonic() - start < 2
+        assert not pool.multi_packet
+        assert not any(conn.rcon.multi_packet for conn in pool._idle)
+        start = time.monotonic()
+        assert pool.execute("b") == "echo b"
+        assert pool.execute("c") == "echo c"
+        assert time.monotonic() - start < 0.2
+    finally:
+        pool.close()
+        server.close()
@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+
+import restart_broker
+from restart_broker import RestartBroker, RestartIntent
+from scheduler import Scheduler
+
+
+def install_server():
+    pass
+
+
+def make_broker(monkeypatch, planned=None):
+    announced = []
+    monkeypatch.setattr(restart_broker, "announce", announced.append)
+    restarts = []
+    scheduler = Scheduler()
+    broker = RestartBroker(
+        scheduler,
+        lambda reason: restarts.append((reason, broker.take_all())),
+        window=60,
+        planned_restart=lambda: planned,
+    )
+    return scheduler, broker, announced, restarts
+
+
+def test_intents_in_window_share_one_countdown(monkeypatch):
+    scheduler, broker, announced, restarts = make_broker(monkeypatch)
+    update = RestartIntent("Server update", "server update", install=install_server)
+    mods = RestartIntent("Mod update", "mod update (Foo)", "Foo")
+    now = datetime.now()
+    broker.submit(update, [10, 5, 1])
+    broker.submit(mods, [5, 1])
+    assert broker.pending and not broker.countdown.active
+
+    scheduler.run_pending(now + timedelta(seconds=61))
+    assert broker.countdown.active
+    scheduler.run_pending(broker.countdown.deadline - timedelta(minutes=10))
+    assert announced == [
+        f"Warning: Server update and Mod update will occur in 10 minutes at approximately "
+        f"{restart_broker.TimeTracker.display(broker.countdown.deadline)}, (Foo)."
+    ]
+
+    # A late intent joins the running countdown
+    api = RestartIntent("ARK Server API update", "ServerAPI update")
+    broker.submit(api, [10, 5, 1])
+    scheduler.run_pending(broker.countdown.deadline)
+    assert restarts == [
+        ("server update, mod update (Foo), ServerAPI update", [update, mods, api])
+    ]
+    assert len(announced) == 3
+    assert not broker.pending
+
+
+def test_intent_waits_for_planned_restart(monkeypatch):
+    planned = datetime.now() + timedelta(minutes=8)
+    scheduler, broker, announced, restarts = make_broker(monkeypatch, planned)
+    update = RestartIntent("Server update", "server update", install=install_server)
+    broker.submit(update, [10, 5, 1])
+
+    scheduler.run_pending(planned + timedelta(minutes=1))
+    assert restarts == [] and announced == []
+    assert broker.take_all() == [update]
+
+
+def test_take_all_cancels_window(monkeypatch):
+    scheduler, broker, announced, restarts = make_broker(monkeypatch)
+    intent = RestartIntent("Server update", "server update")
+    broker.submit(intent, [10])
+    assert broker.take_all() == [intent]
+
+    scheduler.run_pending(datetime.now() + timedelta(hours=1))
+    assert restarts == [] and announced == [] and not broker.pending
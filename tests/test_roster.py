@@ -0,0 +1,32 @@
+from roster import PlayerRoster
+
+
+def test_join_and_leave():
+    roster = PlayerRoster()
+    assert roster.add("Alice")
+    assert not roster.add("alice ")
+    assert roster.add("Bob")
+    assert "ALICE" in roster
+    assert roster.count() == 2
+    assert roster.remove("Alice")
+    assert not roster.remove("Alice")
+    assert roster.names() == ["Bob"]
+
+
+def test_reconcile_replaces_players():
+    roster = PlayerRoster()
+    assert not roster.is_synced
+    roster.add("Ghost")
+    roster.reconcile(["Alice", "Bob"])
+    assert roster.is_synced
+    assert "Ghost" not in roster
+    assert sorted(roster.names()) == ["Alice", "Bob"]
+
+
+def test_sync_keeps_roster_when_fetch_fails():
+    roster = PlayerRoster()
+    roster.add("Alice")
+    assert not roster.sync(lambda: None)
+    assert roster.count() == 1
+    assert roster.sync(lambda: [])
+    assert roster.count() == 0
@@ -0,0 +1,78 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+from scheduler import Scheduler
+
+T0 = datetime(2024, 1, 1, 12, 0, 0)
+
+
+def test_runs_due_callbacks_in_deadline_order():
+    scheduler = Scheduler()
+    ran = []
+    for offset in (30, 10, 20, 10):
+        scheduler.schedule(
+            T0 + timedelta(seconds=offset), lambda o=offset: ran.append(o)
+        )
+
+    assert scheduler.run_pending(T0 + timedelta(seconds=5)) == 0
+    assert scheduler.run_pending(T0 + timedelta(seconds=20)) == 3
+    assert ran == [10, 10, 20]
+    assert scheduler.next_deadline() == T0 + timedelta(seconds=30)
+
+
+def test_cancelled_entries_are_skipped_and_compacted():
+    scheduler = Scheduler()
+    ran = []
+    items = [
+        scheduler.schedule(T0 + timedelta(seconds=i), lambda i=i: ran.append(i))
+        for i in range(10)
+    ]
+    for item in items[:6]:
+        item.cancel()
+    items[0].cancel()  # cancelling twice is harmless
+
+    assert len(scheduler) == 4
+    assert len(scheduler._heap) < 10  # rebuilt once most entries were cancelled
+    assert scheduler.next_deadline() == T0 + timedelta(seconds=6)
+    scheduler.run_pending(T0 + timedelta(seconds=60))
+    assert ran == [6, 7, 8, 9]
+
+
+def test_repeating_entry_skips_missed_runs():
+    scheduler = Scheduler()
+    ran = []
+    item = scheduler.schedule(T0, lambda: ran.append(1), interval=10)
+
+    scheduler.run_pending(T0 + timedelta(seconds=35))
+    assert ran == [1]
+    assert item.when == T0 + timedelta(seconds=45)
+    item.cancel()
+    assert scheduler.run_pending(T0 + timedelta(seconds=60)) == 0
+
+
+def test_failing_callback_does_not_stop_others():
+    scheduler = Scheduler()
+    ran = []
+    scheduler.schedule(T0, lambda: 1 / 0)
+    scheduler.schedule(T0, lambda: ran.append("ok"))
+    assert scheduler.run_pending(T0) == 2
+    assert ran == ["ok"]
+
+
+def test_run_wakes_for_earlier_entry_and_stops():
+    scheduler = Scheduler(max_wait=60)
+    fired = threading.Event()
+    scheduler.schedule_in(3600, lambda: None)
+    thread = threading.Thread(target=scheduler.run)
+    thread.start()
+    try:
+        time.sleep(0.05)
+        started = time.monotonic()
+        scheduler.schedule_in(0.1, fired.set)
+        assert fired.wait(2)
+        assert time.monotonic() - started < 1
+    finally:
+        scheduler.stop()
+        thread.join(2)
+    assert not thread.is_alive()
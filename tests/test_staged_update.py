@@ -0,0 +1,139 @@
+import os
+
+import pytest
+
+import integrity
+from staged_update import StagedInstall, StagedServerUpdate
+
+ACF = '"AppState"\n{{\n\t"appid"\t"1"\n\t"StateFlags"\t"{flags}"\n\t"buildid"\t"{build}"\n}}\n'
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+@pytest.fixture
+def install(tmp_path):
+    live = tmp_path / "live"
+    write(live / "ShooterGame" / "Binaries" / "server.exe", "v1")
+    write(live / "ShooterGame" / "Content" / "map.pak", "map")
+    write(live / "ShooterGame" / "Content" / "old.pak", "old")
+    write(live / "ShooterGame" / "Saved" / "SavedArks" / "world.ark", "save")
+    write(live / "steamapps" / "appmanifest_1.acf", ACF.format(flags=4, build=1))
+    return StagedInstall(str(live), str(tmp_path / "stage"))
+
+
+def download(stage_dir, flags=4):
+    """What steamcmd does: write new files rather than modifying linked ones."""
+    exe = os.path.join(stage_dir, "ShooterGame", "Binaries", "server.exe")
+    os.remove(exe)
+    with open(exe, "w") as f:
+        f.write("v2")
+    os.remove(os.path.join(stage_dir, "ShooterGame", "Content", "old.pak"))
+    with open(os.path.join(stage_dir, "ShooterGame", "Content", "new.pak"), "w") as f:
+        f.write("new")
+    with open(os.path.join(stage_dir, "steamapps", "appmanifest_1.acf"), "w") as f:
+        f.write(ACF.format(flags=flags, build=2))
+
+
+def test_seed_copies_files_and_skips_saved(install, tmp_path):
+    assert install.seed() == 4
+    stage = tmp_path / "stage"
+    assert (stage / "ShooterGame" / "Content" / "map.pak").read_text() == "map"
+    assert not os.path.samefile(
+        stage / "ShooterGame" / "Content" / "map.pak",
+        tmp_path / "live" / "ShooterGame" / "Content" / "map.pak",
+    )
+    assert not (stage / "ShooterGame" / "Saved").exists()
+    assert install.seed() == 0
+
+
+def test_patching_the_stage_in_place_leaves_live_alone(install, tmp_path):
+    install.seed()
+    with open(tmp_path / "stage" / "ShooterGame" / "Content" / "map.pak", "a") as f:
+        f.write(" patched")
+    live = tmp_path / "live" / "ShooterGame" / "Content" / "map.pak"
+    assert live.read_text() == "map"
+
+
+def test_seed_links_files_when_enabled(install, tmp_path):
+    install.hardlinks = True
+    assert install.seed() == 4
+    stage = tmp_path / "stage"
+    assert os.path.samefile(
+        stage / "ShooterGame" / "Content" / "map.pak",
+        tmp_path / "live" / "ShooterGame" / "Content" / "map.pak",
+    )
+    # steamcmd rewrites its manifests in place, so they mustn't be shared
+    assert not os.path.samefile(
+        stage / "steamapps" / "appmanifest_1.acf",
+        tmp_path / "live" / "steamapps" / "appmanifest_1.acf",
+    )
+    assert not (stage / "ShooterGame" / "Saved").exists()
+    assert install.seed() == 0
+
+
+def test_apply_only_touches_changed_files(install, tmp_path):
+    live = tmp_path / "live"
+    install.seed()
+    download(install.stage_dir)
+    map_inode = (live / "ShooterGame" / "Content" / "map.pak").stat().st_ino
+    # the live server is untouched until the stage is applied
+    assert (live / "ShooterGame" / "Binaries" / "server.exe").read_text() == "v1"
+
+    assert install.apply() == 4
+    assert (live / "ShooterGame" / "Binaries" / "server.exe").read_text() == "v2"
+    assert (live / "ShooterGame" / "Content" / "new.pak").read_text() == "new"
+    assert not (live / "ShooterGame" / "Content" / "old.pak").exists()
+    assert (live / "ShooterGame" / "Content" / "map.pak").stat().st_ino == map_inode
+    assert (live / "ShooterGame" / "Saved" / "SavedArks" / "world.ark").exists()
+
+
+def test_seed_falls_back_to_copies(install, tmp_path, monkeypatch):
+    def no_links(src, dst):
+        raise OSError("cross-device link")
+
+    monkeypatch.setattr(os, "link", no_links)
+    install.hardlinks = True
+    install.seed()
+    copy = tmp_path / "stage" / "ShooterGame" / "Content" / "map.pak"
+    assert copy.read_text() == "map"
+    assert not os.path.samefile(
+        copy, tmp_path / "live" / "ShooterGame" / "Content" / "map.pak"
+    )
+
+
+def test_staged_update_installs_from_stage(install, tmp_path):
+    fallbacks = []
+    update = StagedServerUpdate(install, download, lambda: fallbacks.append(1), 1)
+    update.start()
+    update.install()
+    assert (
+        tmp_path / "live" / "ShooterGame" / "Binaries" / "server.exe"
+    ).read_text() == "v2"
+    assert fallbacks == []
+
+
+def test_incomplete_staging_falls_back_to_update_in_place(install, tmp_path):
+    fallbacks = []
+    update = StagedServerUpdate(
+        install, lambda d: download(d, flags=1026), lambda: fallbacks.append(1), 1
+    )
+    update.start()
+    update.install()
+    assert (
+        tmp_path / "live" / "ShooterGame" / "Binaries" / "server.exe"
+    ).read_text() == "v1"
+    assert fallbacks == [1]
+
+
+def test_applied_stage_is_recorded_for_the_live_install(install, tmp_path, monkeypatch):
+    monkeypatch.setattr(integrity, "OUTDIR", str(tmp_path / "output"))
+    (tmp_path / "output").mkdir()
+    live = str(tmp_path / "live")
+    integrity.record_install(live)  # the manifest before the update
+    update = StagedServerUpdate(install, download, lambda: None, 1)
+    update.start()
+    update.install()
+    assert not integrity.needs_validate(live)
@@ -0,0 +1,84 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+import steamcmd
+from config import CONFIG
+from errors import SteamCmdError, SteamCmdStalledError
+from steamcmd import SteamCmdResult, parse_progress, stream_steamcmd, update_server
+
+ASSETS = Path(__file__).parent / "assets"
+
+
+def fake_steamcmd(*args):
+    return [
+        sys.executable,
+        str(ASSETS / "fake_steamcmd.py"),
+        str(ASSETS / "steamcmd_update.log"),
+        *args,
+    ]
+
+
+def test_parse_progress():
+    event = parse_progress(
+        " Update state (0x61) downloading, progress: 12.50 (1207959552 / 9663676416)"
+    )
+    assert (event.phase, event.state, event.percent) == ("downloading", 0x61, 12.5)
+    assert (event.done, event.total) == (1207959552, 9663676416)
+    assert parse_progress("Loading Steam API...OK") is None
+
+
+def test_stream_reports_progress_and_phase_timings():
+    events = []
+    result = stream_steamcmd(
+        fake_steamcmd("--delay", "0.01"), on_progress=events.append
+    )
+    assert result.returncode == 0
+    assert list(result.phases) == [
+        "starting",
+        "reconfiguring",
+        "downloading",
+        "verifying update",
+        "committing",
+    ]
+    downloads = [e for e in events if e.phase == "downloading"]
+    assert [e.done for e in downloads] == sorted(e.done for e in downloads)
+    assert downloads[-1].percent == 100
+    assert downloads[-1].rate > 0
+    assert result.output[-1] == "Success! App '2430930' fully installed."
+
+
+def test_stalled_download_is_killed():
+    with pytest.raises(SteamCmdStalledError):
+        stream_steamcmd(fake_steamcmd("--stall-at", "13"), stall_timeout=0.5)
+
+
+def test_reported_error_raises():
+    with pytest.raises(SteamCmdError, match="state is 0x202"):
+        stream_steamcmd(
+            fake_steamcmd("--error", "App '2430930' state is 0x202 after update job.")
+        )
+
+
+@pytest.mark.parametrize(
+    "returncode, flags, recorded",
+    [(0, 4, True), (0, 1026, False), (8, 4, False)],
+)
+def test_update_records_only_complete_installs(
+    tmp_path, monkeypatch, returncode, flags, recorded
+):
+    (tmp_path / "steamapps").mkdir()
+    (tmp_path / "steamapps" / f"appmanifest_{CONFIG['steam_app_id']}.acf").write_text(
+        f'"AppState"\n{{\n\t"StateFlags"\t\t"{flags}"\n}}\n'
+    )
+    records = []
+    monkeypatch.setattr(steamcmd, "check_and_download_steamcmd", lambda: None)
+    monkeypatch.setattr(
+        steamcmd,
+        "_run_steamcmd",
+        lambda args: SteamCmdResult(returncode=returncode),
+    )
+    monkeypatch.setattr(steamcmd, "record_install", records.append)
+    update_server(install_dir=str(tmp_path), validate=False)
+    assert records == ([str(tmp_path)] if recorded else [])
@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+
+import tasks
+import time_tracker
+from scheduler import Scheduler
+
+
+class CountingTask(tasks.Task):
+    def __init__(self):
+        super().__init__(server=None, task_name="destroy_wild_dinos")
+        self.runs = 0
+
+    def _run_task(self) -> bool:
+        self.runs += 1
+        return False
+
+
+def test_task_schedules_warnings_and_run(tmp_path, monkeypatch):
+    monkeypatch.setattr(time_tracker, "OUTDIR", str(tmp_path))
+    announced = []
+    monkeypatch.setattr(tasks, "announce", announced.append)
+    task = CountingTask()
+    task.warning_times = [60, 30, 10, 1]
+    next_time = datetime.now() + timedelta(minutes=20)
+    task.time.next_time = next_time
+
+    scheduler = Scheduler()
+    before = datetime.now()
+    task.schedule(scheduler)
+    # 60 and 30 minutes have already passed: only the closer one is sent, now
+    deadlines = sorted(item.when for item in task._scheduled)
+    assert before <= deadlines[0] <= datetime.now()
+    assert deadlines[1:] == [
+        next_time - timedelta(minutes=10),
+        next_time - timedelta(minutes=1),
+        next_time,
+    ]
+    scheduler.run_pending()
+    assert len(announced) == 1 and "in 30 minutes" in announced[0]
+
+    scheduler.run_pending(next_time - timedelta(minutes=1))
+    assert "in 10 minutes" in announced[1]
+    assert "in 1 minute " in announced[2]
+
+    # Rescheduling (e.g. after a reset) doesn't repeat warnings already sent
+    task.reschedule()
+    assert [item.when for item in task._scheduled] == [next_time]
+    assert len(scheduler) == 1
@@ -0,0 +1,109 @@
+from types import SimpleNamespace
+
+import pytest
+from steam.enums import EResult
+
+from update import SteamSession
+
+APP_ID = 2430930
+
+
+class FakeSteamClient:
+    def __init__(self, server):
+        self.server = server
+        self.logged_on = False
+
+    def anonymous_login(self):
+        self.server.logins += 1
+        self.logged_on = self.server.login_result == EResult.OK
+        return self.server.login_result
+
+    def get_product_info(self, apps, timeout):
+        self.server.product_requests += 1
+        if not self.logged_on or self.server.drop_next:
+            self.server.drop_next = False
+            return None
+        return {
+            "apps": {
+                APP_ID: {
+                    "_change_number": self.server.change_number,
+                    "depots": {"branches": {"public": {"buildid": self.server.build}}},
+                }
+            }
+        }
+
+    def get_changes_since(self, change_number, app_changes, package_changes):
+        changed = [
+            SimpleNamespace(appid=appid)
+            for number, appid in self.server.changes
+            if number > change_number
+        ]
+        return SimpleNamespace(
+            current_change_number=self.server.change_number,
+            force_full_update=False,
+            app_changes=changed,
+        )
+
+    def disconnect(self):
+        self.logged_on = False
+
+
+class FakeSteam:
+    def __init__(self):
+        self.build = "100"
+        self.change_number = 10
+        self.changes = []
+        self.logins = 0
+        self.product_requests = 0
+        self.login_result = EResult.OK
+        self.drop_next = False
+
+    def publish(self, appid, build=None):
+        self.change_number += 1
+        self.changes.append((self.change_number, appid))
+        if build:
+            self.build = build
+
+    def session(self, ttl=3600):
+        return SteamSession(
+            APP_ID, ttl=ttl, client_factory=lambda: FakeSteamClient(self)
+        )
+
+
+def test_build_id_is_cached_until_the_app_changes():
+    steam = FakeSteam()
+    session = steam.session()
+    assert session.latest_build_id() == "100"
+    assert session.latest_build_id() == "100"
+    assert (steam.logins, steam.product_requests) == (1, 1)
+
+    steam.publish(appid=12345)  # another app changed
+    assert session.latest_build_id() == "100"
+    assert steam.product_requests == 1
+
+    steam.publish(appid=APP_ID, build="101")
+    assert session.latest_build_id() == "101"
+    assert (steam.logins, steam.product_requests) == (1, 2)
+
+
+def test_expired_ttl_refetches():
+    steam = FakeSteam()
+    session = steam.session(ttl=0)
+    session.latest_build_id()
+    session.latest_build_id()
+    assert steam.product_requests == 2
+
+
+def test_dropped_session_reconnects():
+    steam = FakeSteam()
+    session = steam.session()
+    steam.drop_next = True
+    assert session.latest_build_id() == "100"
+    assert steam.logins == 2
+
+
+def test_failed_login_raises():
+    steam = FakeSteam()
+    steam.login_result = EResult.ServiceUnavailable
+    with pytest.raises(RuntimeError, match="login failed"):
+        steam.session().latest_build_id()
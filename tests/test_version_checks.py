@@ -0,0 +1,74 @@
+import threading
+import time
+
+from version_checks import VersionChecker
+
+
+def test_sources_are_checked_concurrently():
+    def slow(value):
+        def check():
+            time.sleep(0.3)
+            return value
+
+        return check
+
+    checker = VersionChecker({"a": slow(1), "b": slow(2), "c": slow(3)}, timeout=5)
+    started = time.monotonic()
+    results = checker.wait()
+    assert time.monotonic() - started < 0.8
+    assert {source: r.value for source, r in results.items()} == {
+        "a": 1,
+        "b": 2,
+        "c": 3,
+    }
+    assert checker.latest("b").ok
+    checker.shutdown()
+
+
+def test_failed_check_is_retried():
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ConnectionError("unreachable")
+        return True
+
+    checker = VersionChecker({"steam": flaky}, retries=2, backoff=0.01)
+    result = checker.wait()["steam"]
+    assert result.ok and result.value is True
+    assert len(calls) == 3
+
+    checker = VersionChecker({"steam": lambda: 1 / 0}, retries=1, backoff=0.01)
+    result = checker.wait()["steam"]
+    assert not result.ok and "division" in result.error
+    checker.shutdown()
+
+
+def test_hung_source_times_out_without_holding_up_others():
+    release = threading.Event()
+    checker = VersionChecker(
+        {"hung": lambda: release.wait(5), "fast": lambda: "ok"},
+        timeouts={"hung": 0.2},
+    )
+    try:
+        results = checker.wait()
+        assert results["hung"].error == "timed out"
+        assert results["fast"].value == "ok"
+        assert checker.latest("hung") is None
+
+        # While the check is still running, it isn't started a second time
+        first = checker.refresh(["hung"])["hung"]
+        assert checker.refresh(["hung"])["hung"] is first
+    finally:
+        release.set()
+        checker.shutdown()
+
+
+def test_each_source_keeps_its_thread():
+    threads = []
+    checker = VersionChecker({"steam": lambda: threads.append(threading.get_ident())})
+    for _ in range(3):
+        checker.wait()
+    assert len(set(threads)) == 1
+    checker.shutdown()
@@ -0,0 +1,121 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from webhook import Delivery, WebhookSender, pack_messages
+
+
+class FakeDiscord:
+    """Local webhook endpoint that rate limits like Discord."""
+
+    def __init__(self, rate_limit_first=0, bucket_size=None, retry_after=0.2):
+        self.posts = []
+        self.reject = set()  # posts containing any of these are refused with a 400
+        self.fail = set()  # posts containing any of these get a 500
+        self.times = []
+        self.rate_limit_first = rate_limit_first
+        self.bucket_size = bucket_size
+        self.retry_after = retry_after
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                fake.times.append(time.monotonic())
+                if fake.rate_limit_first > 0:
+                    fake.rate_limit_first -= 1
+                    payload = json.dumps({"retry_after": fake.retry_after}).encode()
+                    self.send_response(429)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                    return
+                status = 204
+                if any(word in body["content"] for word in fake.reject):
+                    status = 400
+                elif any(word in body["content"] for word in fake.fail):
+                    status = 500
+                else:
+                    fake.posts.append(body["content"])
+                self.send_response(status)
+                if fake.bucket_size:
+                    remaining = -len(fake.posts) % fake.bucket_size
+                    self.send_header("X-RateLimit-Remaining", str(remaining))
+                    self.send_header("X-RateLimit-Reset-After", str(fake.retry_after))
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/webhook"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def discord():
+    fake = FakeDiscord()
+    yield fake
+    fake.close()
+
+
+def test_pack_messages():
+    assert pack_messages(["a", "b", "c"], limit=3) == ["a\nb", "c"]
+    assert pack_messages(["abcdefg"], limit=3) == ["abc", "def", "g"]
+
+
+def test_429_leaves_message_pending_until_retry_after(discord):
+    discord.rate_limit_first = 1
+    sender = WebhookSender(discord.url)
+    start = time.monotonic()
+    assert sender.deliver(["hello", "world"]) == [Delivery.PENDING] * 2
+    assert time.monotonic() - start < 0.2
+    assert 0 < sender.retry_after <= 0.2
+    assert sender.deliver(["hello"]) == [Delivery.PENDING]
+    assert len(discord.times) == 1
+    time.sleep(sender.retry_after)
+    assert sender.deliver(["hello"]) == [Delivery.SENT]
+    assert discord.posts == ["hello"]
+    sender.close()
+
+
+def test_exhausted_bucket_holds_later_posts(discord):
+    discord.bucket_size = 2
+    sender = WebhookSender(discord.url)
+    results = sender.deliver(["a" * 2000, "b" * 2000, "c"])
+    assert results == [Delivery.SENT, Delivery.SENT, Delivery.PENDING]
+    assert discord.posts == ["a" * 2000, "b" * 2000]
+    assert sender.retry_after > 0
+    sender.close()
+
+
+def test_gives_up_on_client_error():
+    sender = WebhookSender("http://127.0.0.1:9/unreachable")
+    assert sender.deliver(["lost"]) == [Delivery.RETRY]
+    sender.close()
+
+
+def test_rejected_message_does_not_take_down_its_post(discord):
+    discord.reject = {"POISON"}
+    sender = WebhookSender(discord.url)
+    results = sender.deliver(["good1", "POISON", "good2"])
+    assert results == [Delivery.SENT, Delivery.REJECTED, Delivery.SENT]
+    assert discord.posts == ["good1", "good2"]
+    sender.close()
+
+
+def test_failed_post_leaves_later_messages_pending(discord):
+    discord.fail = {"DOWN"}
+    sender = WebhookSender(discord.url)
+    results = sender.deliver(["a" * 2000, "DOWN", "c" * 2000])
+    assert results == [Delivery.SENT, Delivery.RETRY, Delivery.PENDING]
+    assert discord.posts == ["a" * 2000]
+    sender.close()